@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: epochs/s and accuracy of MultilaterationSolver on synthetic distances: linear least squares vs
+       Gauss-Newton, 2D/3D, 4-16 anchors, missing measurements
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+import sys
+import time
+
+import numpy as np
+
+from Multilateration import *
+
+# anchors on the walls of a 20 m x 15 m hall, heights 0.5-3 m
+ANCHOR_COUNTS = [4, 8, 16]
+
+# 1 sigma of the range noise, share of the missing measurements
+RANGE_NOISE_M = 0.05
+MISSING_RATE = 0.1
+
+# (label, dims, Gauss-Newton iterations)
+CASES = [
+    ("2D linear", 2, 0),
+    ("2D Gauss-Newton", 2, 5),
+    ("3D linear", 3, 0),
+    ("3D Gauss-Newton", 3, 5),
+]
+
+TAG_HEIGHT_M = 1.2
+
+
+def hall_anchors(count: int, rng: np.random.Generator) -> np.ndarray:
+    perimeter = np.linspace(0, 70, count, endpoint=False)
+    x = np.clip(perimeter, 0, 20) - np.clip(perimeter - 35, 0, 20)
+    y = np.clip(perimeter - 20, 0, 15) - np.clip(perimeter - 55, 0, 15)
+    return np.column_stack((x, y, rng.uniform(0.5, 3.0, count)))
+
+
+def synthetic_distances(anchors: np.ndarray, epochs: int, dims: int, rng: np.random.Generator) -> tuple:
+    '''
+        @return true tag positions (epochs, 3), measured distances (epochs, anchors) in m with NaN for the missing ones
+    '''
+    heights = np.full(epochs, TAG_HEIGHT_M) if dims == 2 else rng.uniform(0.3, 2.0, epochs)
+    truth = np.column_stack((rng.uniform(1, 19, epochs), rng.uniform(1, 14, epochs), heights))
+    distances = np.linalg.norm(truth[:, None, :] - anchors[None, :, :], axis=2) + rng.normal(0, RANGE_NOISE_M, (epochs, len(anchors)))
+    distances[rng.random(distances.shape) < MISSING_RATE] = np.nan
+    return truth, distances
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    epochs = int(args[0]) if len(args) > 0 else 200000
+    rng = np.random.default_rng(0)
+    print(f"{epochs} epochs per case, range noise {RANGE_NOISE_M * 100:g} cm, {MISSING_RATE * 100:g}% missing")
+    print(f"{'case':<20}{'anchors':>8}{'epochs/s':>12}{'solved':>8}{'p50 cm':>8}{'p95 cm':>8}{'day @10Hz s':>13}")
+    for anchor_count in ANCHOR_COUNTS:
+        anchors = hall_anchors(anchor_count, rng)
+        for label, dims, iterations in CASES:
+            truth, distances = synthetic_distances(anchors, epochs, dims, rng)
+            solver = MultilaterationSolver(anchors, dims=dims, tag_height=TAG_HEIGHT_M, gauss_newton_iterations=iterations)
+            start = time.perf_counter()
+            result = solver.solve(distances)
+            elapsed = time.perf_counter() - start
+            errors = np.linalg.norm(result.positions[result.valid] - truth[result.valid, :dims], axis=1) * 100
+            print(f"{label:<20}{anchor_count:>8}{epochs / elapsed:>12.0f}{result.valid.mean() * 100:>7.1f}%"
+                  f"{np.percentile(errors, 50):>8.1f}{np.percentile(errors, 95):>8.1f}{86400 * 10 / (epochs / elapsed):>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
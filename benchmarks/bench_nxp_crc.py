@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: micro-benchmark of the CRC16-XMODEM of the UCI frames (nxp_crc)
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+import os
+import sys
+import time
+
+import crcengine
+
+import nxp_crc
+
+# typical UCI frame sizes: command, short FiRa NTF, 8 controlees NTF, max segment
+FRAME_SIZES = [8, 64, 256, 259]
+# frame rates to check the per-second CPU budget against
+FRAME_RATES = [1000, 10000, 100000]
+
+
+def crc_crcengine_per_call(frame):
+    ''' the former nxp_crc.calculate_crc: a new engine per frame '''
+    return crcengine.new('crc16-xmodem').calculate(frame)
+
+
+def bench(func, frame, count: int) -> float:
+    ''' @return seconds per call '''
+    start = time.perf_counter()
+    for _ in range(count):
+        func(frame)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    engine = crcengine.new('crc16-xmodem')
+    cases = [
+        ("crcengine.new() per call, list", crc_crcengine_per_call, list),
+        ("crcengine cached engine, list", engine.calculate, list),
+        ("nxp_crc table (python), bytes", nxp_crc.calculate_crc_table, bytes),
+        ("nxp_crc.calculate_crc, list", nxp_crc.calculate_crc, list),
+        ("nxp_crc.calculate_crc, bytes", nxp_crc.calculate_crc, bytes),
+        ("nxp_crc.calculate_crc, memoryview", nxp_crc.calculate_crc, memoryview),
+    ]
+    print(f"{count} calls per case")
+    for size in FRAME_SIZES:
+        raw = os.urandom(size)
+        expected = crc_crcengine_per_call(list(raw))
+        print(f"\nframe size: {size} bytes")
+        print(f"{'implementation':<36}{'us/frame':>10}" + "".join(f"{'CPU @' + str(rate // 1000) + 'k/s':>14}" for rate in FRAME_RATES))
+        for name, func, frame_type in cases:
+            frame = frame_type(raw) if frame_type is not memoryview else memoryview(raw)
+            if func(frame) != expected:
+                print(f"{name:<36}  CRC mismatch!")
+                continue
+            # the slow cases get fewer iterations
+            seconds = bench(func, frame, count if "per call" not in name else max(count // 20, 100))
+            print(f"{name:<36}{seconds * 1e6:>10.2f}" + "".join(f"{seconds * rate * 100:>13.1f}%" for rate in FRAME_RATES))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: memory and construction time of the range notification records, __slots__ vs __dict__
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+import sys
+import time
+import tracemalloc
+
+from uci_fira_range_ntf import *
+from uci_ccc_range_ntf import *
+
+
+def without_slots(cls):
+    ''' same record with a per-instance __dict__, as before the __slots__ '''
+    return type(cls.__name__ + "Dict", (), {"__init__": cls.__init__})
+
+
+# record class, constructor arguments of a typical record
+RECORDS = [
+    (FiraTwrResult, (0x1234, 0, 0, 150, 3, 10, 1, 20, 2, 30, 3, 40, 4)),
+    (FiraRangeDataNtf, (7, 0x1001, 200, 1, 0, 0, [])),
+    (CCCRangeDataNtfControlee, (0x1001, EnumCCCRangeStatus(0), 12, 3, 150, 10, 20, b"\xff" * 8)),
+    (CCCRangeDataNtfController, (0x1001, EnumCCCRangeStatus(0), 12, 3, 0, b"\xff" * 8)),
+    (CCCResponderResult, (1, 150)),
+    (CCCRangeDataNtfControllerExp, (0x1001, EnumCCCRangeStatus(0), 12, 3, 0, 0, [])),
+]
+
+
+def measure_memory(cls, args, count: int) -> float:
+    ''' @return bytes per record, the records are kept alive like an analysis window '''
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [cls(*args) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list itself holds one pointer per record
+    return (after - before - sys.getsizeof(records)) / count
+
+
+def measure_construction(cls, args, count: int) -> float:
+    ''' @return seconds per record '''
+    start = time.perf_counter()
+    for _ in range(count):
+        cls(*args)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"{count} records per case")
+    print(f"{'record':<30}{'bytes (dict)':>14}{'bytes (slots)':>15}{'ns (dict)':>11}{'ns (slots)':>12}")
+    for cls, args in RECORDS:
+        dict_cls = without_slots(cls)
+        print(f"{cls.__name__:<30}"
+              f"{measure_memory(dict_cls, args, count):>14.1f}"
+              f"{measure_memory(cls, args, count):>15.1f}"
+              f"{measure_construction(dict_cls, args, count) * 1e9:>11.0f}"
+              f"{measure_construction(cls, args, count) * 1e9:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: ranging throughput suite without hardware: parsers, CRC, app config encoding and the end-to-end
+       wait_response() path over UciSimulatorDevice and UciReplayDevice, 1-64 controlees, short/extended
+       MAC addresses, logging on/off. Reports ops/s, p50/p99 latency, CPU% and allocated bytes.
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from console_helper import *
+import nxp_crc
+from uci_defs import *
+from uci_layer import *
+from uci_fira_range_ntf import FiraRangeDataNtf
+from uci_ccc_range_ntf import CCCRangeDataNtfControlee, CCCRangeDataNtfControllerExp
+from uci_simulator import *
+from uci_record_replay import *
+from FiRaRangingDevice import *
+from CCCRangingDevice import *
+
+CONTROLEE_COUNTS = [1, 8, 16, 32, 64]
+MAC_ADDR_MODES = [
+    ("short", EnumFiraMacAddrMode.FIRA_MAC_ADDR_MODE_SHORT_SHORT.value),
+    ("extended", EnumFiraMacAddrMode.FIRA_MAC_ADDR_MODE_LONG_LONG.value),
+]
+# frames per replay capture, replayed in a loop
+REPLAY_CAPTURE_FRAMES = 2000
+
+FIRA_SESSION_ID = 0x12345678
+CCC_SESSION_ID = 0x00002000
+
+
+def percentile(values: list[int], p: float) -> int:
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def allocated_bytes_per_op(func, count: int) -> float:
+    '''
+        @brief tracemalloc peak above the start of each call, in a pass of its own (tracemalloc slows the calls down).
+               CPython has no allocation counter in release builds, the bytes allocated per call stand in for it.
+    '''
+    count = max(1, min(count, 500))
+    tracemalloc.start()
+    total = 0
+    for _ in range(count):
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        total += max(peak - start, 0)
+    tracemalloc.stop()
+    return total / count
+
+
+def measure(name: str, func, count: int) -> dict:
+    '''
+        @brief time count calls of func()
+        @return ops/s, p50/p99 in us, CPU% of one core, allocated KB/call and MB/s
+    '''
+    for _ in range(min(count // 10, 1000)):
+        func()
+    latencies = []
+    perf_counter_ns = time.perf_counter_ns
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(count):
+        start = perf_counter_ns()
+        func()
+        latencies.append(perf_counter_ns() - start)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    latencies.sort()
+    ops = count / wall
+    alloc = allocated_bytes_per_op(func, count)
+    return {"case": name,
+            "ops_per_s": ops,
+            "p50_us": percentile(latencies, 0.5) / 1000,
+            "p99_us": percentile(latencies, 0.99) / 1000,
+            "cpu_percent": cpu / wall * 100,
+            "alloc_kb_per_op": alloc / 1024,
+            "alloc_mb_per_s": alloc * ops / 1e6}
+
+
+def print_header(title: str):
+    print(f"\n{title}")
+    print(f"{'case':<60}{'ops/s':>10}{'p50 us':>9}{'p99 us':>9}{'CPU%':>6}{'KB/op':>8}{'MB/s':>8}")
+
+
+def print_result(result: dict):
+    print(f"{result['case']:<60}{result['ops_per_s']:>10.0f}{result['p50_us']:>9.1f}{result['p99_us']:>9.1f}"
+          f"{result['cpu_percent']:>6.0f}{result['alloc_kb_per_op']:>8.2f}{result['alloc_mb_per_s']:>8.1f}")
+
+
+def set_logging(enable: bool, handler: logging.Handler):
+    '''
+        @brief logging on: the INFO records of the range notifications are formatted and written to os.devnull
+    '''
+    logger = logging.getLogger("uwbzero")
+    if enable:
+        set_log_level(LOG_LEVEL_INFO)
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
+    else:
+        set_log_level(LOG_LEVEL_WARNING)
+        logger.removeHandler(handler)
+
+
+def fira_session_param(controlee_count: int, mac_addr_mode: int) -> FiRaSessionParam:
+    param = FiRaSessionParam(session_id=FIRA_SESSION_ID, device_type=1, device_role=1, device_addr=0x0001, anchor_num=controlee_count)
+    param.mac_address_mode = mac_addr_mode
+    param.set_dst_addresses([0x1000 + i for i in range(1, controlee_count + 1)])
+    return param
+
+
+def ccc_session_param(controlee_count: int) -> CCCSessionParam:
+    return CCCSessionParam(CCC_SESSION_ID, EnumCCCDeviceType.CCC_DEVICE_TYPE_CONTROLLER.value,
+                           EnumCCCDeviceRole.CCC_DEVICE_ROLE_INITIATOR.value, controlee_count)
+
+
+def start_fira_device(device, controlee_count: int, mac_addr_mode: int) -> FiRaRangingDevice:
+    ranging_device = FiRaRangingDevice(device, mac_addr=0x0001)
+    param = fira_session_param(controlee_count, mac_addr_mode)
+    ranging_device.fira_session_init(param)
+    ranging_device.fira_session_set_app_config(param.session_id)
+    ranging_device.fira_session_range_start(param.session_id)
+    return ranging_device
+
+
+def start_ccc_device(device, controlee_count: int) -> CCCRangingDevice:
+    ranging_device = CCCRangingDevice(device, mac_addr=0x0001)
+    param = ccc_session_param(controlee_count)
+    ranging_device.ccc_session_init(param)
+    ranging_device.ccc_session_set_app_config(param.session_id)
+    ranging_device.ccc_session_range_start(param.session_id)
+    return ranging_device
+
+
+def capture_range_message(ranging_device: UCILayer, oid: EnumUwbRangeOid) -> bytes:
+    '''
+        @return the next range notification as one reassembled UCI message
+    '''
+    while True:
+        result = ranging_device.receive_message(200)
+        if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_OK and result.msg_buffer[1] & 0x3F == oid.value \
+                and (result.msg_buffer[0] >> 5) == EnumUciMessageType.UCI_MT_NOTIFICATION.value:
+            return bytes(result.msg_buffer)
+
+
+def micro_cases(count: int) -> list[dict]:
+    results = []
+    print_header("parsers, CRC, app config encoding")
+    for controlee_count in CONTROLEE_COUNTS:
+        for mac_name, mac_addr_mode in MAC_ADDR_MODES:
+            simulator = UciSimulatorDevice(realtime=False, responder_count=controlee_count)
+            message = capture_range_message(start_fira_device(simulator, controlee_count, mac_addr_mode), EnumUwbRangeOid.RANGE_START_OID)
+            frame = memoryview(message)
+            payload = message[4:]
+            layer = UCILayer(simulator)
+            layer.register_notification_callback(EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_START_OID.value, uci_uwb_range_data_ntf_callback)
+            fast_layer = UCILayer(simulator)
+            fast_layer.register_notification_callback(EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_START_OID.value, uci_uwb_range_data_ntf_callback)
+            fast_layer.enable_fast_dispatch()
+            suffix = f"{controlee_count} controlee(s), {mac_name}"
+            for name, func in [
+                (f"UciMessage.from_bytes, {suffix}", lambda: UciMessage.from_bytes(frame)),
+                (f"FiraRangeDataNtf.from_bytes, {suffix}", lambda: FiraRangeDataNtf.from_bytes(payload)),
+                (f"UCILayer.dispatch_message, {suffix}", lambda: layer.dispatch_message(message)),
+                (f"UCILayer.dispatch_message fast, {suffix}", lambda: fast_layer.dispatch_message(message)),
+                (f"nxp_crc.calculate_crc {len(message)} B, {suffix}", lambda: nxp_crc.calculate_crc(message)),
+            ]:
+                results.append(measure(name, func, count))
+                print_result(results[-1])
+    for controlee_count in CONTROLEE_COUNTS:
+        simulator = UciSimulatorDevice(realtime=False, responder_count=controlee_count, ccc_role=EnumSimulatorCccRole.CCC_CONTROLLER)
+        payload = capture_range_message(start_ccc_device(simulator, controlee_count), EnumUwbRangeOid.RANGE_CCC_DATA_NTF_EXP_OID)[4:]
+        results.append(measure(f"CCCRangeDataNtfControllerExp, {controlee_count} controlee(s)", lambda: CCCRangeDataNtfControllerExp.from_bytes(payload), count))
+        print_result(results[-1])
+    simulator = UciSimulatorDevice(realtime=False, ccc_role=EnumSimulatorCccRole.CCC_CONTROLEE)
+    payload = capture_range_message(start_ccc_device(simulator, 1), EnumUwbRangeOid.RANGE_CCC_DATA_NTF_OID)[4:]
+    results.append(measure("CCCRangeDataNtfControlee", lambda: CCCRangeDataNtfControlee.from_bytes(payload), count))
+    print_result(results[-1])
+    for controlee_count in (1, 64):
+        fira_param = fira_session_param(controlee_count, MAC_ADDR_MODES[0][1])
+        results.append(measure(f"FiRaSessionParam.get_app_config_tlv, {controlee_count} controlee(s)", fira_param.get_app_config_tlv, count))
+        print_result(results[-1])
+    ccc_param = ccc_session_param(1)
+    results.append(measure("CCCSessionParam.get_app_config_tlv", ccc_param.get_app_config_tlv, count))
+    print_result(results[-1])
+    return results
+
+
+def record_capture(path, controlee_count: int, mac_addr_mode: int):
+    '''
+        @brief capture of a simulated FiRa session: bring-up and REPLAY_CAPTURE_FRAMES range notifications
+    '''
+    device = UciRecordingDevice(UciSimulatorDevice(realtime=False, responder_count=controlee_count), path)
+    ranging_device = start_fira_device(device, controlee_count, mac_addr_mode)
+    while device.record_count < REPLAY_CAPTURE_FRAMES:
+        ranging_device.wait_response(timeout_ms=200)
+    device.close()
+
+
+def end_to_end_cases(count: int, rate_hz, log_handler: logging.Handler) -> list[dict]:
+    results = []
+    transport = "simulator" if rate_hz is None else f"simulator @{rate_hz:g} Hz"
+    print_header(f"end to end: FiRaRangingDevice.wait_response(), {transport} / replay")
+    with tempfile.TemporaryDirectory() as directory:
+        for controlee_count in CONTROLEE_COUNTS:
+            for mac_name, mac_addr_mode in MAC_ADDR_MODES:
+                set_logging(False, log_handler)
+                simulator = UciSimulatorDevice(realtime=rate_hz is not None, ntf_rate_hz=rate_hz, responder_count=controlee_count)
+                simulated_device = start_fira_device(simulator, controlee_count, mac_addr_mode)
+                path = os.path.join(directory, f"fira_{controlee_count}_{mac_name}.ucicap")
+                record_capture(path, controlee_count, mac_addr_mode)
+                replay_device = FiRaRangingDevice(UciReplayDevice(path, realtime=False, loop=True), mac_addr=0x0001)
+                replay_device.register_notification_callback(EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_START_OID.value, uci_uwb_range_data_ntf_callback)
+                for logging_enabled in (False, True):
+                    set_logging(logging_enabled, log_handler)
+                    suffix = f"{controlee_count} controlee(s), {mac_name}, log {'on' if logging_enabled else 'off'}"
+                    for name, ranging_device in [(f"simulator, {suffix}", simulated_device), (f"replay, {suffix}", replay_device)]:
+                        results.append(measure(name, lambda: ranging_device.wait_response(timeout_ms=500), count))
+                        print_result(results[-1])
+    set_logging(False, log_handler)
+    return results
+
+
+def main():
+    '''
+        python benchmarks/bench_ranging_suite.py [count] [--rate=HZ] [--json=baseline.json] [--e2e-only]
+          --rate: pace the simulator (realtime) instead of as fast as possible, CPU% at a given notification rate
+          --json: save the results, to compare the runs against a baseline
+    '''
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = dict(arg[2:].split("=", 1) if "=" in arg else (arg[2:], "") for arg in sys.argv[1:] if arg.startswith("--"))
+    count = int(args[0]) if len(args) > 0 else 5000
+    rate_hz = float(options["rate"]) if "rate" in options else None
+    set_console_output(False)
+    log_handler = logging.StreamHandler(open(os.devnull, "w"))
+    set_logging(False, log_handler)
+    print(f"{count} calls per case, python {sys.version.split()[0]}")
+    results = []
+    if "e2e-only" not in options:
+        results += micro_cases(count)
+    results += end_to_end_cases(count if rate_hz is None else min(count, int(rate_hz * 2)), rate_hz, log_handler)
+    if options.get("json"):
+        with open(options["json"], "w") as f:
+            json.dump({"count": count, "rate_hz": rate_hz, "python": sys.version, "results": results}, f, indent=1)
+        print(f"\nresults saved to {options['json']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: frames/s and read latency of the FT4222 receive path, 1.25-40 MHz:
+       header+payload vs speculative single transfer, GPIO CS_N vs hardware SS0
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+import sys
+import time
+
+from nxp_ft4222h import *
+from forthink_uwb_dongle import *
+from uci_defs import *
+
+# the SPI clocks supported by Ft4222hDevice.get_spi_clock_divider()
+SPI_CLOCKS_HZ = [1.25e06, 2.5e06, 5e06, 1.0e07, 2.0e07, 4.0e07]
+
+# read mode, speculative length
+READ_MODES = [
+    ("header + payload", EnumSpiReadMode.SPI_READ_HEADER_PAYLOAD, None),
+    ("speculative, adaptive", EnumSpiReadMode.SPI_READ_SPECULATIVE, None),
+    ("speculative, 64 bytes", EnumSpiReadMode.SPI_READ_SPECULATIVE, 64),
+    ("speculative, max frame", EnumSpiReadMode.SPI_READ_SPECULATIVE, SPI_MAX_FRAME_LENGTH),
+]
+
+# the hardware SS0 needs SS0O wired to the chip select, pass "--hw-ss" to include it
+CS_MODES = [
+    ("GPIO CS_N", EnumSpiCsMode.SPI_CS_GPIO),
+    ("HW SS0", EnumSpiCsMode.SPI_CS_HW_SS0),
+]
+
+# short and long responses, no session nor license needed
+COMMANDS = [
+    ("CORE_GET_DEVICE_INFO", EnumCoreGenericOid.CORE_DEVICE_INFO_OID),
+    ("CORE_GET_CAPS_INFO", EnumCoreGenericOid.CORE_GET_CAPS_INFO_OID),
+]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def measure(device: Ft4222hDevice, command: list[int], count: int) -> list[float]:
+    '''
+        @return seconds per read_uci_frame(), from INT_N asserted to the frame returned
+    '''
+    latencies = []
+    for _ in range(count):
+        device.transmit_uci_command(command)
+        if device.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, False, timeout_ms=200) != EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+            continue
+        start = time.perf_counter()
+        result = device.read_uci_frame(timeout_ms=200, crc_enable=False)
+        if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if len(args) > 0 else 500
+    cs_modes = CS_MODES if "--hw-ss" in sys.argv else CS_MODES[:1]
+    dongle_list = scan_uwb_dongle_devices()
+    if len(dongle_list) == 0:
+        sys.exit("No UWB dongle devices found. Aborting benchmark...")
+    device = dongle_list[0]
+    print(f"{count} frames per case")
+    for clock in SPI_CLOCKS_HZ:
+        device.open(spi_frequency_hz=clock, mode=EnumFtdiSpiMode.FTDI_SPI_MODE_SINGLE)
+        device.hard_reset()
+        # drop the DEVICE_STATUS_NTF of the reset
+        device.receive_uci_message(timeout_ms=200, crc_enable=False)
+        print(f"\nSPI clock: {clock / 1e6:g} MHz")
+        print(f"{'command':<22}{'chip select':<12}{'read mode':<26}{'frames/s':>10}{'p50 us':>10}{'p99 us':>10}{'1 transfer':>12}")
+        for command_name, oid in COMMANDS:
+            command = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.CORE_GENERIC_GID.value, 0, oid.value, 0, []).to_byte_stream()
+            for cs_name, cs_mode in cs_modes:
+                device.set_spi_cs_mode(cs_mode)
+                for mode_name, mode, speculative_length in READ_MODES:
+                    device.set_spi_read_mode(mode, speculative_length)
+                    latencies = measure(device, command, count)
+                    if len(latencies) == 0:
+                        print(f"{command_name:<22}{cs_name:<12}{mode_name:<26}  no response")
+                        continue
+                    hits = f"{device.spi_speculative_hit_count / max(device.spi_read_count, 1) * 100:.0f}%" if mode == EnumSpiReadMode.SPI_READ_SPECULATIVE else "-"
+                    print(f"{command_name:<22}{cs_name:<12}{mode_name:<26}{len(latencies) / sum(latencies):>10.0f}"
+                          f"{percentile(latencies, 0.5) * 1e6:>10.0f}{percentile(latencies, 0.99) * 1e6:>10.0f}{hits:>12}")
+        device.set_spi_cs_mode(EnumSpiCsMode.SPI_CS_GPIO)
+        device.set_spi_read_mode(EnumSpiReadMode.SPI_READ_HEADER_PAYLOAD)
+        device.close()
+
+
+if __name__ == '__main__':
+    main()
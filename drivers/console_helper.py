@@ -10,29 +10,87 @@
 """
 
 import colorama 
-import traceback
+import logging
+import sys
 
 from math import ceil
 
 colorama.init()
 
-def log_i(info):
-    print(colorama.Fore.GREEN + '[dbg/I] '+ info + colorama.Fore.RESET)
+# the log_* helpers go through the standard logging module, logger "uwbzero":
+# the message is only formatted (lazy %-style args) and the caller located when the level is enabled
+LOG_LEVEL_DEBUG = logging.DEBUG
+LOG_LEVEL_INFO = logging.INFO
+LOG_LEVEL_PRINT = logging.INFO + 5
+LOG_LEVEL_WARNING = logging.WARNING
+LOG_LEVEL_ERROR = logging.ERROR
+LOG_LEVEL_SILENT = logging.CRITICAL + 10
 
-def log_d(info):
-    print(colorama.Fore.CYAN + '[dbg/D] ' + info + colorama.Fore.RESET)
+logging.addLevelName(LOG_LEVEL_PRINT, "PRINT")
 
-def log_w(warn):
-    print(colorama.Fore.YELLOW + '[dbg/W] ' + warn + colorama.Fore.RESET)
+class ColoramaFormatter(logging.Formatter):
+    '''
+        the former console format: [dbg/X] message, colored by level, errors prefixed with file:line of the caller
+    '''
+    LEVEL_STYLES = {
+        LOG_LEVEL_DEBUG: (colorama.Fore.CYAN, '[dbg/D] '),
+        LOG_LEVEL_INFO: (colorama.Fore.GREEN, '[dbg/I] '),
+        LOG_LEVEL_PRINT: (colorama.Fore.WHITE, '[dbg/P] '),
+        LOG_LEVEL_WARNING: (colorama.Fore.YELLOW, '[dbg/W] '),
+        LOG_LEVEL_ERROR: (colorama.Fore.RED, '[dbg/E] '),
+    }
+
+    def format(self, record):
+        color, prefix = self.LEVEL_STYLES.get(record.levelno, (colorama.Fore.RED, '[dbg/E] '))
+        msg = record.getMessage()
+        if record.levelno >= LOG_LEVEL_ERROR:
+            msg = f"{record.pathname}:{record.lineno} {msg}"
+        return color + prefix + msg + colorama.Fore.RESET
+
+logger = logging.getLogger("uwbzero")
+logger.setLevel(LOG_LEVEL_DEBUG)
+logger.propagate = False
+console_handler = logging.StreamHandler(sys.stdout)
+console_handler.setFormatter(ColoramaFormatter())
+logger.addHandler(console_handler)
+
+def set_log_level(level: int):
+    '''
+        @brief e.g. set_log_level(LOG_LEVEL_WARNING) in production, the per-frame callback logs are then not formatted at all
+    '''
+    logger.setLevel(level)
+
+def is_log_enabled(level: int) -> bool:
+    ''' guard for the log messages which are expensive to build '''
+    return logger.isEnabledFor(level)
+
+def set_console_output(enable: bool):
+    '''
+        @brief False: remove the colored console handler, the records propagate to the handlers of the application
+               (logging.basicConfig, files, JSON formatters...)
+    '''
+    if enable:
+        if console_handler not in logger.handlers:
+            logger.addHandler(console_handler)
+        logger.propagate = False
+    else:
+        logger.removeHandler(console_handler)
+        logger.propagate = True
+
+def log_i(info, *args):
+    logger.info(info, *args, stacklevel=2)
+
+def log_d(info, *args):
+    logger.debug(info, *args, stacklevel=2)
+
+def log_w(warn, *args):
+    logger.warning(warn, *args, stacklevel=2)
 
-def log_p(lg):
-    print(colorama.Fore.WHITE + '[dbg/P] ' + lg + colorama.Fore.RESET)
+def log_p(lg, *args):
+    logger.log(LOG_LEVEL_PRINT, lg, *args, stacklevel=2)
 
-def log_e(err):
-    frame_info = traceback.extract_stack()[-2]
-    filename = frame_info.filename
-    lineno = frame_info.lineno
-    print(colorama.Fore.RED + f'[dbg/E] {filename}:{lineno} {err}' + colorama.Fore.RESET)
+def log_e(err, *args):
+    logger.error(err, *args, stacklevel=2)
 
 
 def as_hex(input: int | list[int] | list[list[int]], uppercase = True, prepend_bytes: int = 0) -> str:
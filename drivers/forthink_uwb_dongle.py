@@ -8,8 +8,15 @@
 @copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
                        All rights reserved
 """
+import heapq
+import itertools
+import threading
+import time
+
 from nxp_ft4222h import *
 from console_helper import *
+from uci_defs import *
+from uci_message import UWBSessionState
 
 def print_forthink_logo():
     print('')                                                                                    
@@ -37,7 +44,7 @@ def scan_uwb_dongle_devices() -> list[Ft4222hDevice]:
         return ft4222_device_list
 
     #print all devices
-    log_i("Detected " + str(len(ftdi_device_locations)) + " FTDI device(s): " + str(ftdi_device_locations))
+    log_i("Detected %d FTDI device(s): %s", len(ftdi_device_locations), ftdi_device_locations)
 
     for idx in range(len(ftdi_device_locations)):
         device_location = ftdi_device_locations[idx]
@@ -53,6 +60,167 @@ class forthink_uwb_dongle():
         self.UID = uid
         if is_ncj29d5 == False:
             self.ft4222_device.is_ncj29d5 = False
-        
-    
-    
\ No newline at end of file
+
+
+class UwbDongleNotification():
+    '''
+        one notification of the merged stream of UwbDongleManager
+    '''
+    __slots__ = ("timestamp", "dongle_index", "result")
+
+    def __init__(self, timestamp: float, dongle_index: int, result):
+        self.timestamp = timestamp          # host time.monotonic() when read from the device (UCILayer.rx_timestamp)
+        self.dongle_index = dongle_index
+        self.result = result                # UciRspNtfResult
+
+
+class UwbDongleManager():
+    '''
+        Runs every dongle in its own worker thread (the FT4222 calls release the GIL) and merges the notifications of
+        all the dongles into one stream ordered by the host time their frame was read from the device. The parsing,
+        the callbacks and the thread scheduling can delay a notification after that read, so a notification is only
+        released once it is reorder_window_ms old: a worker scheduled late cannot reorder the stream.
+
+        setup(index, ft4222_device) runs on the worker thread: open the device, build the CCCRangingDevice/FiRaRangingDevice,
+        bring up the sessions and return the ranging device. teardown(index, ranging_device) runs on the same thread at stop().
+        Meanwhile the worker receives for the ranging device: the responses complete the commands submitted by other threads
+        (ranging_device.wait_for(ranging_device.submit(...))), the SESSION_STATUS_NTFs update ranging_device.session_states.
+
+        def setup(index, ft4222_device):
+            ft4222_device.open(spi_frequency_hz=1e07, mode=EnumFtdiSpiMode.FTDI_SPI_MODE_SINGLE)
+            ranging_device = FiRaRangingDevice(ft4222_device, mac_addr=0x0001 + index)
+            ...
+            return ranging_device
+
+        manager = UwbDongleManager(setup)
+        manager.start()
+        for ntf in manager.notifications():
+            print(ntf.dongle_index, ntf.result.uci_result)
+    '''
+
+    def __init__(self, setup, teardown=None, devices: list = None, reorder_window_ms=20, poll_ms=50, max_pending=8192):
+        '''
+            @param devices: the UCIDevice of the dongles, None for scan_uwb_dongle_devices()
+            @param max_pending: notifications kept for the consumer, the oldest are dropped beyond (dropped_count)
+        '''
+        self.setup = setup
+        self.teardown = teardown
+        self.devices = devices if devices is not None else scan_uwb_dongle_devices()
+        self.reorder_window = reorder_window_ms / 1000
+        self.poll_ms = poll_ms
+        self.max_pending = max_pending
+        self.ranging_devices = [None] * len(self.devices)
+        self.worker_errors = [None] * len(self.devices)
+        self.workers = []
+        self.stop_event = threading.Event()
+        # heap of (timestamp, sequence, UwbDongleNotification), the sequence keeps the order of equal timestamps
+        self.pending = []
+        self.pending_condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.active_workers = 0
+        self.last_released = 0.0
+        self.dropped_count = 0
+        self.late_count = 0
+
+    def __len__(self):
+        return len(self.devices)
+
+    def start(self):
+        self.stop_event.clear()
+        self.active_workers = len(self.devices)
+        for index, device in enumerate(self.devices):
+            worker = threading.Thread(target=self.worker_loop, args=(index, device), name=f"uwb-dongle-{index}", daemon=True)
+            self.workers.append(worker)
+            worker.start()
+        log_i("UWB dongle manager: %d worker(s) started", len(self.devices))
+
+    def stop(self, timeout_s=2.0):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout_s)
+        self.workers = []
+        with self.pending_condition:
+            self.pending_condition.notify_all()
+
+    def worker_loop(self, index: int, device):
+        ranging_device = None
+        try:
+            ranging_device = self.setup(index, device)
+            self.ranging_devices[index] = ranging_device
+            ranging_device.rx_in_background = True
+            while not self.stop_event.is_set():
+                result = ranging_device.poll_message(self.poll_ms)
+                if result is None:
+                    continue
+                if result.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
+                    if not ranging_device.complete_pending_command(result):
+                        with ranging_device.rx_condition:
+                            ranging_device.rsp_queue.append(result)
+                            ranging_device.rx_condition.notify_all()
+                elif result.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
+                    if isinstance(result.uci_result, UWBSessionState):
+                        ranging_device.update_session_state(result.uci_result)
+                    self.push(UwbDongleNotification(ranging_device.rx_timestamp, index, result))
+        except Exception as e:
+            self.worker_errors[index] = e
+            log_e("UWB dongle %d: worker stopped: %s", index, e)
+        finally:
+            if ranging_device is not None:
+                # teardown polls the device itself
+                ranging_device.rx_in_background = False
+            if ranging_device is not None and self.teardown is not None:
+                try:
+                    self.teardown(index, ranging_device)
+                except Exception as e:
+                    log_e("UWB dongle %d: teardown failed: %s", index, e)
+            with self.pending_condition:
+                self.active_workers -= 1
+                self.pending_condition.notify_all()
+
+    def push(self, notification: UwbDongleNotification):
+        with self.pending_condition:
+            heapq.heappush(self.pending, (notification.timestamp, next(self.sequence), notification))
+            if len(self.pending) > self.max_pending:
+                heapq.heappop(self.pending)
+                self.dropped_count += 1
+            self.pending_condition.notify()
+
+    def get(self, timeout_ms=None) -> UwbDongleNotification:
+        '''
+            @brief next notification of the merged stream
+            @param timeout_ms: None waits until a notification is released or all the workers are stopped
+            @return UwbDongleNotification, None on timeout or when the stream is finished
+        '''
+        deadline = None if timeout_ms is None else time.monotonic() + timeout_ms / 1000
+        with self.pending_condition:
+            while True:
+                now = time.monotonic()
+                wait_s = None
+                if len(self.pending) > 0:
+                    release_at = self.pending[0][0] + self.reorder_window
+                    # nothing more can arrive once the workers are stopped
+                    if release_at <= now or self.active_workers == 0:
+                        notification = heapq.heappop(self.pending)[2]
+                        if notification.timestamp < self.last_released:
+                            self.late_count += 1
+                        else:
+                            self.last_released = notification.timestamp
+                        return notification
+                    wait_s = release_at - now
+                elif self.active_workers == 0:
+                    return None
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait_s = deadline - now if wait_s is None else min(wait_s, deadline - now)
+                self.pending_condition.wait(wait_s)
+
+    def notifications(self):
+        '''
+            @brief generator of the merged stream, ends when the workers are stopped and the stream is drained
+        '''
+        while True:
+            notification = self.get()
+            if notification is None:
+                return
+            yield notification
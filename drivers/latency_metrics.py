@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: latency histograms of the UCI round trips, per stage and GID/OID, exported as dict or Prometheus text
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+import threading
+from enum import Enum
+
+# log-linear buckets, 2^LATENCY_SUB_BUCKET_BITS buckets per power of two: < 1.6% relative error
+LATENCY_SUB_BUCKET_BITS = 6
+LATENCY_SUB_BUCKET_COUNT = 1 << LATENCY_SUB_BUCKET_BITS
+
+# quantiles of the Prometheus summaries
+LATENCY_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class EnumLatencyStage(Enum):
+    # Ft4222hDevice
+    TX_RDY_WAIT = "tx_rdy_wait"         # transmit_uci_command -> RDY_N low: pending frame read-ahead, CS_N, RDY_N handshake
+    TX_SPI = "tx_spi"                   # SPI transfer of the command
+    RSP_INT_WAIT = "rsp_int_wait"       # command transmitted -> INT_N low for its response, the firmware time
+    RX_SPI = "rx_spi"                   # INT_N low -> frame read: CS_N, SPI transfer(s), INT_N release
+    # UCILayer
+    PARSE = "parse"                     # UciMessage.from_bytes
+    CALLBACK = "callback"               # response/notification callback (payload decoding)
+    ROUND_TRIP = "round_trip"           # send_command -> response dispatched
+
+
+class LatencyHistogram():
+    '''
+        HDR-style histogram of durations in ns: exact below 128 ns, then 64 log-linear buckets per power of two,
+        constant memory and O(1) record whatever the range.
+    '''
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    @staticmethod
+    def bucket_index(value_ns: int) -> int:
+        shift = value_ns.bit_length() - LATENCY_SUB_BUCKET_BITS - 1
+        if shift <= 0:
+            return value_ns
+        return (shift << LATENCY_SUB_BUCKET_BITS) + (value_ns >> shift)
+
+    @staticmethod
+    def bucket_value(index: int) -> int:
+        '''
+            @return the middle of the bucket in ns
+        '''
+        if index < 2 * LATENCY_SUB_BUCKET_COUNT:
+            return index
+        shift = (index >> LATENCY_SUB_BUCKET_BITS) - 1
+        lower = ((index & (LATENCY_SUB_BUCKET_COUNT - 1)) + LATENCY_SUB_BUCKET_COUNT) << shift
+        return lower + (1 << (shift - 1))
+
+    def record(self, value_ns: int):
+        value_ns = max(int(value_ns), 0)
+        index = self.bucket_index(value_ns)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if self.min_ns is None or value_ns < self.min_ns:
+            self.min_ns = value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def percentile(self, p: float) -> int:
+        '''
+            @param p: 0.0 - 1.0
+            @return ns, 0 if empty
+        '''
+        if self.count == 0:
+            return 0
+        rank = max(1, int(p * self.count + 0.5))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(max(self.bucket_value(index), self.min_ns), self.max_ns)
+        return self.max_ns
+
+    def mean(self) -> float:
+        return self.total_ns / self.count if self.count > 0 else 0.0
+
+    def merge(self, other):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.total_ns += other.total_ns
+        if other.min_ns is not None and (self.min_ns is None or other.min_ns < self.min_ns):
+            self.min_ns = other.min_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def to_dict(self) -> dict:
+        ''' durations in us '''
+        result = {"count": self.count,
+                  "min_us": (self.min_ns or 0) / 1000,
+                  "mean_us": self.mean() / 1000,
+                  "max_us": self.max_ns / 1000}
+        for q in LATENCY_QUANTILES:
+            result[f"p{q * 100:g}_us"] = self.percentile(q) / 1000
+        return result
+
+
+class UciLatencyMetrics():
+    '''
+        Registry of LatencyHistogram per (stage, GID, OID), shared by the UCILayer and its device.
+
+        metrics = UciLatencyMetrics()
+        ranging_device.set_latency_metrics(metrics)     # UCILayer, passed on to Ft4222hDevice
+        ...
+        print(metrics.to_dict())
+        open("uci.prom", "w").write(metrics.to_prometheus())
+    '''
+
+    def __init__(self):
+        self.histograms = {}            # (EnumLatencyStage, gid, oid) -> LatencyHistogram
+        # the reader thread and the command thread record concurrently
+        self.lock = threading.Lock()
+
+    def record(self, stage: EnumLatencyStage, gid: int, oid: int, duration_ns: int):
+        key = (stage, gid, oid)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(duration_ns)
+
+    def get(self, stage: EnumLatencyStage, gid: int, oid: int) -> LatencyHistogram:
+        return self.histograms.get((stage, gid, oid))
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def to_dict(self) -> dict:
+        '''
+            @return {stage: {"gid/oid": {count, min_us, mean_us, max_us, p50_us, ...}}}
+        '''
+        result = {}
+        with self.lock:
+            for (stage, gid, oid), histogram in sorted(self.histograms.items(), key=lambda item: (item[0][0].value, item[0][1], item[0][2])):
+                result.setdefault(stage.value, {})[f"{gid:#x}/{oid:#x}"] = histogram.to_dict()
+        return result
+
+    def to_prometheus(self, prefix="uwbzero_uci") -> str:
+        '''
+            @return Prometheus text exposition, one summary per stage labelled by gid/oid, in seconds
+        '''
+        lines = []
+        with self.lock:
+            stages = sorted({key[0] for key in self.histograms}, key=lambda stage: stage.value)
+            for stage in stages:
+                name = f"{prefix}_{stage.value}_seconds"
+                lines.append(f"# TYPE {name} summary")
+                for (key_stage, gid, oid), histogram in sorted(self.histograms.items(), key=lambda item: (item[0][1], item[0][2])):
+                    if key_stage != stage:
+                        continue
+                    labels = f'gid="{gid:#x}",oid="{oid:#x}"'
+                    for q in LATENCY_QUANTILES:
+                        lines.append(f'{name}{{{labels},quantile="{q:g}"}} {histogram.percentile(q) / 1e9:.9f}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.total_ns / 1e9:.9f}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
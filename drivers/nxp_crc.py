@@ -9,14 +9,38 @@
                        All rights reserved
 """
 
-import crcengine
+import binascii
 
-def calculate_crc(frame: list[int]) -> int:
-    ''' Calculate crc as int based on list of input bytes '''
-    crc = crcengine.new('crc16-xmodem').calculate(frame)
+CRC16_XMODEM_POLY = 0x1021
+
+def make_crc16_xmodem_table() -> list[int]:
+    ''' CRC16-XMODEM (poly 0x1021, init 0, no reflection) lookup table, one entry per byte value '''
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ CRC16_XMODEM_POLY) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+# precomputed once at import
+CRC16_XMODEM_TABLE = make_crc16_xmodem_table()
+
+def calculate_crc_table(frame, crc: int = 0) -> int:
+    ''' Table driven CRC16-XMODEM in pure python, reference of calculate_crc '''
+    table = CRC16_XMODEM_TABLE
+    for byte in frame:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
     return crc
 
-def is_crc_valid(frame: list[int], received_crc: int) -> bool:
+def calculate_crc(frame, crc: int = 0) -> int:
+    ''' Calculate crc as int based on the input bytes (bytes, bytearray, memoryview or list[int]) '''
+    if isinstance(frame, list):
+        frame = bytes(frame)
+    # binascii.crc_hqx is the CRC16-XMODEM computed in C, no table/engine to build per frame
+    return binascii.crc_hqx(frame, crc)
+
+def is_crc_valid(frame, received_crc: int) -> bool:
     ''' Check if received crc (int) matches received frame '''
     actual_crc = calculate_crc(frame)
     return actual_crc == received_crc
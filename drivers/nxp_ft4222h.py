@@ -1,15 +1,33 @@
 import ft4222
 import time
+from collections import deque
 from enum import IntEnum
 
 import nxp_crc
 from uci_port import *
+from latency_metrics import *
 
 class EnumFtdiGpio(IntEnum):
     FTDI_GPIO_RDY_N = 0
     FTDI_GPIO_INT_N = 1
     FTDI_GPIO_RST_N = 2
 
+class EnumGpioWaitMode(IntEnum):
+    GPIO_WAIT_BUSY_POLL = 0     # poll the GPIO back-to-back, lowest latency, one core at 100%
+    GPIO_WAIT_ADAPTIVE = 1      # short busy poll, then sleep with exponential back-off, near zero CPU when idle
+
+class EnumSpiReadMode(IntEnum):
+    SPI_READ_HEADER_PAYLOAD = 0     # header transfer, then payload + CRC transfer: two USB round trips per frame
+    SPI_READ_SPECULATIVE = 1        # one block transfer sized for the expected frame, a second one only for the remainder
+
+class EnumSpiCsMode(IntEnum):
+    SPI_CS_GPIO = 0         # CS_N driven through the GPIO interface around every transfer
+    SPI_CS_HW_SS0 = 1       # receive path: the SPI master drives SS0 itself, no GPIO write per frame
+
+# NCJ29D5 dummy byte + header + 255 bytes payload + CRC16
+SPI_MAX_FRAME_LENGTH = 1 + 4 + 255 + 2
+SPI_MIN_SPECULATIVE_LENGTH = 16
+
 class EnumFtdiSpiMode(IntEnum):
     FTDI_SPI_MODE_SINGLE = 0
     FTDI_SPI_MODE_QUAD = 0
@@ -41,11 +59,29 @@ class Ft4222hDevice(UCIDevice):
     ftdi_gpio_interface = object
     device_index = b''
     device_location = 0
+    # RDY_N/INT_N wait strategy, see set_gpio_wait_mode()
+    gpio_wait_mode = EnumGpioWaitMode.GPIO_WAIT_ADAPTIVE
+    gpio_spin_time_us = 500
+    gpio_min_sleep_us = 50
+    gpio_max_sleep_us = 2000
+    # receive transfer strategy, see set_spi_read_mode()
+    spi_read_mode = EnumSpiReadMode.SPI_READ_HEADER_PAYLOAD
+    spi_speculative_length = None       # None: adaptive, the length of the last frame
+    spi_last_frame_length = 32
+    spi_read_count = 0
+    spi_speculative_hit_count = 0
+    # chip select of the receive path, see set_spi_cs_mode()
+    spi_cs_mode = EnumSpiCsMode.SPI_CS_GPIO
+    # optional UciLatencyMetrics, see set_latency_metrics()
+    latency_metrics = None
+    last_tx_gid_oid = None
+    last_tx_end_ns = 0
 
     def __init__(self, index, device_location, bD5=True) -> None:
         self.device_index = index
         self.device_location = device_location
         self.is_ncj29d5 = bD5
+        self.pending_rx_messages = deque()
 
     #opens the initialized device based on input parameters and the pre-initialized device_location
     def open(self, spi_frequency_hz=1e07, mode=EnumFtdiSpiMode.FTDI_SPI_MODE_SINGLE):
@@ -126,6 +162,11 @@ class Ft4222hDevice(UCIDevice):
     def set_cs_n(self, gpio_level: bool) -> None:
         self.ftdi_gpio_interface.gpio_Write(ft4222.Port.P2, value=gpio_level)
 
+    def set_rx_cs_n(self, gpio_level: bool) -> None:
+        # with the hardware slave select, SS0 follows the SPI transactions of the receive path
+        if self.spi_cs_mode == EnumSpiCsMode.SPI_CS_GPIO:
+            self.set_cs_n(gpio_level)
+
     def hard_reset(self) -> None:
         #put RST_N to low
         self.set_rst_n(False)
@@ -135,6 +176,64 @@ class Ft4222hDevice(UCIDevice):
         self.set_rst_n(True)
         time.sleep(0.1)
 
+    def set_gpio_wait_mode(self, mode: EnumGpioWaitMode, spin_time_us=500, max_sleep_us=2000) -> None:
+        '''
+        @brief Select how RDY_N/INT_N are waited for, trade latency against CPU usage
+        @param mode: GPIO_WAIT_BUSY_POLL, read the GPIO back-to-back (lowest latency, keeps one core busy)
+                     GPIO_WAIT_ADAPTIVE, busy poll for spin_time_us, then sleep between reads with exponential back-off
+        @param spin_time_us: busy poll window before the first sleep, covers the short RDY_N handshake
+        @param max_sleep_us: upper limit of the back-off sleep, the worst-case extra latency when idle
+        '''
+        self.gpio_wait_mode = mode
+        self.gpio_spin_time_us = spin_time_us
+        self.gpio_max_sleep_us = max(max_sleep_us, self.gpio_min_sleep_us)
+
+    def set_latency_metrics(self, metrics: UciLatencyMetrics) -> None:
+        '''
+        @brief record the RDY_N wait, the SPI transfers and the INT_N wait of the responses per GID/OID, None to stop
+        '''
+        self.latency_metrics = metrics
+        self.last_tx_gid_oid = None
+
+    def record_rx_latency(self, uci_frame, int_ns: int) -> None:
+        metrics = self.latency_metrics
+        if metrics is None or int_ns == 0 or len(uci_frame) < 2:
+            return
+        gid = uci_frame[0] & 0x0F
+        oid = uci_frame[1] & 0x3F
+        metrics.record(EnumLatencyStage.RX_SPI, gid, oid, time.perf_counter_ns() - int_ns)
+        # the response of the last command: time spent in the firmware
+        if (uci_frame[0] >> 5) == 0x02 and self.last_tx_gid_oid == (gid, oid):
+            metrics.record(EnumLatencyStage.RSP_INT_WAIT, gid, oid, int_ns - self.last_tx_end_ns)
+            self.last_tx_gid_oid = None
+
+    def set_spi_cs_mode(self, mode: EnumSpiCsMode) -> None:
+        '''
+        @brief Select the chip select of the receive path
+        @param mode: SPI_CS_GPIO, CS_N written through the GPIO interface before and after the frame (two USB transactions)
+                     SPI_CS_HW_SS0, the SS0 mapped by spiMaster_Init is asserted for the SPI transactions of the frame,
+                     needs a board with SS0O wired to the chip select of the UWB chip.
+                     The commands keep the GPIO CS_N: the RDY_N handshake needs the chip selected before any clock.
+                     In SPI_READ_SPECULATIVE the frame must fit one transaction, a full SPI_MAX_FRAME_LENGTH block is read.
+        '''
+        self.spi_cs_mode = mode
+
+    def set_spi_read_mode(self, mode: EnumSpiReadMode, speculative_length=None) -> None:
+        '''
+        @brief Select how a received frame is clocked in
+        @param mode: SPI_READ_HEADER_PAYLOAD, read the header, then the payload + CRC (two USB round trips)
+                     SPI_READ_SPECULATIVE, read speculative_length bytes in one transfer and the remainder only when the
+                     frame is longer. The frame is delimited by CS_N/INT_N, the extra bytes clocked in are discarded.
+        @param speculative_length: bytes of the first transfer (dummy byte, header, payload, CRC),
+                     None to use the length of the previous frame (the range notifications of a session repeat their size)
+        '''
+        self.spi_read_mode = mode
+        if speculative_length is not None:
+            speculative_length = min(max(speculative_length, SPI_MIN_SPECULATIVE_LENGTH), SPI_MAX_FRAME_LENGTH)
+        self.spi_speculative_length = speculative_length
+        self.spi_read_count = 0
+        self.spi_speculative_hit_count = 0
+
     def wait_for_gpio(self, pin: EnumFtdiGpio, gpio_level: bool, timeout_ms=0):
             if pin == EnumFtdiGpio.FTDI_GPIO_RDY_N:
                 poll_function = self.get_rdy_n
@@ -143,20 +242,32 @@ class Ft4222hDevice(UCIDevice):
             else:
                 return EnumUCIPortStatus.UCI_PORT_STATUS_ERR_BAD_PARAM
 
-            current_gpio_level = poll_function()
             start = time.perf_counter()
-            timeout_sec = timeout_ms / 1000
+            deadline = start + timeout_ms / 1000
+            # the FT4222 can not block on a GPIO edge, so back off between the USB reads when the line stays idle
+            is_adaptive = self.gpio_wait_mode == EnumGpioWaitMode.GPIO_WAIT_ADAPTIVE
+            spin_deadline = start + self.gpio_spin_time_us / 1e6
+            sleep_sec = self.gpio_min_sleep_us / 1e6
+            max_sleep_sec = self.gpio_max_sleep_us / 1e6
             while (True):
+                now = time.perf_counter()
                 if timeout_ms != 0:
-                    delta = start + timeout_sec - time.perf_counter()
+                    delta = deadline - now
                     if (delta <= 0):
                         return EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT
-           
+                if is_adaptive and now >= spin_deadline:
+                    if timeout_ms != 0:
+                        time.sleep(min(sleep_sec, delta))
+                    else:
+                        time.sleep(sleep_sec)
+                    sleep_sec = min(sleep_sec * 2, max_sleep_sec)
+
                 current_gpio_level = poll_function()
                 if (current_gpio_level == gpio_level):
                     return EnumUCIPortStatus.UCI_PORT_STATUS_OK
 
     def transmit_uci_command(self, input_command, append_crc=False, timeout_ms=0) -> UCIPortResult:
+        start_ns = time.perf_counter_ns() if self.latency_metrics is not None else 0
         command = list(input_command)
         target_miso_bytes = []
         status = EnumUCIPortStatus.UCI_PORT_STATUS_UNDEF
@@ -179,9 +290,11 @@ class Ft4222hDevice(UCIDevice):
         #check if INT_N is asserted before sending the command. If yes, read the response first
         int_n_level = self.get_int_n()
         if int_n_level is False:
-            result = self.receive_uci_message(timeout_ms)
+            result = self.read_uci_frame(timeout_ms, crc_enable=False)
             if result.status is EnumUCIPortStatus.UCI_PORT_STATUS_OK:
                 status = EnumUCIPortStatus.UCI_PORT_STATUS_RECEIVED_PENDING_MSG
+                #keep the message, the next receive_uci_message() returns it instead of dropping it
+                self.pending_rx_messages.append(result)
             #response read, wait for INT_N to go high
             self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, True, timeout_ms=10)
         
@@ -191,32 +304,77 @@ class Ft4222hDevice(UCIDevice):
         status = self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_RDY_N, False, timeout_ms)
         if status is not EnumUCIPortStatus.UCI_PORT_STATUS_OK:
             return UCIPortResult(status, list(target_miso_bytes), is_crc_valid)
+        rdy_ns = time.perf_counter_ns() if start_ns != 0 else 0
         #clock out the data to the device over SPI (SCLK + MOSI lines)
         # target_miso_bytes is the data returned by the device over MISO line during command transmission
         target_miso_bytes = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data = bytes(command), isEndTransaction=True)
         #put CS_N to high to stop transmission
         self.set_cs_n(True)
+        if start_ns != 0 and self.latency_metrics is not None:
+            gid = command[0] & 0x0F
+            oid = command[1] & 0x3F
+            self.last_tx_end_ns = time.perf_counter_ns()
+            self.latency_metrics.record(EnumLatencyStage.TX_RDY_WAIT, gid, oid, rdy_ns - start_ns)
+            self.latency_metrics.record(EnumLatencyStage.TX_SPI, gid, oid, self.last_tx_end_ns - rdy_ns)
+            # the last segment of a command gets the response
+            self.last_tx_gid_oid = (gid, oid) if (command[0] & 0x10) == 0 else None
         status = EnumUCIPortStatus.UCI_PORT_STATUS_OK
         return UCIPortResult(status, list(target_miso_bytes), is_crc_valid)
 
+    def wait_uci_message(self, timeout_ms, bus_lock) -> bool:
+        '''
+            @brief poll INT_N like wait_for_gpio(), bus_lock is held for each USB read only and released while sleeping,
+                   a command of another thread waits at most one GPIO read instead of the whole timeout
+        '''
+        start = time.perf_counter()
+        deadline = start + timeout_ms / 1000
+        sleep_sec = self.gpio_min_sleep_us / 1e6
+        max_sleep_sec = self.gpio_max_sleep_us / 1e6
+        while (True):
+            with bus_lock:
+                if len(self.pending_rx_messages) > 0 or self.get_int_n() is False:
+                    return True
+            now = time.perf_counter()
+            if timeout_ms != 0:
+                delta = deadline - now
+                if (delta <= 0):
+                    return False
+                time.sleep(min(sleep_sec, delta))
+            else:
+                time.sleep(sleep_sec)
+            # no busy poll here: the other threads need the lock between the reads
+            if self.gpio_wait_mode == EnumGpioWaitMode.GPIO_WAIT_ADAPTIVE:
+                sleep_sec = min(sleep_sec * 2, max_sleep_sec)
+
     def receive_uci_message(self, timeout_ms=400, crc_enable=True) -> UCIPortResult:
-        uci_frame = []
+        #a message read ahead of a command transmission is delivered first
+        if len(self.pending_rx_messages) > 0:
+            return self.pending_rx_messages.popleft()
+        return self.read_uci_frame(timeout_ms, crc_enable)
+
+    def read_uci_frame(self, timeout_ms=400, crc_enable=True) -> UCIPortResult:
+        uci_frame = b""
         is_crc_valid = False
         status = EnumUCIPortStatus.UCI_PORT_STATUS_UNDEF
         #wait for INT_N to go low
         status = self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, False, timeout_ms)
         if status is not EnumUCIPortStatus.UCI_PORT_STATUS_OK:
-            return UCIPortResult(status, list(uci_frame), is_crc_valid)
+            return UCIPortResult(status, uci_frame, is_crc_valid)
+        int_ns = time.perf_counter_ns() if self.latency_metrics is not None else 0
         #put CS_N to low to start transmission
-        self.set_cs_n(gpio_level=False)
+        self.set_rx_cs_n(gpio_level=False)
         
+        if self.spi_read_mode == EnumSpiReadMode.SPI_READ_SPECULATIVE:
+            return self.read_uci_frame_speculative(timeout_ms, crc_enable, int_ns)
+
         if self.is_ncj29d5 == True:
             #first get the uci header (host clocks out 4 zeroes over SPI (SCLK + MOSI lines))
             # NCJ29D5 UCI, contains one invalid byte
             header = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data = bytes([0x00] * 5), isEndTransaction=False)
             if header is None or len(header) < 5:
+                self.set_rx_cs_n(gpio_level=True)
                 status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL
-                return UCIPortResult(status, list(uci_frame), is_crc_valid)
+                return UCIPortResult(status, uci_frame, is_crc_valid)
             #identify payload length to receive (two bytes)
             payload_length = header[4] +  (header[3] << 8)
             #get the rest of the payload plus 2 extra bytes of CRC-16
@@ -229,8 +387,9 @@ class Ft4222hDevice(UCIDevice):
             # NCJ29D6 UCI, no invalid byte
             header = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data=bytes([0x00] * 4), isEndTransaction=False)
             if header is None or len(header) < 4:
+                self.set_rx_cs_n(gpio_level=True)
                 status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL
-                return UCIPortResult(status, list(uci_frame), is_crc_valid)
+                return UCIPortResult(status, uci_frame, is_crc_valid)
             # identify payload length to receive (two bytes)
             payload_length = header[3] + (header[2] << 8)
             if crc_enable == True:
@@ -240,24 +399,70 @@ class Ft4222hDevice(UCIDevice):
         
         #wait for INT_N to go high: Tx done from Slave
         status = self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, True, timeout_ms)
+        #put CS_N to high to stop transmission, also on timeout
+        self.set_rx_cs_n(gpio_level=True)
         if status is not EnumUCIPortStatus.UCI_PORT_STATUS_OK:
-            return UCIPortResult(status, list(uci_frame), is_crc_valid)
-        #put CS_N to high to stop transmission
-        self.set_cs_n(gpio_level=True)
+            return UCIPortResult(status, uci_frame, is_crc_valid)
         #assemble the UCI frame
         if payload is None:
             status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL
-            return UCIPortResult(status, list(uci_frame), is_crc_valid)
+            return UCIPortResult(status, uci_frame, is_crc_valid)
         
+        #one bytes object from here to the parsers, which only get memoryview slices of it
         if self.is_ncj29d5 == True:
-            uci_frame = header[1:] + payload
+            uci_frame = b"".join((memoryview(header)[1:], payload))
         else:
             uci_frame = header + payload
+        self.record_rx_latency(uci_frame, int_ns)
         
         if crc_enable == True:
             #get the CRC16 from the received frame
             received_crc = uci_frame[-2] | (uci_frame[-1] << 8)
             #validate the CRC16
-            is_crc_valid = nxp_crc.is_crc_valid(uci_frame[:-2], received_crc)
+            is_crc_valid = nxp_crc.is_crc_valid(memoryview(uci_frame)[:-2], received_crc)
         status = EnumUCIPortStatus.UCI_PORT_STATUS_OK
-        return UCIPortResult(status, list(uci_frame), is_crc_valid)
+        return UCIPortResult(status, uci_frame, is_crc_valid)
+
+    def read_uci_frame_speculative(self, timeout_ms=400, crc_enable=True, int_ns=0) -> UCIPortResult:
+        '''
+        @brief SPI_READ_SPECULATIVE receive, called with INT_N asserted and CS_N low
+        '''
+        uci_frame = b""
+        is_crc_valid = False
+        # NCJ29D5 UCI, contains one invalid byte before the header
+        header_offset = 1 if self.is_ncj29d5 == True else 0
+        crc_length = 2 if crc_enable == True else 0
+        read_length = self.spi_speculative_length if self.spi_speculative_length is not None else self.spi_last_frame_length
+        if self.spi_cs_mode == EnumSpiCsMode.SPI_CS_HW_SS0:
+            # SS0 is released at the end of the transaction, a remainder transfer would split the frame
+            read_length = SPI_MAX_FRAME_LENGTH
+        block = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data=bytes(read_length), isEndTransaction=True)
+        if block is None or len(block) < header_offset + 4:
+            self.set_rx_cs_n(gpio_level=True)
+            return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL, uci_frame, is_crc_valid)
+        payload_length = block[header_offset + 3] + (block[header_offset + 2] << 8)
+        frame_length = header_offset + 4 + payload_length + crc_length
+        self.spi_read_count += 1
+        if frame_length > len(block):
+            remainder = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data=bytes(frame_length - len(block)), isEndTransaction=True)
+            if remainder is None or len(remainder) < frame_length - len(block):
+                self.set_rx_cs_n(gpio_level=True)
+                return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL, uci_frame, is_crc_valid)
+            block = block + remainder
+        else:
+            self.spi_speculative_hit_count += 1
+        self.spi_last_frame_length = max(frame_length, SPI_MIN_SPECULATIVE_LENGTH)
+
+        #wait for INT_N to go high: Tx done from Slave
+        status = self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, True, timeout_ms)
+        #put CS_N to high to stop transmission, also on timeout: the next frame starts with a CS_N falling edge
+        self.set_rx_cs_n(gpio_level=True)
+        if status is not EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+            return UCIPortResult(status, uci_frame, is_crc_valid)
+
+        uci_frame = block[header_offset:frame_length]
+        self.record_rx_latency(uci_frame, int_ns)
+        if crc_enable == True:
+            received_crc = uci_frame[-2] | (uci_frame[-1] << 8)
+            is_crc_valid = nxp_crc.is_crc_valid(memoryview(uci_frame)[:-2], received_crc)
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, uci_frame, is_crc_valid)
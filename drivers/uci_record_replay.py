@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: record the UCI traffic of a UCIDevice into a binary capture and replay it without hardware
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+import struct
+import threading
+import time
+from enum import IntEnum
+
+from console_helper import *
+from uci_port import *
+
+# capture file: magic + version, then one record per frame
+UCI_CAPTURE_MAGIC = b"UCICAP"
+UCI_CAPTURE_VERSION = 1
+UCI_CAPTURE_FILE_HEADER = struct.Struct("<6sHd")     # magic, version, time.time() of the first record
+# seconds since the first record (time.monotonic()), direction, flags, frame length
+UCI_CAPTURE_RECORD_HEADER = struct.Struct("<dBBH")
+
+UCI_CAPTURE_FLAG_CRC_VALID = 0x01
+
+
+class EnumUciCaptureDirection(IntEnum):
+    UCI_CAPTURE_TX = 0x00       # command transmitted by the host
+    UCI_CAPTURE_RX = 0x01       # response/notification received from the device
+
+
+class UciCaptureRecord():
+    __slots__ = ("timestamp", "direction", "flags", "frame")
+
+    def __init__(self, timestamp: float, direction: EnumUciCaptureDirection, flags: int, frame: bytes):
+        self.timestamp = timestamp
+        self.direction = direction
+        self.flags = flags
+        self.frame = frame
+
+
+def iter_uci_capture(path):
+    '''
+        @brief read the records of a capture file
+        @return generator of UciCaptureRecord
+    '''
+    with open(path, "rb") as f:
+        header = f.read(UCI_CAPTURE_FILE_HEADER.size)
+        if len(header) < UCI_CAPTURE_FILE_HEADER.size:
+            raise ValueError(f"{path}: not a UCI capture file")
+        magic, version, _ = UCI_CAPTURE_FILE_HEADER.unpack(header)
+        if magic != UCI_CAPTURE_MAGIC or version != UCI_CAPTURE_VERSION:
+            raise ValueError(f"{path}: not a UCI capture file (version {UCI_CAPTURE_VERSION})")
+        while True:
+            record_header = f.read(UCI_CAPTURE_RECORD_HEADER.size)
+            if len(record_header) < UCI_CAPTURE_RECORD_HEADER.size:
+                return
+            timestamp, direction, flags, length = UCI_CAPTURE_RECORD_HEADER.unpack(record_header)
+            frame = f.read(length)
+            if len(frame) < length:
+                log_w("UCI capture %s: truncated last record", path)
+                return
+            yield UciCaptureRecord(timestamp, EnumUciCaptureDirection(direction), flags, frame)
+
+
+class UciRecordingDevice(UCIDevice):
+    '''
+        Wraps any UCIDevice and appends every transmitted command and every received frame to a capture file,
+        the timeouts are not recorded. The attributes of the wrapped device stay reachable (e.g. open(spi_frequency_hz=...)).
+
+        device = UciRecordingDevice(dongle.ft4222_device, "field.ucicap")
+        ranging_device = FiRaRangingDevice(device, mac_addr=0x0001)
+        ...
+        device.close()
+    '''
+
+    def __init__(self, device: UCIDevice, path):
+        super().__init__(device, device.device_type)
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(UCI_CAPTURE_FILE_HEADER.pack(UCI_CAPTURE_MAGIC, UCI_CAPTURE_VERSION, time.time()))
+        self.start_time = time.monotonic()
+        # transmit and receive can run on different threads (UCILayer.start_reader)
+        self.file_lock = threading.Lock()
+        self.record_count = 0
+
+    def __getattr__(self, name):
+        # only called for the attributes not found on the wrapper
+        return getattr(self.device, name)
+
+    @property
+    def device_status(self):
+        return self.device.device_status
+
+    @device_status.setter
+    def device_status(self, status):
+        # set by UCIDevice.__init__, the status belongs to the wrapped device
+        pass
+
+    def record(self, direction: EnumUciCaptureDirection, frame, crc_valid=False):
+        frame = bytes(frame)
+        flags = UCI_CAPTURE_FLAG_CRC_VALID if crc_valid else 0
+        with self.file_lock:
+            if self.file is None:
+                return
+            self.file.write(UCI_CAPTURE_RECORD_HEADER.pack(time.monotonic() - self.start_time, direction, flags, len(frame)))
+            self.file.write(frame)
+            self.record_count += 1
+
+    def open(self, *args, **kwargs):
+        return self.device.open(*args, **kwargs)
+
+    def close(self):
+        with self.file_lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        log_i("UCI capture %s: %d records", self.path, self.record_count)
+        return self.device.close()
+
+    def hard_reset(self):
+        return self.device.hard_reset()
+
+    def transmit_uci_command(self, msg, append_crc=False, timeout_ms=0) -> UCIPortResult:
+        result = self.device.transmit_uci_command(msg, append_crc, timeout_ms)
+        if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+            self.record(EnumUciCaptureDirection.UCI_CAPTURE_TX, msg)
+        return result
+
+    def receive_uci_message(self, timeout_ms=200, crc_enabled=False) -> UCIPortResult:
+        result = self.device.receive_uci_message(timeout_ms, crc_enabled)
+        if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+            self.record(EnumUciCaptureDirection.UCI_CAPTURE_RX, result.msg_buffer, result.is_crc_valid)
+        return result
+
+    def wait_uci_message(self, timeout_ms, bus_lock) -> bool:
+        return self.device.wait_uci_message(timeout_ms, bus_lock)
+
+
+class UciReplayDevice(UCIDevice):
+    '''
+        UCIDevice feeding the received frames of a capture file back to UCILayer.wait_response().
+        The transmitted commands are accepted and ignored, the capture drives the conversation.
+
+          realtime=True:  the frames keep the spacing of the capture (speed scales it)
+          realtime=False: the frames are returned as fast as the host reads, to profile the parsing/positioning pipeline
+
+        At the end of the capture receive_uci_message() returns UCI_PORT_STATUS_ERR_TIMEOUT (or starts over with loop=True).
+    '''
+
+    def __init__(self, path, realtime=True, speed=1.0, loop=False):
+        super().__init__(None, EnumUCIPortType.UCI_INTF_ABSTRACT)
+        self.path = path
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+        # the whole capture is loaded, a replay must not be slowed down by the file reads
+        self.rx_records = [record for record in iter_uci_capture(path) if record.direction == EnumUciCaptureDirection.UCI_CAPTURE_RX]
+        self.rx_index = 0
+        self.replay_start = None        # monotonic time of the first frame of the current pass
+        self.first_timestamp = self.rx_records[0].timestamp if len(self.rx_records) > 0 else 0.0
+        self.tx_count = 0
+
+    def __len__(self):
+        return len(self.rx_records)
+
+    def open(self):
+        self.device_status = EnumUCIDeviceStatus.UCI_DEVICE_STATUS_OPEN
+        return self
+
+    def close(self):
+        self.device_status = EnumUCIDeviceStatus.UCI_DEVICE_STATUS_CLOSED
+        return True
+
+    def hard_reset(self):
+        self.rewind()
+
+    def rewind(self):
+        self.rx_index = 0
+        self.replay_start = None
+
+    def transmit_uci_command(self, msg, append_crc=False, timeout_ms=0) -> UCIPortResult:
+        self.tx_count += 1
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, b"", False)
+
+    def wait_uci_message(self, timeout_ms, bus_lock=None) -> bool:
+        '''
+            @brief sleep until the next frame is due, the replay is read by one thread only and takes no lock
+        '''
+        if self.rx_index >= len(self.rx_records):
+            # receive_uci_message() reports the end of the capture (or starts over)
+            return True
+        if not self.realtime:
+            return True
+        now = time.monotonic()
+        if self.replay_start is None:
+            self.replay_start = now
+        due = self.replay_start + (self.rx_records[self.rx_index].timestamp - self.first_timestamp) / self.speed
+        if due <= now:
+            return True
+        if timeout_ms > 0 and due - now > timeout_ms / 1000:
+            time.sleep(timeout_ms / 1000)
+            return False
+        time.sleep(due - now)
+        return True
+
+    def receive_uci_message(self, timeout_ms=200, crc_enabled=False) -> UCIPortResult:
+        if self.rx_index >= len(self.rx_records):
+            if not self.loop or len(self.rx_records) == 0:
+                if self.realtime and timeout_ms > 0:
+                    time.sleep(timeout_ms / 1000)
+                return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT, b"", False)
+            self.rewind()
+        record = self.rx_records[self.rx_index]
+        if self.realtime:
+            now = time.monotonic()
+            if self.replay_start is None:
+                self.replay_start = now
+            due = self.replay_start + (record.timestamp - self.first_timestamp) / self.speed
+            if due > now:
+                if timeout_ms > 0 and due - now > timeout_ms / 1000:
+                    time.sleep(timeout_ms / 1000)
+                    return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT, b"", False)
+                time.sleep(due - now)
+        self.rx_index += 1
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, record.frame, bool(record.flags & UCI_CAPTURE_FLAG_CRC_VALID))
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: pure software UCI device, emulates the UCI MAC of a NCJ29D5/SR150 dongle in-process
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+import math
+import random
+import struct
+import threading
+import time
+from collections import deque
+from enum import IntEnum
+
+import nxp_crc
+from console_helper import *
+from uci_port import *
+from uci_defs import *
+from uci_fira_range_ntf import FIRA_RANGE_DATA_NTF_HEADER, FIRA_TWR_RESULT_SHORT, FIRA_TWR_RESULT_EXTENDED
+
+# CCC range data NTF layouts, see uci_ccc_range_ntf.py
+CCC_RANGE_DATA_NTF_CONTROLEE = struct.Struct("<IBIHHBB8s")
+CCC_RANGE_DATA_NTF_CONTROLLER_EXP_HEADER = struct.Struct("<IIHBBI")
+CCC_RESPONDER_RESULT = struct.Struct("<BH")
+
+
+class EnumSimulatorCccRole(IntEnum):
+    CCC_CONTROLEE = 0
+    CCC_CONTROLLER = 1
+
+
+class UciSimulatorSession():
+    '''
+        state of one emulated UWB session
+    '''
+
+    def __init__(self, session_id: int, session_type: int):
+        self.session_id = session_id
+        self.session_type = session_type
+        self.state = EnumSessionState.SESSION_STATE_INIT
+        self.app_config = {}       # tag -> bytes
+        self.seq_num = 0
+        self.ranging_count = 0
+        self.next_due = 0.0
+
+    def get_config_int(self, tag: EnumSessionAppConfigID, default: int) -> int:
+        value = self.app_config.get(tag.value)
+        if value is None or len(value) == 0:
+            return default
+        return int.from_bytes(value, 'little')
+
+    def ranging_interval_ms(self) -> int:
+        return self.get_config_int(EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL, 200)
+
+    def mac_addr_mode(self) -> int:
+        return self.get_config_int(EnumSessionAppConfigID.PARAM_ID_MAC_ADDRESS_MODE, 0)
+
+    def responder_addresses(self, responder_count=None) -> list[int]:
+        '''
+            @brief DST_MAC_ADDRESS list of the app config, else NO_OF_CONTROLEE generated addresses
+        '''
+        addr_size = 8 if self.mac_addr_mode() > 0 else 2
+        value = self.app_config.get(EnumSessionAppConfigID.PARAM_ID_DST_MAC_ADDRESS.value)
+        if responder_count is None and value is not None and len(value) >= addr_size:
+            return [int.from_bytes(value[i:i + addr_size], 'little') for i in range(0, len(value) - addr_size + 1, addr_size)]
+        if responder_count is None:
+            responder_count = self.get_config_int(EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE, 1)
+        return [0x1000 + i for i in range(1, responder_count + 1)]
+
+
+class UciSimulatorDevice(UCIDevice):
+    '''
+        UCIDevice without hardware: answers the CORE/SESSION/RANGE commands, follows the session state machine
+        (INIT -> IDLE -> ACTIVE -> IDLE -> DEINIT) and emits synthetic FiRa RANGE_DATA_NTF / CCC range notifications
+        for the active sessions.
+
+        The notifications are generated in receive_uci_message(), no thread:
+          realtime=True:  one notification per session every ranging interval (or 1/ntf_rate_hz)
+          realtime=False: a notification whenever the receive queue is empty, as fast as the host reads (throughput tests)
+
+        device = UciSimulatorDevice(responder_count=4, realtime=False)
+        ranging_device = FiRaRangingDevice(device, 0x0001)
+    '''
+
+    def __init__(self, realtime=True, ntf_rate_hz=None, responder_count=None, distance_model=None,
+                 error_rate=0.0, ccc_role=EnumSimulatorCccRole.CCC_CONTROLEE, seed=0):
+        '''
+            @param realtime: pace the notifications like the hardware, False for as-fast-as-possible
+            @param ntf_rate_hz: notifications per second per session, None for the RANGING_INTERVAL of the app config
+            @param responder_count: responders per FiRa notification, None for the DST_MAC_ADDRESS/NO_OF_CONTROLEE app config
+            @param distance_model: func(session_id, mac_address, seq_num) -> distance in cm, None for a slow sine per responder
+            @param error_rate: share of the measurements reported with UCI_STATUS_RANGING_RX_TIMEOUT
+            @param ccc_role: CCC_CONTROLEE emits RANGE_CCC_DATA_NTF, CCC_CONTROLLER the Forthink expanded controller NTF
+        '''
+        super().__init__(None, EnumUCIPortType.UCI_INTF_ABSTRACT)
+        self.realtime = realtime
+        self.ntf_rate_hz = ntf_rate_hz
+        self.responder_count = responder_count
+        self.distance_model = distance_model if distance_model is not None else self.default_distance
+        self.error_rate = error_rate
+        self.ccc_role = ccc_role
+        self.random = random.Random(seed)
+        self.sessions = {}          # Dict[int, UciSimulatorSession]
+        self.rx_queue = deque()
+        self.rx_condition = threading.Condition()
+        self.serial_num = "5a1a0001"
+        self.tx_count = 0
+        # payloads of a segmented command received so far
+        self.tx_segments = bytearray()
+        self.ntf_count = 0
+
+    def open(self):
+        self.device_status = EnumUCIDeviceStatus.UCI_DEVICE_STATUS_OPEN
+        return self
+
+    def close(self):
+        self.device_status = EnumUCIDeviceStatus.UCI_DEVICE_STATUS_CLOSED
+        return True
+
+    def hard_reset(self):
+        with self.rx_condition:
+            self.sessions.clear()
+            self.rx_queue.clear()
+        self.push_message(EnumUciMessageType.UCI_MT_NOTIFICATION, EnumUciGid.CORE_GENERIC_GID, EnumCoreGenericOid.CORE_DEVICE_STATUS_NTF_OID,
+                          [EnumDeviceState.DEVICE_STATE_READY.value])
+
+    @staticmethod
+    def default_distance(session_id, mac_address, seq_num) -> int:
+        return int(300 + 200 * math.sin(seq_num * 0.05 + (mac_address & 0xFF)))
+
+    def push_message(self, message_type: EnumUciMessageType, gid: int, oid: int, payload):
+        '''
+            @brief queue a message for receive_uci_message(), segmented (PBF) like the firmware above 255 bytes
+        '''
+        payload = bytes(payload)
+        with self.rx_condition:
+            offset = 0
+            while True:
+                segment = payload[offset:offset + UCI_MAX_CONTROL_PACKET_PAYLOAD]
+                offset += len(segment)
+                packet_boundary_flag = 1 if offset < len(payload) else 0
+                self.rx_queue.append(bytes(((message_type.value << 5) | (packet_boundary_flag << 4) | int(gid), int(oid), 0, len(segment))) + segment)
+                if packet_boundary_flag == 0:
+                    break
+            self.rx_condition.notify_all()
+
+    def push_response(self, gid: int, oid: int, payload):
+        self.push_message(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, payload)
+
+    def push_session_status(self, session: UciSimulatorSession, state: EnumSessionState):
+        session.state = state
+        self.push_message(EnumUciMessageType.UCI_MT_NOTIFICATION, EnumUciGid.UWB_SESSION_GID, EnumUwbSessionOid.SESSION_STATUS_NTF_OID,
+                          struct.pack("<IBB", session.session_id, state.value,
+                                      EnumSessionStateChangeReason.STATE_CHANGE_WITH_SESSION_MANAGEMENT_CMD.value))
+
+    def transmit_uci_command(self, msg, append_crc=False, timeout_ms=0) -> UCIPortResult:
+        msg = bytes(msg)
+        if len(msg) < 4 or len(msg) > 4 + UCI_MAX_CONTROL_PACKET_PAYLOAD:
+            return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_BAD_PARAM, b"", False)
+        gid = msg[0] & 0x0F
+        oid = msg[1] & 0x3F
+        self.tx_count += 1
+        if msg[0] & 0x10:
+            # more segments to come, the command is handled with its last packet
+            self.tx_segments += msg[4:4 + msg[3]]
+            return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, b"", False)
+        payload = bytes(self.tx_segments) + msg[4:4 + msg[3]]
+        self.tx_segments.clear()
+        with self.rx_condition:
+            if gid == EnumUciGid.CORE_GENERIC_GID:
+                self.handle_core_command(oid, payload)
+            elif gid == EnumUciGid.UWB_SESSION_GID:
+                self.handle_session_command(oid, payload)
+            elif gid == EnumUciGid.UWB_RANGE_GID:
+                self.handle_range_command(oid, payload)
+            elif gid == EnumUciGid.FORTHINK_VENDOR_GID:
+                self.handle_vendor_command(oid, payload)
+            else:
+                self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_UNKNOWN_GID.value])
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, b"", False)
+
+    def handle_core_command(self, oid: int, payload: bytes):
+        gid = EnumUciGid.CORE_GENERIC_GID
+        if oid == EnumCoreGenericOid.CORE_DEVICE_RESET_OID:
+            self.sessions.clear()
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value])
+            self.push_message(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, EnumCoreGenericOid.CORE_DEVICE_STATUS_NTF_OID,
+                              [EnumDeviceState.DEVICE_STATE_READY.value])
+        elif oid == EnumCoreGenericOid.CORE_DEVICE_INFO_OID:
+            # status, UCI generic 1.1, MAC 1.3, PHY 1.3, UCI test 1.0, no vendor info
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value, 1, 1, 1, 3, 1, 3, 1, 0, 0])
+        elif oid in (EnumCoreGenericOid.CORE_GET_CAPS_INFO_OID, EnumCoreGenericOid.CORE_SET_CONFIG_OID, EnumCoreGenericOid.CORE_GET_CONFIG_OID):
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value, 0])
+        else:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_UNKNOWN_OID.value])
+
+    def handle_session_command(self, oid: int, payload: bytes):
+        gid = EnumUciGid.UWB_SESSION_GID
+        if oid == EnumUwbSessionOid.SESSION_GET_COUNT_OID:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value, len(self.sessions)])
+            return
+        if oid == EnumUwbSessionOid.SESSION_GET_POSSIBLE_RAN_MULTIPLIER_VALUE_OID:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value, 1])
+            return
+        if len(payload) < 4:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_SYNTAX_ERROR.value])
+            return
+        session_id = struct.unpack_from("<I", payload, 0)[0]
+        session = self.sessions.get(session_id)
+        if oid == EnumUwbSessionOid.SESSION_INIT_OID:
+            if session is not None:
+                self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_ERROR_SESSION_DUPLICATE.value])
+                return
+            session = UciSimulatorSession(session_id, payload[4] if len(payload) > 4 else 0)
+            self.sessions[session_id] = session
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value])
+            self.push_session_status(session, EnumSessionState.SESSION_STATE_INIT)
+            return
+        if session is None:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_ERROR_SESSION_NOT_EXIST.value, 0])
+            return
+        if oid == EnumUwbSessionOid.SESSION_DEINIT_OID:
+            del self.sessions[session_id]
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value])
+            self.push_session_status(session, EnumSessionState.SESSION_STATE_DEINIT)
+        elif oid == EnumUwbSessionOid.SESSION_SET_APP_CONFIG_OID:
+            num = payload[4] if len(payload) > 4 else 0
+            idx = 5
+            for i in range(num):
+                if idx + 2 > len(payload):
+                    break
+                tag, length = payload[idx], payload[idx + 1]
+                session.app_config[tag] = payload[idx + 2:idx + 2 + length]
+                idx += 2 + length
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value, 0])
+            if session.state == EnumSessionState.SESSION_STATE_INIT:
+                self.push_session_status(session, EnumSessionState.SESSION_STATE_IDLE)
+        elif oid == EnumUwbSessionOid.SESSION_GET_APP_CONFIG_OID:
+            num = payload[4] if len(payload) > 4 else 0
+            tags = list(payload[5:5 + num]) if num > 0 else list(session.app_config.keys())
+            buf = [EnumUciStatus.UCI_STATUS_OK.value, 0]
+            for tag in tags:
+                if tag in session.app_config:
+                    value = session.app_config[tag]
+                    buf += [tag, len(value)] + list(value)
+                    buf[1] += 1
+            self.push_response(gid, oid, buf)
+        elif oid == EnumUwbSessionOid.SESSION_GET_STATE_OID:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value, session.state.value])
+        elif oid == EnumUwbSessionOid.SESSION_UPDATE_CONTROLLER_MULTICAST_LIST_OID:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value])
+        else:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_UNKNOWN_OID.value])
+
+    def handle_range_command(self, oid: int, payload: bytes):
+        gid = EnumUciGid.UWB_RANGE_GID
+        session = None
+        if len(payload) >= 4:
+            session = self.sessions.get(struct.unpack_from("<I", payload, 0)[0])
+        if oid not in (EnumUwbRangeOid.RANGE_START_OID, EnumUwbRangeOid.RANGE_STOP_OID,
+                       EnumUwbRangeOid.RANGE_GET_RANGING_COUNT_OID, EnumUwbRangeOid.RANGE_RESUME_OID):
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_UNKNOWN_OID.value])
+            return
+        if session is None:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_ERROR_SESSION_NOT_EXIST.value])
+            return
+        if oid == EnumUwbRangeOid.RANGE_START_OID or oid == EnumUwbRangeOid.RANGE_RESUME_OID:
+            if session.state == EnumSessionState.SESSION_STATE_ACTIVE:
+                self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_ERROR_SESSION_ACTIVE.value])
+            elif session.state != EnumSessionState.SESSION_STATE_IDLE:
+                self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_ERROR_SESSION_NOT_CONFIGURED.value])
+            else:
+                self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value])
+                self.push_session_status(session, EnumSessionState.SESSION_STATE_ACTIVE)
+                session.next_due = time.monotonic() + self.session_interval(session)
+        elif oid == EnumUwbRangeOid.RANGE_STOP_OID:
+            if session.state != EnumSessionState.SESSION_STATE_ACTIVE:
+                self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_REJECTED.value])
+            else:
+                self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value])
+                self.push_session_status(session, EnumSessionState.SESSION_STATE_IDLE)
+        else:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value] + list(struct.pack("<I", session.ranging_count)))
+
+    def handle_vendor_command(self, oid: int, payload: bytes):
+        gid = EnumUciGid.FORTHINK_VENDOR_GID
+        if oid == EnumForthinkVendorOid.ENCRYPT_GET_SERIAL_NUM_OID:
+            # the serial number is sent by 2-char groups in reverse order
+            sn = self.serial_num.upper()
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value] + [ord(c) for c in sn[6:8] + sn[4:6] + sn[2:4] + sn[0:2]])
+        elif oid in (EnumForthinkVendorOid.ENCRYPT_LICENSE_CHECK_OID, EnumForthinkVendorOid.CCC_DATA_SET_OID):
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_OK.value])
+        else:
+            self.push_response(gid, oid, [EnumUciStatus.UCI_STATUS_UNKNOWN_OID.value])
+
+    def session_interval(self, session: UciSimulatorSession) -> float:
+        if self.ntf_rate_hz:
+            return 1.0 / self.ntf_rate_hz
+        return session.ranging_interval_ms() / 1000
+
+    def next_range_session(self):
+        '''
+            @return the active session whose notification is due first, None if no session is ranging
+        '''
+        next_session = None
+        for session in self.sessions.values():
+            if session.state == EnumSessionState.SESSION_STATE_ACTIVE and (next_session is None or session.next_due < next_session.next_due):
+                next_session = session
+        return next_session
+
+    def push_range_notification(self, session: UciSimulatorSession):
+        session.seq_num += 1
+        session.ranging_count += 1
+        session.next_due += self.session_interval(session)
+        self.ntf_count += 1
+        if session.session_type == EnumSessionType.SESSION_TYPE_CCC_RANGING:
+            self.push_ccc_range_notification(session)
+        else:
+            self.push_fira_range_notification(session)
+
+    def measurement_status(self) -> int:
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            return EnumUciStatus.UCI_STATUS_RANGING_RX_TIMEOUT.value
+        return EnumUciStatus.UCI_STATUS_OK.value
+
+    def push_fira_range_notification(self, session: UciSimulatorSession):
+        mac_addr_mode = session.mac_addr_mode()
+        addresses = session.responder_addresses(self.responder_count)
+        layout = FIRA_TWR_RESULT_EXTENDED if mac_addr_mode > 0 else FIRA_TWR_RESULT_SHORT
+        payload = bytearray(FIRA_RANGE_DATA_NTF_HEADER.pack(session.seq_num, session.session_id, session.ranging_interval_ms(),
+                                                            1, mac_addr_mode, len(addresses)))
+        for slot_index, mac_address in enumerate(addresses, 1):
+            status = self.measurement_status()
+            distance = self.distance_model(session.session_id, mac_address, session.seq_num) if status == 0 else 0
+            payload += layout.pack(mac_address, status, 0, max(0, min(distance, 0xFFFF)),
+                                   0, 100, 0, 100, 0, 100, 0, 100, slot_index)
+        self.push_message(EnumUciMessageType.UCI_MT_NOTIFICATION, EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_START_OID, payload)
+
+    def push_ccc_range_notification(self, session: UciSimulatorSession):
+        addresses = session.responder_addresses(self.responder_count)
+        rr_index = session.seq_num & 0xFFFF
+        if self.ccc_role == EnumSimulatorCccRole.CCC_CONTROLEE:
+            status = self.measurement_status()
+            distance = self.distance_model(session.session_id, addresses[0], session.seq_num) if status == 0 else 0
+            payload = CCC_RANGE_DATA_NTF_CONTROLEE.pack(session.session_id, 0x00 if status == 0 else 0x20, session.seq_num, rr_index,
+                                                        max(0, min(distance, 0xFFFF)), 100, 100, b"\xff" * 8)
+            self.push_message(EnumUciMessageType.UCI_MT_NOTIFICATION, EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_CCC_DATA_NTF_OID, payload)
+            return
+        payload = bytearray(CCC_RANGE_DATA_NTF_CONTROLLER_EXP_HEADER.pack(session.session_id, session.seq_num, rr_index, 0, len(addresses), 0))
+        for index, mac_address in enumerate(addresses):
+            distance = self.distance_model(session.session_id, mac_address, session.seq_num) if self.measurement_status() == 0 else 0
+            payload += CCC_RESPONDER_RESULT.pack(index, max(0, min(distance, 0xFFFF)))
+        self.push_message(EnumUciMessageType.UCI_MT_NOTIFICATION, EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_CCC_DATA_NTF_EXP_OID, payload)
+
+    def wait_uci_message(self, timeout_ms, bus_lock=None) -> bool:
+        '''
+            @brief wait for a queued frame or a due range notification, rx_condition guards the simulator, bus_lock is not taken
+            @param timeout_ms: 0 waits forever, like the INT_N wait of Ft4222hDevice
+        '''
+        deadline = None if timeout_ms == 0 else time.monotonic() + timeout_ms / 1000
+        with self.rx_condition:
+            while True:
+                if len(self.rx_queue) > 0:
+                    return True
+                now = time.monotonic()
+                session = self.next_range_session()
+                if session is not None and (not self.realtime or session.next_due <= now):
+                    return True
+                if deadline is not None and now >= deadline:
+                    return False
+                wait_until = deadline
+                if session is not None and (wait_until is None or session.next_due < wait_until):
+                    wait_until = session.next_due
+                self.rx_condition.wait(None if wait_until is None else max(wait_until - now, 0))
+
+    def receive_uci_message(self, timeout_ms=200, crc_enabled=False) -> UCIPortResult:
+        '''
+            @param timeout_ms: 0 waits forever, like the INT_N wait of Ft4222hDevice
+            @param crc_enabled: each packet ends with its CRC16 (little endian), like a Ft4222hDevice frame
+        '''
+        with self.rx_condition:
+            if not self.wait_uci_message(timeout_ms):
+                return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT, b"", False)
+            if len(self.rx_queue) == 0:
+                self.push_range_notification(self.next_range_session())
+            packet = self.rx_queue.popleft()
+        if crc_enabled:
+            return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, packet + nxp_crc.calculate_crc(frame=packet).to_bytes(2, 'little'), True)
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, packet, False)
@@ -15,8 +15,74 @@ from CCCRegionParams import *
 from uci_message import *
 from uci_defs import *
 from uci_layer import UCILayer
+from uci_async import AsyncUCILayer
+from uci_app_config import *
+
+CCC_APP_CONFIG_FIELDS = (
+    AppConfigField('device_type',                 EnumSessionAppConfigID.PARAM_ID_DEVICE_TYPE, 1, pack_u8),
+    AppConfigField('sts_config',                  EnumSessionAppConfigID.PARAM_ID_STS_CONFIG, 1, pack_u8),
+    AppConfigField('channel_id',                  EnumSessionAppConfigID.PARAM_ID_CHANNEL_NUMBER, 1, pack_u8),
+    AppConfigField('anchor_num',                  EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE, 1, pack_u8),
+    AppConfigField('device_mac_addr',             EnumSessionAppConfigID.PARAM_ID_DEVICE_MAC_ADDRESS, 2, pack_u16),
+    AppConfigField('dst_mac_addr',                EnumSessionAppConfigID.PARAM_ID_DST_MAC_ADDRESS, 2, pack_u16),
+    AppConfigField('ranging_slot_length',         EnumSessionAppConfigID.PARAM_ID_SLOT_DURATION, 2, pack_u16),
+    AppConfigField('ranging_interval',            EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL, 4, pack_u32),
+    AppConfigField('sts_index0',                  EnumSessionAppConfigID.PARAM_ID_STS_INDEX, 4, pack_u32),
+    AppConfigField('mac_fcs_type',                EnumSessionAppConfigID.PARAM_ID_MAC_FCS_TYPE, 1, pack_u8),
+    AppConfigField('rng_data_ntf',                EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF, 1, pack_u8),
+    AppConfigField('rng_data_ntf_proximity_near', EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF_PROXIMITY_NEAR, 2, pack_u16),
+    AppConfigField('rng_data_ntf_proximity_far',  EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF_PROXIMITY_FAR, 2, pack_u16),
+    AppConfigField('device_role',                 EnumSessionAppConfigID.PARAM_ID_DEVICE_ROLE, 1, pack_u8),
+    AppConfigField('preamble_id',                 EnumSessionAppConfigID.PARAM_ID_PREAMBLE_CODE_INDEX, 1, pack_u8),
+    AppConfigField('sfd_id',                      EnumSessionAppConfigID.PARAM_ID_SFD_ID, 1, pack_u8),
+    AppConfigField('slots_per_rr',                EnumSessionAppConfigID.PARAM_ID_SLOTS_PER_RR, 1, pack_u8),
+    AppConfigField('adaptive_payload_power',      EnumSessionAppConfigID.PARAM_ID_TX_ADAPTIVE_PAYLOAD_POWER, 1, pack_u8),
+    AppConfigField('responder_slot_index',        EnumSessionAppConfigID.PARAM_ID_RESPONDER_SLOT_INDEX, 1, pack_u8),
+    AppConfigField('key_rotation',                EnumSessionAppConfigID.PARAM_ID_KEY_ROTATION, 1, pack_u8),
+    AppConfigField('session_priority',            EnumSessionAppConfigID.PARAM_ID_SESSION_PRIORITY, 1, pack_u8),
+    AppConfigField('max_rr_retry',                EnumSessionAppConfigID.PARAM_ID_MAX_RR_RETRY, 2, pack_u16),
+    AppConfigField('uwb_initiation_time',         EnumSessionAppConfigID.PARAM_ID_UWB_INITIATION_TIME, 4, pack_u32),
+    AppConfigField('hopping_mode',                EnumSessionAppConfigID.PARAM_ID_RANGING_ROUND_HOPPING, 1, pack_u8),
+    AppConfigField('max_num_of_measurements',     EnumSessionAppConfigID.PARAM_ID_MAX_NUM_OF_MEASUREMENTS, 2, pack_u16),
+    AppConfigField('hop_mode_key',                EnumSessionAppConfigID.PARAM_ID_HOP_MODE_KEY, 16, pack_bytes),
+    AppConfigField('ccc_config_quirks',           EnumSessionAppConfigID.PARAM_ID_CCC_CONFIG_QUIRKS, 1, pack_u8),
+    AppConfigField('ranging_protocol_ver',        EnumSessionAppConfigID.PARAM_ID_RANGING_PROTOCOL_VER, 2, pack_u16),
+    AppConfigField('uwb_config_id',               EnumSessionAppConfigID.PARAM_ID_UWB_CONFIG_ID, 2, pack_u16),
+    AppConfigField('pulse_shape_combo',           EnumSessionAppConfigID.PARAM_ID_PULSE_SHAPE_COMBO, 1, pack_u8),
+    AppConfigField('URSK_TTL',                    EnumSessionAppConfigID.PARAM_ID_URSK_TTL, 2, pack_u16),
+    AppConfigField('responder_listen_only',       EnumSessionAppConfigID.PARAM_ID_RESPONDER_LISTEN_ONLY, 1, pack_u8),
+    AppConfigField('URSK',                        EnumSessionAppConfigID.PARAM_ID_URSK_SecSessionKey, None, pack_session_key),
+    AppConfigField('last_sts_index_used',         EnumSessionAppConfigID.PARAM_ID_LAST_STS_INDEX_USED, 4, pack_u32),
+    AppConfigField('tx_power_id',                 EnumSessionAppConfigID.PARAM_ID_TX_POWER_ID, 1, pack_u8),
+    AppConfigField('rx_start_margin',             EnumSessionAppConfigID.PRRAM_ID_RX_START_MARGIN, 1, pack_u8),
+    AppConfigField('rx_timeout',                  EnumSessionAppConfigID.PARAM_ID_RX_TIMEOUT, 2, pack_u16),
+    AppConfigField('adapted_ranging_index',       EnumSessionAppConfigID.PARAM_ID_ADAPTED_RANGING_INDEX, 2, pack_u16),
+    AppConfigField('nbic_conf',                   EnumSessionAppConfigID.PARAM_ID_NBIC_CONF, 1, pack_u8),
+    AppConfigField('groupdelay_recalc_enable',    EnumSessionAppConfigID.PARAM_ID_GROUPDELAY_RECALC_ENA, 1, pack_u8),
+    AppConfigField('rcm_rx_margin_time',          EnumSessionAppConfigID.PARAM_ID_RCM_RX_MARGIN_TIME, 2, pack_u16),
+    AppConfigField('rcm_rx_timeout',              EnumSessionAppConfigID.PARAM_ID_RCM_RX_TIMEOUT, 2, pack_u16),
+    AppConfigField('dynamic_priority_in_synch',   EnumSessionAppConfigID.PARAM_ID_DYNAMIC_PRIORITY_IN_SYNCH, 1, pack_u8),
+    AppConfigField('tx_power_temp_compensation',  EnumSessionAppConfigID.PARAM_ID_TX_POWER_TEMP_COMPENSATION, 1, pack_u8),
+    AppConfigField('long_src_address',            EnumSessionAppConfigID.PARAM_ID_LONG_SRC_ADDRESS, 8, pack_bytes),
+    AppConfigField('rr_retry_threshold',          EnumSessionAppConfigID.PARAM_ID_RR_RETRY_THR, 2, pack_u16),
+    AppConfigField('rx_phy_logging_enable',       EnumSessionAppConfigID.PARAM_ID_RX_PHY_LOGGING_ENBL, 1, pack_u8),
+    AppConfigField('tx_phy_logging_enable',       EnumSessionAppConfigID.PARAM_ID_TX_PHY_LOGGING_ENBL, 1, pack_u8),
+    AppConfigField('log_param_conf',              EnumSessionAppConfigID.PARAM_ID_LOG_PARAMS_CONF, 4, pack_u32),
+    AppConfigField('cir_tap_offset',              EnumSessionAppConfigID.PARAM_ID_CIR_TAP_OFFSET, 2, pack_u16),
+    AppConfigField('cir_num_taps',                EnumSessionAppConfigID.PARAM_ID_CIR_NUM_TAPS, 2, pack_u16),
+    AppConfigField('sts_index_restart',           EnumSessionAppConfigID.PARAM_ID_STS_INDEX_RESTART, 1, pack_u8),
+    AppConfigField('vendor_specific_oui',         EnumSessionAppConfigID.PARAM_ID_VENDOR_SPECIFIC_OUI, 3, pack_bytes),
+    AppConfigField('ranging_round_usage',         EnumSessionAppConfigID.PARAM_ID_RANGING_METHOD, 1, pack_u8),
+)
+
+# always sent by ccc_session_set_app_config, even with their default values
+CCC_MANDATORY_APP_CONFIG = ('device_type', 'channel_id', 'anchor_num', 'ranging_slot_length', 'ranging_interval', 'device_role',
+                            'tx_power_id', 'preamble_id', 'sfd_id', 'responder_slot_index', 'slots_per_rr', 'URSK')
+
+
+class CCCSessionParam(AppConfigParam):
+    app_config_fields = CCC_APP_CONFIG_FIELDS
 
-class CCCSessionParam():
 
     def __init__(self, session_id, device_type: int, device_role: int, anchor_num, sts_config=1, sts_index0=0, ranging_interval=96, slot_length=EnumRangingSlotLength.RANGING_SLOT_LENGTH_2MS.value,
                  slots_per_rr=12, channel=9, preamble_id=9, responder_slot_idx=0, session_state: UWBSessionState = None, ccc_config_quirks = 0, uwb_config_id = 0x0001,
@@ -122,197 +188,26 @@ class CCCSessionParam():
         '''
         self.ranging_slot_length = slot_length.vale
 
-    def get_app_config_tlv(self, param=None) -> list[UciConfigTLV]:
-        default_param = None
-        if not isinstance(param, CCCSessionParam):
-            default_param = CCCSessionParam(
-                0, EnumCCCDeviceType.CCC_DEVICE_TYPE_CONTROLLER.value, EnumCCCDeviceRole.CCC_DEVICE_ROLE_INITIATOR.value, 1)
-        else:
-            default_param = param
-        app_config_tlv = []
-        for key, value in default_param.__dict__.items():
-            if value != self.__dict__[key]:
-                if key == 'device_type':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_DEVICE_TYPE.value, 1, [self.device_type]))
-                elif key == 'ranging_round_usage':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RANGING_METHOD.value, 1, [self.ranging_round_usage]))
-                elif key == 'sts_config':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_STS_CONFIG.value, 1, [self.sts_config]))
-                elif key == 'channel_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_CHANNEL_NUMBER.value, 1, [self.channel_id]))
-                elif key == 'anchor_num':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE.value, 1, [self.anchor_num]))
-                elif key == 'device_mac_addr':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_DEVICE_MAC_ADDRESS.value, 2, list(
-                        struct.pack("<H", self.device_mac_addr))))
-                elif key == 'dst_mac_addr':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_DST_MAC_ADDRESS.value, 2, list(
-                        struct.pack("<H", self.dst_mac_addr))))
-                elif key == 'ranging_slot_length':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_SLOT_DURATION.value, 2, list(
-                        struct.pack("<H", self.ranging_slot_length))))
-                elif key == 'ranging_interval':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL.value, 4, list(
-                        struct.pack("<I", self.ranging_interval))))
-                elif key == 'sts_index0':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_STS_INDEX.value, 4, list(struct.pack("<I", self.sts_index0))))
-                elif key == 'mac_fcs_type':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_MAC_FCS_TYPE.value, 1, [self.mac_fcs_type]))
-                elif key == 'rng_data_ntf':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF.value, 1, [self.rng_data_ntf]))
-                elif key == 'rng_data_ntf_proximity_near':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF_PROXIMITY_NEAR.value, 2, list(
-                        struct.pack("<H", self.rng_data_ntf_proximity_near))))
-                elif key == 'rng_data_ntf_proximity_far':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF_PROXIMITY_FAR.value, 2, list(
-                        struct.pack("<H", self.rng_data_ntf_proximity_far))))
-                elif key == 'device_role':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_DEVICE_ROLE.value, 1, [self.device_role]))
-                elif key == 'preamble_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_PREAMBLE_CODE_INDEX.value, 1, [self.preamble_id]))
-                elif key == 'sfd_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_SFD_ID.value, 1, [self.sfd_id]))
-                elif key == 'slots_per_rr':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_SLOTS_PER_RR.value, 1, [self.slots_per_rr]))
-                elif key == 'adaptive_payload_power':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_TX_ADAPTIVE_PAYLOAD_POWER.value, 1, [self.adaptive_payload_power]))
-                elif key == 'responder_slot_index':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RESPONDER_SLOT_INDEX.value, 1, [self.responder_slot_index]))
-                elif key == 'key_rotation':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_KEY_ROTATION.value, 1, [self.key_rotation]))
-                elif key == 'session_priority':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_SESSION_PRIORITY.value, 1, [self.session_priority]))
-                elif key == 'max_rr_retry':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_MAX_RR_RETRY.value, 2, list(
-                        struct.pack("<H", self.max_rr_retry))))
-                elif key == 'uwb_initiation_time':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_UWB_INITIATION_TIME.value, 4, list(
-                        struct.pack("<I", self.uwb_initiation_time))))
-                elif key == 'hopping_mode':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RANGING_ROUND_HOPPING.value, 1, [self.hopping_mode]))
-                elif key == 'max_num_of_measurements':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_MAX_NUM_OF_MEASUREMENTS.value, 2, list(
-                        struct.pack("<H", self.max_num_of_measurements))))
-                elif key == 'hop_mode_key':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_HOP_MODE_KEY.value, 16, self.hop_mode_key))
-                elif key == 'ccc_config_quirks':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_CCC_CONFIG_QUIRKS.value, 1, [self.ccc_config_quirks]))
-                elif key == 'ranging_protocol_ver':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RANGING_PROTOCOL_VER.value, 2, list(
-                        struct.pack("<H", self.ranging_protocol_ver))))
-                elif key == 'uwb_config_id':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_UWB_CONFIG_ID.value, 2, list(
-                        struct.pack("<H", self.uwb_config_id))))
-                elif key == 'pulse_shape_combo':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_PULSE_SHAPE_COMBO.value, 1, [self.pulse_shape_combo]))
-                elif key == 'URSK_TTL':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_URSK_TTL.value, 2, list(struct.pack("<H", self.URSK_TTL))))
-                elif key == 'responder_listen_only':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RESPONDER_LISTEN_ONLY.value, 1, [self.responder_listen_only]))
-                elif key == 'last_sts_index_used':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_LAST_STS_INDEX_USED.value, 4, list(
-                        struct.pack("<I", self.last_sts_index_used))))
-                elif key == 'tx_power_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_TX_POWER_ID.value, 1, [self.tx_power_id]))
-                elif key == 'rx_start_margin':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PRRAM_ID_RX_START_MARGIN.value, 1, [self.rx_start_margin]))
-                elif key == 'rx_timeout':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RX_TIMEOUT.value, 2, list(struct.pack("<H", self.rx_timeout))))
-                elif key == 'adapted_ranging_index':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_ADAPTED_RANGING_INDEX.value, 2, list(
-                        struct.pack("<H", self.adapted_ranging_index))))
-                elif key == 'nbic_conf':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_NBIC_CONF.value, 1, [self.nbic_conf]))
-                elif key == 'groupdelay_recalc_enable':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_GROUPDELAY_RECALC_ENA.value, 1, [self.groupdelay_recalc_enable]))
-                elif key == 'URSK':
-                    buf = [0]
-                    buf.extend(self.URSK)
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_URSK_SecSessionKey.value, len(buf), buf))
-                elif key == 'rcm_rx_margin_time':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RCM_RX_MARGIN_TIME.value, 2, list(struct.pack("<H", self.rcm_rx_margin_time))))
-                elif key == 'rcm_rx_timeout':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RCM_RX_TIMEOUT.value, 2, list(struct.pack("<H", self.rcm_rx_timeout))))
-                elif key == 'dynamic_priority_in_synch':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_DYNAMIC_PRIORITY_IN_SYNCH.value, 1, [self.dynamic_priority_in_synch]))
-                elif key == 'tx_power_temp_compensation':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_TX_POWER_TEMP_COMPENSATION.value, 1, [self.tx_power_temp_compensation]))
-                elif key == 'long_src_address':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_LONG_SRC_ADDRESS.value, 8, self.long_src_address))
-                elif key == 'rr_retry_threshold':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RR_RETRY_THR.value, 2, list(
-                        struct.pack("<H", self.rr_retry_threshold))))
-                elif key == 'rx_phy_logging_enable':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RX_PHY_LOGGING_ENBL.value, 1, [self.rx_phy_logging_enable]))
-                elif key == 'tx_phy_logging_enable':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_TX_PHY_LOGGING_ENBL.value, 1, [self.tx_phy_logging_enable]))
-                elif key == 'log_param_conf':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_LOG_PARAMS_CONF.value, 4, list(struct("<I", self.log_param_conf))))
-                elif key == 'cir_tap_offset':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_CIR_TAP_OFFSET.value, 2, list(struct.pack("<H", self.cir_tap_offset))))
-                elif key == 'cir_num_taps':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_CIR_NUM_TAPS.value, 2, list(struct.pack("<H", self.cir_num_taps))))
-                elif key == 'sts_index_restart':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_STS_INDEX_RESTART.value, 1, [self.sts_index_restart]))
-                elif key == 'vendor_specific_oui':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_VENDOR_SPECIFIC_OUI.value, 3, self.vendor_specific_oui))
-        return app_config_tlv
+    @classmethod
+    def app_config_default_param(cls):
+        return cls(0, EnumCCCDeviceType.CCC_DEVICE_TYPE_CONTROLLER.value, EnumCCCDeviceRole.CCC_DEVICE_ROLE_INITIATOR.value, 1)
 
 
 class CCCRangingDevice(UCILayer):
 
-    def __init__(self, device, mac_addr, session_map: dict[int, CCCSessionParam] = {}):
+    def __init__(self, device, mac_addr, session_map: dict[int, CCCSessionParam] = None):
         super().__init__(device)
         self.dev = device
         self.mac_addr = mac_addr
-        self.session_map = session_map   # Dict[int, CCCSessionParam]
+        # one map per device, several ranging devices (dongles) may run the same session ids
+        self.session_map = session_map if session_map is not None else {}   # Dict[int, CCCSessionParam]
+        # optional UciRangeRecorder, see set_range_recorder()
+        self.range_recorder = None
 
-    def ccc_session_init(self, session: CCCSessionParam):
+    def register_ccc_range_ntf_callbacks(self, session: CCCSessionParam):
         """
-        Initiate a CCC ranging session, store Session Param
+        Register the CCC range data notification callbacks of the session device type
         """
-        self.session_map[session.session_id] = session
-        # register and initialize UCI layer, register the CCC Session callbacks
         if session.device_type == EnumCCCDeviceType.CCC_DEVICE_TYPE_CONTROLLER:
             self.register_notification_callback(
                 EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_CCC_DATA_NTF_OID.value, uci_uwb_range_ccc_data_ntf_controller_callback)
@@ -321,151 +216,174 @@ class CCCRangingDevice(UCILayer):
             self.register_notification_callback(
                 EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_CCC_DATA_NTF_OID.value, uci_uwb_range_ccc_data_ntf_controlee_callback)
 
-        # Initiate CCC ranging session
-        self.uci_session_init(session.session_id,
-                              EnumSessionType.SESSION_TYPE_CCC_RANGING)
-
-        # Wait for response
-        result = self.wait_response(timeout_ms=200)
-
-        if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
-        else:
-            log_i(str(result.uci_result))
+    def ccc_session_init(self, session: CCCSessionParam):
+        """
+        Initiate a CCC ranging session, store Session Param
+        """
+        self.session_map[session.session_id] = session
+        # register and initialize UCI layer, register the CCC Session callbacks
+        self.register_ccc_range_ntf_callbacks(session)
 
-        # Wait for SESSION_STATUS_NTF
-        result = self.wait_response(timeout_ms=200)
-        if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
-        else:
-            log_i(str(result.uci_result))
-            if isinstance(result.uci_result, UWBSessionState):
-                self.session_map[result.uci_result.session_id].session_state = result.uci_result
+        return self.session_transition(session.session_id, EnumSessionState.SESSION_STATE_INIT,
+                                       self.uci_session_init, EnumSessionType.SESSION_TYPE_CCC_RANGING, timeout_ms=200)
 
-    def ccc_session_set_app_config(self, session_id : int):
+    def ccc_session_app_config_tlv(self, session_id : int) -> list[UciConfigTLV]:
         """
-        Configure CCC ranging session parameters
+        Build the SESSION_SET_APP_CONFIG TLVs of an initialized session, None if the session is not ready
         """
         param = self.session_map[session_id]
         if param is None:
             log_e("Error: Session not configured! Please call ccc_session_init first.")
-            return
+            return None
         if param.session_state is None:
             log_e("Error: Session not successful initialized, reinit!")
-            return
+            return None
         if param.session_state.state is not EnumSessionState.SESSION_STATE_INIT:
             log_e("Error: Session not successful initialized, reinit!")
-            return
+            return None
         else:
             app_config_tlv = param.get_app_config_tlv()
+            tags = {tlv.tag for tlv in app_config_tlv}
             # configure mandatory parameters
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_DEVICE_TYPE.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_DEVICE_TYPE.value, 1, [param.device_type]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_CHANNEL_NUMBER.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_CHANNEL_NUMBER.value, 1, [param.channel_id]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE.value, 1, [param.anchor_num]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_SLOT_DURATION.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_SLOT_DURATION.value, 2, list(struct.pack("<H", param.ranging_slot_length))))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL.value, 4, list(struct.pack("<I", param.ranging_interval))))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_DEVICE_ROLE.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_DEVICE_ROLE.value, 1, [param.device_role]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_TX_POWER_ID.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_TX_POWER_ID.value, 1, [param.tx_power_id]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_PREAMBLE_CODE_INDEX.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_PREAMBLE_CODE_INDEX.value, 1, [param.preamble_id]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_SFD_ID.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_SFD_ID.value, 1, [param.sfd_id]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_RESPONDER_SLOT_INDEX.value for tlv in app_config_tlv) and param.device_role == EnumCCCDeviceRole.CCC_DEVICE_ROLE_RESPONDER.value:
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RESPONDER_SLOT_INDEX.value, 1, [param.responder_slot_index]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_SLOTS_PER_RR.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_SLOTS_PER_RR.value, 1, [param.slots_per_rr]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_URSK_SecSessionKey.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_URSK_SecSessionKey.value, 33, [0] + param.URSK))
-                
-            # Transmit app config
-            self.uci_session_set_app_config(session_id, app_config_tlv)
-            # Wait for response
-            result = self.wait_response(timeout_ms=200)
-
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
+            field_map = param.app_config_field_map()
+            for name in CCC_MANDATORY_APP_CONFIG:
+                if field_map[name].tag in tags:
+                    continue
+                if name == 'responder_slot_index' and param.device_role != EnumCCCDeviceRole.CCC_DEVICE_ROLE_RESPONDER.value:
+                    continue
+                app_config_tlv.append(param.get_app_config_field_tlv(name))
+            return app_config_tlv
 
-    def ccc_session_range_start(self, session_id):
+    def ccc_session_set_app_config(self, session_id : int):
         """
-        Start a CCC ranging session
+        Configure CCC ranging session parameters
         """
-        # Start CCC ranging session
-        self.uci_range_start(session_id)
-
-        # Wait for response
-        result = self.wait_response(timeout_ms=500)
+        app_config_tlv = self.ccc_session_app_config_tlv(session_id)
+        if app_config_tlv is None:
+            return
+        # Transmit app config, the SESSION_STATUS_NTF (IDLE) is picked up by the next transition
+        result = self.wait_for(self.submit(self.uci_session_set_app_config, session_id, app_config_tlv), timeout_ms=200)
 
         if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
+            log_e("Error: %s", result.status)
         else:
-            log_i(str(result.uci_result))
+            log_i("%s", result.uci_result)
+        self.session_map[session_id].mark_app_config_sent(accepted_app_config_tlv(app_config_tlv, result))
 
-        # Wait for SESSION_STATUS_NTF
-        result = self.wait_response(timeout_ms=200)
+    def ccc_session_unsent_app_config_tlv(self, session_id: int) -> list[UciConfigTLV]:
+        """
+        The app config TLVs changed since the last SESSION_SET_APP_CONFIG of an initialized, idle or active session,
+        None if the session is not initialized or deinitialized
+        """
+        param = self.session_map.get(session_id)
+        if param is None or param.session_state is None:
+            log_e("Error: Session not initialized! Please call ccc_session_init first.")
+            return None
+        if param.session_state.state == EnumSessionState.SESSION_STATE_DEINIT:
+            log_e("Error: Session deinitialized, reinit!")
+            return None
+        return param.get_unsent_app_config_tlv()
+
+    def ccc_session_update_app_config(self, session_id: int) -> UciRspNtfResult:
+        """
+        Send the app config parameters changed since the last SESSION_SET_APP_CONFIG to an initialized, idle or
+        active session, without stop/deinit/init. None if nothing changed.
+        e.g. param.ranging_interval = 100
+             ranging_device.ccc_session_update_app_config(param.session_id)
+        """
+        app_config_tlv = self.ccc_session_unsent_app_config_tlv(session_id)
+        if app_config_tlv is None or len(app_config_tlv) == 0:
+            return None
+        # matched by GID/OID, the range notifications of an active session stay queued for wait_response
+        result = self.wait_for(self.submit(self.uci_session_set_app_config, session_id, app_config_tlv), timeout_ms=200)
         if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
+            log_e("Error: %s", result.status)
         else:
-            log_i(str(result.uci_result))
+            log_i("%s", result.uci_result)
+        self.session_map[session_id].mark_app_config_sent(accepted_app_config_tlv(app_config_tlv, result))
+        return result
+
+    def ccc_session_range_start(self, session_id):
+        """
+        Start a CCC ranging session
+        """
+        return self.session_transition(session_id, EnumSessionState.SESSION_STATE_ACTIVE, self.uci_range_start, timeout_ms=500)
+
+    def set_range_recorder(self, recorder):
+        """
+        Record the range notifications returned by ccc_session_range_run (uci_range_recorder.UciRangeRecorder), None to stop
+        """
+        self.range_recorder = recorder
 
     def ccc_session_range_run(self) -> UciRspNtfResult:
         """
         Run CCC ranging session run, always wait for response/ntf
         """
-        return self.wait_response(timeout_ms=1000)
+        result = self.wait_response(timeout_ms=1000)
+        if self.range_recorder is not None and result.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
+            self.range_recorder.append(result.uci_result)
+        return result
 
     def ccc_session_range_stop(self, session_id):
         """
         Stop a CCC ranging session
         """
-        # Stop CCC ranging session
-        self.uci_range_stop(session_id)
-
-        # Wait for response
-        result = self.wait_response(timeout_ms=200)
-
-        if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
-        else:
-            log_i(str(result.uci_result))
-            
-        # Wait for SESSION_STATUS_NTF
-        result = self.wait_response(timeout_ms=200)
-        if result is not None:
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
-                self.session_map[result.uci_result.session_id].session_state = result.uci_result
+        return self.session_transition(session_id, EnumSessionState.SESSION_STATE_IDLE, self.uci_range_stop, timeout_ms=200)
 
     def ccc_session_deinit(self, session_id):
         '''
         Deinitialize CCC ranging session
         '''
-        self.uci_session_deinit(session_id)
-        # Wait for response
-        result = self.wait_response(timeout_ms=200)
-        if result is not None:
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
-
-        # Wait for SESSION_STATUS_NTF
-        result = self.wait_response(timeout_ms=300)
-        if result is not None:
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
-                if isinstance(result.uci_result, UWBSessionState):
-                    self.session_map[result.uci_result.session_id].session_state = result.uci_result
+        return self.session_transition(session_id, EnumSessionState.SESSION_STATE_DEINIT, self.uci_session_deinit, timeout_ms=300)
+
+
+class AsyncCCCRangingDevice(AsyncUCILayer):
+    '''
+        asyncio front-end of a CCCRangingDevice, the session commands resolve on their RSP and SESSION_STATUS_NTF
+    '''
+
+    def __init__(self, ranging_device: CCCRangingDevice, executor=None, poll_ms=20, ntf_queue_size=256):
+        super().__init__(ranging_device, executor, poll_ms, ntf_queue_size)
+
+    async def ccc_session_init(self, session: CCCSessionParam) -> UciRspNtfResult:
+        self.layer.session_map[session.session_id] = session
+        self.layer.register_ccc_range_ntf_callbacks(session)
+        return await self.session_transition(session.session_id, EnumSessionState.SESSION_STATE_INIT,
+                                             self.layer.uci_session_init, session.session_id, EnumSessionType.SESSION_TYPE_CCC_RANGING, timeout_ms=200)
+
+    async def ccc_session_set_app_config(self, session_id: int) -> UciRspNtfResult:
+        app_config_tlv = self.layer.ccc_session_app_config_tlv(session_id)
+        if app_config_tlv is None:
+            return None
+        result = await self.command(self.layer.uci_session_set_app_config, session_id, app_config_tlv, timeout_ms=200)
+        if result.status is not EnumUciStatus.UCI_STATUS_OK:
+            log_e("Error: %s", result.status)
+        self.layer.session_map[session_id].mark_app_config_sent(accepted_app_config_tlv(app_config_tlv, result))
+        return result
+
+    async def ccc_session_update_app_config(self, session_id: int) -> UciRspNtfResult:
+        app_config_tlv = self.layer.ccc_session_unsent_app_config_tlv(session_id)
+        if app_config_tlv is None or len(app_config_tlv) == 0:
+            return None
+        result = await self.command(self.layer.uci_session_set_app_config, session_id, app_config_tlv, timeout_ms=200)
+        if result.status is not EnumUciStatus.UCI_STATUS_OK:
+            log_e("Error: %s", result.status)
+        self.layer.session_map[session_id].mark_app_config_sent(accepted_app_config_tlv(app_config_tlv, result))
+        return result
+
+    async def ccc_session_range_start(self, session_id: int) -> UciRspNtfResult:
+        return await self.session_transition(session_id, EnumSessionState.SESSION_STATE_ACTIVE, self.layer.uci_range_start, session_id)
+
+    async def ccc_session_range_stop(self, session_id: int) -> UciRspNtfResult:
+        return await self.session_transition(session_id, EnumSessionState.SESSION_STATE_IDLE, self.layer.uci_range_stop, session_id, timeout_ms=200)
 
+    async def ccc_session_deinit(self, session_id: int) -> UciRspNtfResult:
+        return await self.session_transition(session_id, EnumSessionState.SESSION_STATE_DEINIT, self.layer.uci_session_deinit, session_id, timeout_ms=300)
+
+    async def range_notifications(self):
+        '''
+            @brief async iterator of the CCC range data notifications (controller, controlee or expanded)
+        '''
+        async for result in self.notifications():
+            if isinstance(result.uci_result, (CCCRangeDataNtfController, CCCRangeDataNtfControlee, CCCRangeDataNtfControllerExp)):
+                yield result.uci_result
@@ -9,19 +9,95 @@
                        All rights reserved
 """
 
-import struct
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, wait as wait_futures
 
 from console_helper import *
 from uci_message import *
 from uci_defs import *
 from uci_layer import UCILayer
+from uci_async import AsyncUCILayer
+from uci_app_config import *
 from FiRaRegionParams import *
 from uci_fira_range_ntf import *
 
-class FiRaSessionParam():
+FIRA_APP_CONFIG_FIELDS = (
+    AppConfigField('device_type',                       EnumSessionAppConfigID.PARAM_ID_DEVICE_TYPE, 1, pack_u8),
+    AppConfigField('ranging_round_usage',               EnumSessionAppConfigID.PARAM_ID_RANGING_METHOD, 1, pack_u8),
+    AppConfigField('sts_config',                        EnumSessionAppConfigID.PARAM_ID_STS_CONFIG, 1, pack_u8),
+    AppConfigField('channel_id',                        EnumSessionAppConfigID.PARAM_ID_CHANNEL_NUMBER, 1, pack_u8),
+    AppConfigField('anchor_num',                        EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE, 1, pack_u8),
+    AppConfigField('multi_node_mode',                   EnumSessionAppConfigID.PARAM_ID_MULTI_NODE_MODE, 1, pack_u8),
+    AppConfigField('device_mac_addr',                   EnumSessionAppConfigID.PARAM_ID_DEVICE_MAC_ADDRESS, 2, pack_u16),
+    AppConfigField('dst_mac_addr',                      EnumSessionAppConfigID.PARAM_ID_DST_MAC_ADDRESS, None, pack_u16_list),
+    AppConfigField('ranging_slot_length',               EnumSessionAppConfigID.PARAM_ID_SLOT_DURATION, 2, pack_u16),
+    AppConfigField('ranging_interval',                  EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL, 4, pack_u32),
+    AppConfigField('sts_index0',                        EnumSessionAppConfigID.PARAM_ID_STS_INDEX, 4, pack_u32),
+    AppConfigField('mac_fcs_type',                      EnumSessionAppConfigID.PARAM_ID_MAC_FCS_TYPE, 1, pack_u8),
+    AppConfigField('ranging_round_control',             EnumSessionAppConfigID.PARAM_ID_RANGING_ROUND_CONTROL, 1, pack_u8),
+    AppConfigField('rng_data_ntf',                      EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF, 1, pack_u8),
+    AppConfigField('rng_data_ntf_proximity_near',       EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF_PROXIMITY_NEAR, 2, pack_u16),
+    AppConfigField('rng_data_ntf_proximity_far',        EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF_PROXIMITY_FAR, 2, pack_u16),
+    AppConfigField('device_role',                       EnumSessionAppConfigID.PARAM_ID_DEVICE_ROLE, 1, pack_u8),
+    AppConfigField('rframe_config',                     EnumSessionAppConfigID.PARAM_ID_RFRAME_CONFIG, 1, pack_u8),
+    AppConfigField('preamble_id',                       EnumSessionAppConfigID.PARAM_ID_PREAMBLE_CODE_INDEX, 1, pack_u8),
+    AppConfigField('sfd_id',                            EnumSessionAppConfigID.PARAM_ID_SFD_ID, 1, pack_u8),
+    AppConfigField('psdu_data_rate',                    EnumSessionAppConfigID.PARAM_ID_PSDU_DATA_RATE, 1, pack_u8),
+    AppConfigField('preamble_duration',                 EnumSessionAppConfigID.PARAM_ID_PREAMBLE_DURATION, 1, pack_u8),
+    AppConfigField('ranging_time_struct',               EnumSessionAppConfigID.PARAM_ID_RANGING_TIME_STRUCT, 1, pack_u8),
+    AppConfigField('slots_per_rr',                      EnumSessionAppConfigID.PARAM_ID_SLOTS_PER_RR, 1, pack_u8),
+    AppConfigField('adaptive_payload_power',            EnumSessionAppConfigID.PARAM_ID_TX_ADAPTIVE_PAYLOAD_POWER, 1, pack_u8),
+    AppConfigField('responder_slot_index',              EnumSessionAppConfigID.PARAM_ID_RESPONDER_SLOT_INDEX, 1, pack_u8),
+    AppConfigField('prf_mode',                          EnumSessionAppConfigID.PARAM_ID_PRF_MODE, 1, pack_u8),
+    AppConfigField('key_rotation',                      EnumSessionAppConfigID.PARAM_ID_KEY_ROTATION, 1, pack_u8),
+    AppConfigField('key_rotation_rate',                 EnumSessionAppConfigID.PARAM_ID_KEY_ROTATION_RATE, 1, pack_u8),
+    AppConfigField('session_priority',                  EnumSessionAppConfigID.PARAM_ID_SESSION_PRIORITY, 1, pack_u8),
+    AppConfigField('mac_address_mode',                  EnumSessionAppConfigID.PARAM_ID_MAC_ADDRESS_MODE, 1, pack_u8),
+    AppConfigField('vendor_id',                         EnumSessionAppConfigID.PARAM_ID_VENDOR_ID, 2, pack_u16),
+    AppConfigField('static_sts_iv',                     EnumSessionAppConfigID.PARAM_ID_STATIC_STS_IV, 6, pack_bytes),
+    AppConfigField('number_of_sts_segments',            EnumSessionAppConfigID.PARAM_ID_NUMBER_OF_STS_SEGMENTS, 1, pack_u8),
+    AppConfigField('max_rr_retry',                      EnumSessionAppConfigID.PARAM_ID_MAX_RR_RETRY, 2, pack_u16),
+    AppConfigField('uwb_initiation_time',               EnumSessionAppConfigID.PARAM_ID_UWB_INITIATION_TIME, 4, pack_u32),
+    AppConfigField('hopping_mode',                      EnumSessionAppConfigID.PARAM_ID_RANGING_ROUND_HOPPING, 1, pack_u8),
+    AppConfigField('block_stride_length',               EnumSessionAppConfigID.PARAM_ID_BLOCK_STRIDE_LENGTH, 1, pack_u8),
+    AppConfigField('result_report_config',              EnumSessionAppConfigID.PARAM_ID_RESULT_REPORT_CONFIG, 1, pack_u8),
+    AppConfigField('in_band_termination_attempt_count', EnumSessionAppConfigID.PARAM_ID_IN_BAND_TERMINATION_ATTEMPT_COUNT, 1, pack_u8),
+    AppConfigField('max_num_of_measurements',           EnumSessionAppConfigID.PARAM_ID_MAX_NUM_OF_MEASUREMENTS, 2, pack_u16),
+    AppConfigField('sts_length',                        EnumSessionAppConfigID.PARAM_ID_STS_LENGTH, 1, pack_u8),
+    AppConfigField('rx_start_margin',                   EnumSessionAppConfigID.PRRAM_ID_RX_START_MARGIN, 1, pack_u8),
+    AppConfigField('rx_timeout',                        EnumSessionAppConfigID.PARAM_ID_RX_TIMEOUT, 2, pack_u16),
+    AppConfigField('adapted_ranging_index',             EnumSessionAppConfigID.PARAM_ID_ADAPTED_RANGING_INDEX, 2, pack_u16),
+    AppConfigField('nbic_conf',                         EnumSessionAppConfigID.PARAM_ID_NBIC_CONF, 1, pack_u8),
+    AppConfigField('groupdelay_recalc_enable',          EnumSessionAppConfigID.PARAM_ID_GROUPDELAY_RECALC_ENA, 1, pack_u8),
+    AppConfigField('secSessionKey',                     EnumSessionAppConfigID.PARAM_ID_URSK_SecSessionKey, None, pack_session_key),
+    AppConfigField('rcm_rx_margin_time',                EnumSessionAppConfigID.PARAM_ID_RCM_RX_MARGIN_TIME, 2, pack_u16),
+    AppConfigField('rcm_rx_timeout',                    EnumSessionAppConfigID.PARAM_ID_RCM_RX_TIMEOUT, 2, pack_u16),
+    AppConfigField('dynamic_priority_in_synch',         EnumSessionAppConfigID.PARAM_ID_DYNAMIC_PRIORITY_IN_SYNCH, 1, pack_u8),
+    AppConfigField('tx_power_temp_compensation',        EnumSessionAppConfigID.PARAM_ID_TX_POWER_TEMP_COMPENSATION, 1, pack_u8),
+    AppConfigField('long_src_address',                  EnumSessionAppConfigID.PARAM_ID_LONG_SRC_ADDRESS, 8, pack_bytes),
+    AppConfigField('rr_retry_threshold',                EnumSessionAppConfigID.PARAM_ID_RR_RETRY_THR, 2, pack_u16),
+    AppConfigField('tx_power_id',                       EnumSessionAppConfigID.PARAM_ID_TX_POWER_ID, 1, pack_u8),
+    AppConfigField('rx_phy_logging_enable',             EnumSessionAppConfigID.PARAM_ID_RX_PHY_LOGGING_ENBL, 1, pack_u8),
+    AppConfigField('tx_phy_logging_enable',             EnumSessionAppConfigID.PARAM_ID_TX_PHY_LOGGING_ENBL, 1, pack_u8),
+    AppConfigField('log_param_conf',                    EnumSessionAppConfigID.PARAM_ID_LOG_PARAMS_CONF, 4, pack_u32),
+    AppConfigField('cir_tap_offset',                    EnumSessionAppConfigID.PARAM_ID_CIR_TAP_OFFSET, 2, pack_u16),
+    AppConfigField('cir_num_taps',                      EnumSessionAppConfigID.PARAM_ID_CIR_NUM_TAPS, 2, pack_u16),
+    AppConfigField('sts_index_restart',                 EnumSessionAppConfigID.PARAM_ID_STS_INDEX_RESTART, 1, pack_u8),
+    AppConfigField('vendor_specific_oui',               EnumSessionAppConfigID.PARAM_ID_VENDOR_SPECIFIC_OUI, 3, pack_bytes),
+)
+
+# always sent by fira_session_set_app_config, even with their default values
+FIRA_MANDATORY_APP_CONFIG = ('device_type', 'ranging_round_usage', 'channel_id', 'multi_node_mode', 'anchor_num', 'ranging_slot_length',
+                             'ranging_interval', 'device_role', 'tx_power_id', 'preamble_id', 'sfd_id', 'responder_slot_index', 'slots_per_rr')
+
+
+class FiRaSessionParam(AppConfigParam):
     '''
         FiRa Ranging Session Parameters, used to configure a FiRa ranging session
     '''
+    app_config_fields = FIRA_APP_CONFIG_FIELDS
+
     def __init__(self, session_id, device_type: int, device_role: int, device_addr: int, ranging_roound_usage=EnumFiraRangingRoundUsage.FIRA_DS_TWR_DEFERRED.value, anchor_num=1, sts_config=0, multi_node_mode=1, sts_index0=0, ranging_interval=200, slot_length=EnumRangingSlotLength.RANGING_SLOT_LENGTH_2MS.value,
                  slots_per_rr=25, channel_id=9, preamble_id=10, sfd_id=2, responder_slot_idx=1, session_state: UWBSessionState = None):
         self.session_id = session_id
@@ -139,207 +215,9 @@ class FiRaSessionParam():
         '''
         self.ranging_slot_length = slot_length.vale
 
-    def get_app_config_tlv(self, param=None) -> list[UciConfigTLV]:
-        default_param = None
-        if not isinstance(param, FiRaSessionParam):
-            default_param = FiRaSessionParam(0, EnumFiraDeviceType.FIRA_DEVICE_TYPE_CONTROLLER.value, EnumFiraDeviceRole.FIRA_DEVICE_ROLE_INITIATOR.value, device_addr=0xFFFF)
-        else:
-            default_param = param
-        app_config_tlv = []
-        for key, value in default_param.__dict__.items():
-            if value != self.__dict__[key]:
-                if key == 'device_type':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_DEVICE_TYPE.value, 1, [self.device_type]))
-                elif key == 'ranging_round_usage':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RANGING_METHOD.value, 1, [self.ranging_round_usage]))
-                elif key == 'sts_config':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_STS_CONFIG.value, 1, [self.sts_config]))
-                elif key == 'multi_node_mode':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_MULTI_NODE_MODE.value, 1, [self.multi_node_mode]))
-                elif key == 'channel_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_CHANNEL_NUMBER.value, 1, [self.channel_id]))
-                elif key == 'anchor_num':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE.value, 1, [self.anchor_num]))
-                elif key == 'device_mac_addr':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_DEVICE_MAC_ADDRESS.value, 2, list(
-                        struct.pack("<H", self.device_mac_addr))))
-                elif key == 'dst_mac_addr':  # initiator is a device address list
-                    number = len(self.dst_mac_addr)
-                    buf = []
-                    for i in range(number):
-                        buf.extend(struct.pack("<H", self.dst_mac_addr[i]))
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_DST_MAC_ADDRESS.value, len(buf), buf))
-                elif key == 'ranging_slot_length':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_SLOT_DURATION.value, 2, list(
-                        struct.pack("<H", self.ranging_slot_length))))
-                elif key == 'ranging_interval':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL.value, 4, list(
-                        struct.pack("<I", self.ranging_interval))))
-                elif key == 'sts_index0':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_STS_INDEX.value, 4, list(struct.pack("<I", self.sts_index0))))
-                elif key == 'mac_fcs_type':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_MAC_FCS_TYPE.value, 1, [self.mac_fcs_type]))
-                elif key == 'ranging_round_control':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RANGING_ROUND_CONTROL.value, 1, [self.ranging_round_control]))
-                elif key == 'rng_data_ntf':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF.value, 1, [self.rng_data_ntf]))
-                elif key == 'rng_data_ntf_proximity_near':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF_PROXIMITY_NEAR.value, 2, list(
-                        struct.pack("<H", self.rng_data_ntf_proximity_near))))
-                elif key == 'rng_data_ntf_proximity_far':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RNG_DATA_NTF_PROXIMITY_FAR.value, 2, list(
-                        struct.pack("<H", self.rng_data_ntf_proximity_far))))
-                elif key == 'device_role':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_DEVICE_ROLE.value, 1, [self.device_role]))
-                elif key == 'rframe_config':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RFRAME_CONFIG.value, 1, [self.rframe_config]))
-                elif key == 'preamble_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_PREAMBLE_CODE_INDEX.value, 1, [self.preamble_id]))
-                elif key == 'sfd_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_SFD_ID.value, 1, [self.sfd_id]))
-                elif key == 'psdu_data_rate':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_PSDU_DATA_RATE.value, 1, [self.psdu_data_rate]))
-                elif key == 'preamble_duration':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_PREAMBLE_DURATION.value, 1, [self.preamble_duration]))
-                elif key == 'ranging_time_struct':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RANGING_TIME_STRUCT.value, 1, [self.ranging_time_struct]))
-                elif key == 'slots_per_rr':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_SLOTS_PER_RR.value, 1, [self.slots_per_rr]))
-                elif key == 'adaptive_payload_power':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_TX_ADAPTIVE_PAYLOAD_POWER.value, 1, [self.adaptive_payload_power]))
-                elif key == 'responder_slot_index':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RESPONDER_SLOT_INDEX.value, 1, [self.responder_slot_index]))
-                elif key == 'prf_mode':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_PRF_MODE.value, 1, [self.prf_mode]))
-                elif key == 'key_rotation':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_KEY_ROTATION.value, 1, [self.key_rotation]))
-                elif key == 'key_rotation_rate':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_KEY_ROTATION_RATE.value, 1, [self.key_rotation_rate]))
-                elif key == 'session_priority':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_SESSION_PRIORITY.value, 1, [self.session_priority]))
-                elif key == 'mac_address_mode':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_MAC_ADDRESS_MODE.value, 1, [self.mac_address_mode]))
-                elif key == 'vendor_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_VENDOR_ID.value, 2, list(struct.pack("<H", self.vendor_id))))
-                elif key == 'static_sts_iv':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_STATIC_STS_IV.value, 6, self.static_sts_iv))
-                elif key == 'number_of_sts_segments':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_NUMBER_OF_STS_SEGMENTS.value, 1, [self.number_of_sts_segments]))
-                elif key == 'max_rr_retry':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_MAX_RR_RETRY.value, 2, list(
-                        struct.pack("<H", self.max_rr_retry))))
-                elif key == 'uwb_initiation_time':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_UWB_INITIATION_TIME.value, 4, list(
-                        struct.pack("<I", self.uwb_initiation_time))))
-                elif key == 'hopping_mode':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RANGING_ROUND_HOPPING.value, 1, [self.hopping_mode]))
-                elif key == 'block_stride_length':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_BLOCK_STRIDE_LENGTH.value, 1, [self.block_stride_length]))
-                elif key == 'result_report_config':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RESULT_REPORT_CONFIG.value, 1, [self.result_report_config]))
-                elif key == 'in_band_termination_attempt_count':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_IN_BAND_TERMINATION_ATTEMPT_COUNT.value, 1, [self.in_band_termination_attempt_count]))
-                elif key == 'max_num_of_measurements':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_MAX_NUM_OF_MEASUREMENTS.value, 2, list(
-                        struct.pack("<H", self.max_num_of_measurements))))
-                elif key == 'sts_length':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_STS_LENGTH.value, 1, [self.sts_length]))
-                elif key == 'tx_power_id':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_TX_POWER_ID.value, 1, [self.tx_power_id]))
-                elif key == 'rx_start_margin':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PRRAM_ID_RX_START_MARGIN.value, 1, [self.rx_start_margin]))
-                elif key == 'rx_timeout':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RX_TIMEOUT.value, 2, list(struct.pack("<H", self.rx_timeout))))
-                elif key == 'adapted_ranging_index':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_ADAPTED_RANGING_INDEX.value, 2, list(
-                        struct.pack("<H", self.adapted_ranging_index))))
-                elif key == 'nbic_conf':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_NBIC_CONF.value, 1, [self.nbic_conf]))
-                elif key == 'groupdelay_recalc_enable':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_GROUPDELAY_RECALC_ENA.value, 1, [self.groupdelay_recalc_enable]))
-                elif key == 'secSessionKey':
-                    buf = [0]
-                    buf.extend(self.secSessionKey)
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_URSK_SecSessionKey.value, len(buf), buf))
-                elif key == 'rcm_rx_margin_time':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RCM_RX_MARGIN_TIME.value, 2, list(struct.pack("<H", self.rcm_rx_margin_time))))
-                elif key == 'rcm_rx_timeout':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RCM_RX_TIMEOUT.value, 2, list(struct.pack("<H", self.rcm_rx_timeout))))
-                elif key == 'dynamic_priority_in_synch':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_DYNAMIC_PRIORITY_IN_SYNCH.value, 1, [self.dynamic_priority_in_synch]))
-                elif key == 'tx_power_temp_compensation':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_TX_POWER_TEMP_COMPENSATION.value, 1, [self.tx_power_temp_compensation]))
-                elif key == 'long_src_address':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_LONG_SRC_ADDRESS.value, 8, self.long_src_address))
-                elif key == 'rr_retry_threshold':
-                    app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RR_RETRY_THR.value, 2, list(
-                        struct.pack("<H", self.rr_retry_threshold))))
-                elif key == 'rx_phy_logging_enable':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_RX_PHY_LOGGING_ENBL.value, 1, [self.rx_phy_logging_enable]))
-                elif key == 'tx_phy_logging_enable':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_TX_PHY_LOGGING_ENBL.value, 1, [self.tx_phy_logging_enable]))
-                elif key == 'log_param_conf':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_LOG_PARAMS_CONF.value, 4, list(struct("<I", self.log_param_conf))))
-                elif key == 'cir_tap_offset':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_CIR_TAP_OFFSET.value, 2, list(struct.pack("<H", self.cir_tap_offset))))
-                elif key == 'cir_num_taps':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_CIR_NUM_TAPS.value, 2, list(struct.pack("<H", self.cir_num_taps))))
-                elif key == 'sts_index_restart':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_STS_INDEX_RESTART.value, 1, [self.sts_index_restart]))
-                elif key == 'vendor_specific_oui':
-                    app_config_tlv.append(UciConfigTLV(
-                        EnumSessionAppConfigID.PARAM_ID_VENDOR_SPECIFIC_OUI.value, 3, self.vendor_specific_oui))
-        return app_config_tlv
+    @classmethod
+    def app_config_default_param(cls):
+        return cls(0, EnumFiraDeviceType.FIRA_DEVICE_TYPE_CONTROLLER.value, EnumFiraDeviceRole.FIRA_DEVICE_ROLE_INITIATOR.value, device_addr=0xFFFF)
 
 
 def uci_uwb_range_data_ntf_callback(gid: int, oid: int, payload: list[int]):
@@ -347,18 +225,35 @@ def uci_uwb_range_data_ntf_callback(gid: int, oid: int, payload: list[int]):
         GID OID: 0x62 0x00, FiRa UCI Specification
     '''
     range_data_ntf = FiraRangeDataNtf.from_bytes(payload)
-    log_i(str(range_data_ntf))
+    log_i("%s", range_data_ntf)
     for result in range_data_ntf.results:
-        log_i(str(result))
+        log_i("%s", result)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK, range_data_ntf)
 
+class FiRaSessionBringUp():
+    '''
+        progress of one session in FiRaRangingDevice.fira_session_bring_up
+    '''
+
+    def __init__(self, session: FiRaSessionParam):
+        self.session = session
+        self.oid = None                 # EnumUwbSessionOid/EnumUwbRangeOid of the last command transmitted, compare with is
+        self.future = None              # its response, None once handled
+        self.confirmed = False          # its response was UCI_STATUS_OK
+        self.app_config_tlv = None
+        self.done = False
+        self.active = False
+
 class FiRaRangingDevice(UCILayer):
 
-    def __init__(self, device, mac_addr, session_map: dict[int, FiRaSessionParam] = {}):
+    def __init__(self, device, mac_addr, session_map: dict[int, FiRaSessionParam] = None):
         super().__init__(device)
         self.dev = device
         self.mac_addr = mac_addr
-        self.session_map = session_map   # Dict[int, FiRaSessionParam]
+        # one map per device, several ranging devices (dongles) may run the same session ids
+        self.session_map = session_map if session_map is not None else {}   # Dict[int, FiRaSessionParam]
+        # optional UciRangeRecorder, see set_range_recorder()
+        self.range_recorder = None
 
 
     def fira_session_init(self, session: FiRaSessionParam):
@@ -370,161 +265,298 @@ class FiRaRangingDevice(UCILayer):
         self.register_notification_callback(
                 EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_START_OID.value, uci_uwb_range_data_ntf_callback)
 
-        # Initiate FiRa ranging session
-        self.uci_session_init(session.session_id,
-                              EnumSessionType.SESSION_TYPE_FIRA_RANGING)
-
-        # Wait for response
-        result = self.wait_response(timeout_ms=200)
-
-        if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
-        else:
-            log_i(str(result.uci_result))
-
-        # Wait for SESSION_STATUS_NTF
-        result = self.wait_response(timeout_ms=200)
-        if result is not None:
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
-                if isinstance(result.uci_result, UWBSessionState):
-                    self.session_map[result.uci_result.session_id].session_state = result.uci_result
+        return self.session_transition(session.session_id, EnumSessionState.SESSION_STATE_INIT,
+                                       self.uci_session_init, EnumSessionType.SESSION_TYPE_FIRA_RANGING, timeout_ms=200)
 
-
-    def fira_session_set_app_config(self, session_id : int):
+    def fira_session_app_config_tlv(self, session_id : int) -> list[UciConfigTLV]:
+        """
+        Build the SESSION_SET_APP_CONFIG TLVs of an initialized session, None if the session is not ready
+        """
         param = self.session_map[session_id]
         if param is None:
             log_e("Error: Session not configured! Please call fira_session_init first.")
-            return
+            return None
         if param.session_state is None:
             log_e("Error: Session not successful initialized, reinit!")
-            return
+            return None
         if param.session_state.state is not EnumSessionState.SESSION_STATE_INIT:
             log_e("Error: Session not successful initialized, reinit!")
-            return
+            return None
         else:
             app_config_tlv = param.get_app_config_tlv()
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_DEVICE_MAC_ADDRESS.value for tlv in app_config_tlv):
+            tags = {tlv.tag for tlv in app_config_tlv}
+            if EnumSessionAppConfigID.PARAM_ID_DEVICE_MAC_ADDRESS.value not in tags:
                 log_e("Error: device_mac_addr is mandatory, please check and set the address!")
-                return
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_DST_MAC_ADDRESS.value for tlv in app_config_tlv):
+                return None
+            if EnumSessionAppConfigID.PARAM_ID_DST_MAC_ADDRESS.value not in tags:
                 log_e("Error: dst_mac_addr is mandatory, please check and set the addresses -> list[]!")
-                return
+                return None
             # configure mandatory parameters
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_DEVICE_TYPE.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_DEVICE_TYPE.value, 1, [param.device_type]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_RANGING_METHOD.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RANGING_METHOD.value, 1, [param.ranging_round_usage]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_CHANNEL_NUMBER.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_CHANNEL_NUMBER.value, 1, [param.channel_id]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_MULTI_NODE_MODE.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_MULTI_NODE_MODE.value, 1, [param.multi_node_mode]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_NO_OF_CONTROLEE.value, 1, [param.anchor_num]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_SLOT_DURATION.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_SLOT_DURATION.value, 2, list(struct.pack("<H", param.ranging_slot_length))))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RANGING_INTERVAL.value, 4, list(struct.pack("<I", param.ranging_interval))))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_DEVICE_ROLE.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_DEVICE_ROLE.value, 1, [param.device_role]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_TX_POWER_ID.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_TX_POWER_ID.value, 1, [param.tx_power_id]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_PREAMBLE_CODE_INDEX.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_PREAMBLE_CODE_INDEX.value, 1, [param.preamble_id]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_SFD_ID.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_SFD_ID.value, 1, [param.sfd_id]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_RESPONDER_SLOT_INDEX.value for tlv in app_config_tlv) and param.device_role == EnumFiraDeviceRole.FIRA_DEVICE_ROLE_RESPONDER.value:
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_RESPONDER_SLOT_INDEX.value, 1, [param.responder_slot_index]))
-            if not any(tlv.tag == EnumSessionAppConfigID.PARAM_ID_SLOTS_PER_RR.value for tlv in app_config_tlv):
-                app_config_tlv.append(UciConfigTLV(EnumSessionAppConfigID.PARAM_ID_SLOTS_PER_RR.value, 1, [param.slots_per_rr]))
-                
-            # Transmit app config
-            self.uci_session_set_app_config(session_id, app_config_tlv)
-            # Wait for response
-            result = self.wait_response(timeout_ms=200)
+            field_map = param.app_config_field_map()
+            for name in FIRA_MANDATORY_APP_CONFIG:
+                if field_map[name].tag in tags:
+                    continue
+                if name == 'responder_slot_index' and param.device_role != EnumFiraDeviceRole.FIRA_DEVICE_ROLE_RESPONDER.value:
+                    continue
+                app_config_tlv.append(param.get_app_config_field_tlv(name))
+            return app_config_tlv
 
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
-
-    def fira_session_range_start(self, session_id):
-        """
-        Start a FiRa ranging session
-        """
-        # Start Fira ranging session
-        self.uci_range_start(session_id)
-
-        # Wait for response
-        result = self.wait_response(timeout_ms=500)
+    def fira_session_set_app_config(self, session_id : int):
+        app_config_tlv = self.fira_session_app_config_tlv(session_id)
+        if app_config_tlv is None:
+            return
+        # Transmit app config, the SESSION_STATUS_NTF (IDLE) is picked up by the next transition
+        result = self.wait_for(self.submit(self.uci_session_set_app_config, session_id, app_config_tlv), timeout_ms=200)
 
         if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
+            log_e("Error: %s", result.status)
         else:
-            log_i(str(result.uci_result))
+            log_i("%s", result.uci_result)
+        self.session_map[session_id].mark_app_config_sent(accepted_app_config_tlv(app_config_tlv, result))
 
-        # Wait for SESSION_STATUS_NTF
-        result = self.wait_response(timeout_ms=200)
+    def fira_session_unsent_app_config_tlv(self, session_id: int) -> list[UciConfigTLV]:
+        """
+        The app config TLVs changed since the last SESSION_SET_APP_CONFIG of an initialized, idle or active session,
+        None if the session is not initialized or deinitialized
+        """
+        param = self.session_map.get(session_id)
+        if param is None or param.session_state is None:
+            log_e("Error: Session not initialized! Please call fira_session_init first.")
+            return None
+        if param.session_state.state == EnumSessionState.SESSION_STATE_DEINIT:
+            log_e("Error: Session deinitialized, reinit!")
+            return None
+        return param.get_unsent_app_config_tlv()
+
+    def fira_session_update_app_config(self, session_id: int) -> UciRspNtfResult:
+        """
+        Send the app config parameters changed since the last SESSION_SET_APP_CONFIG to an initialized, idle or
+        active session, without stop/deinit/init. None if nothing changed.
+        e.g. param.ranging_interval = 100
+             ranging_device.fira_session_update_app_config(param.session_id)
+        """
+        app_config_tlv = self.fira_session_unsent_app_config_tlv(session_id)
+        if app_config_tlv is None or len(app_config_tlv) == 0:
+            return None
+        # matched by GID/OID, the range notifications of an active session stay queued for wait_response
+        result = self.wait_for(self.submit(self.uci_session_set_app_config, session_id, app_config_tlv), timeout_ms=200)
         if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
+            log_e("Error: %s", result.status)
         else:
-            log_i(str(result.uci_result))
+            log_i("%s", result.uci_result)
+        self.session_map[session_id].mark_app_config_sent(accepted_app_config_tlv(app_config_tlv, result))
+        return result
+
+    def fira_session_range_start(self, session_id):
+        """
+        Start a FiRa ranging session
+        """
+        return self.session_transition(session_id, EnumSessionState.SESSION_STATE_ACTIVE, self.uci_range_start, timeout_ms=500)
+
+    def fira_session_bring_up(self, sessions: list[FiRaSessionParam], timeout_ms=3000) -> dict[int, bool]:
+        """
+        Bring several FiRa sessions to ACTIVE. SESSION_INIT, SESSION_SET_APP_CONFIG and RANGE_START are interleaved
+        across the sessions: the next command of a session is transmitted as soon as its response (and for
+        SESSION_INIT its SESSION_STATUS_NTF) arrived, the other sessions go on meanwhile.
+        Up to max_commands_in_flight commands are outstanding, see enable_command_pipelining().
+        Not with an AsyncUCILayer pump, see AsyncFiRaRangingDevice.fira_session_bring_up.
+        e.g. states = ranging_device.fira_session_bring_up([param_1, param_2, param_3])
+        @return {session_id: True if the session is ACTIVE}
+        """
+        self.register_notification_callback(
+                EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_START_OID.value, uci_uwb_range_data_ntf_callback)
+        progress = []
+        for session in sessions:
+            if any(item.session.session_id == session.session_id for item in progress):
+                log_e("Error: session %#x listed twice, ignored", session.session_id)
+                continue
+            session.session_state = None
+            self.session_map[session.session_id] = session
+            progress.append(FiRaSessionBringUp(session))
+        session_ids = {item.session.session_id for item in progress}
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            # recorded in session_map on receive (update_session_state), not left for wait_response
+            self.take_notifications(UWBSessionState, lambda session_state: session_state.session_id in session_ids)
+            remaining_ms = (deadline - time.monotonic()) * 1000
+            pending = [item for item in progress if not item.done]
+            if len(pending) == 0 or remaining_ms <= 0:
+                break
+            progressed = False
+            for item in pending:
+                progressed |= self.fira_session_bring_up_step(item, remaining_ms)
+            if progressed:
+                continue
+            # nothing to transmit, wait for the next frame
+            futures = [item.future for item in pending if item.future is not None]
+            if self.reader_thread is not None and len(futures) > 0:
+                # the responses complete the futures without notifying rx_condition
+                wait_futures(futures, timeout=min(remaining_ms, self.reader_poll_ms) / 1000, return_when=FIRST_COMPLETED)
+            elif self.reader_thread is not None:
+                with self.rx_condition:
+                    self.rx_condition.wait(timeout=min(remaining_ms, self.reader_poll_ms) / 1000)
+            else:
+                self.receive_into_queues(min(remaining_ms, self.reader_poll_ms), self.reader_crc_enabled)
+        states = {}
+        for item in progress:
+            if item.future is not None:
+                self.cancel_pending_command(item.future)
+            if not item.done:
+                log_e("Error: session %#x not active, timeout", item.session.session_id)
+            states[item.session.session_id] = item.active
+        return states
+
+    def fira_session_bring_up_step(self, item: FiRaSessionBringUp, timeout_ms) -> bool:
+        """
+        Handle the response of the last command of a session and transmit the next one when allowed
+        @return True if something was handled or transmitted
+        """
+        session = item.session
+        if item.future is not None:
+            if not item.future.done():
+                return False
+            result = item.future.result()
+            item.future = None
+            if result.status is not EnumUciStatus.UCI_STATUS_OK:
+                log_e("Error: session %s, %s", hex(session.session_id), result.status)
+                item.done = True
+                return True
+            log_i("%s", result.uci_result)
+            if item.oid is EnumUwbSessionOid.SESSION_SET_APP_CONFIG_OID:
+                session.mark_app_config_sent(accepted_app_config_tlv(item.app_config_tlv, result))
+            item.confirmed = True
+        state = session.session_state.state if session.session_state is not None else None
+        if item.oid is None:
+            return self.fira_session_bring_up_submit(item, EnumUwbSessionOid.SESSION_INIT_OID, timeout_ms, self.uci_session_init,
+                                                     session.session_id, EnumSessionType.SESSION_TYPE_FIRA_RANGING)
+        if not item.confirmed:
+            return False
+        if state == EnumSessionState.SESSION_STATE_DEINIT:
+            log_e("Error: session %s deinitialized, reason: %s", hex(session.session_id), session.session_state.reason_code)
+            item.done = True
+            return True
+        if item.oid is EnumUwbSessionOid.SESSION_INIT_OID:
+            if state != EnumSessionState.SESSION_STATE_INIT:
+                return False
+            item.app_config_tlv = self.fira_session_app_config_tlv(session.session_id)
+            if item.app_config_tlv is None:
+                item.done = True
+                return True
+            return self.fira_session_bring_up_submit(item, EnumUwbSessionOid.SESSION_SET_APP_CONFIG_OID, timeout_ms,
+                                                     self.uci_session_set_app_config, session.session_id, item.app_config_tlv)
+        if item.oid is EnumUwbSessionOid.SESSION_SET_APP_CONFIG_OID:
+            # the device handles the commands in order, RANGE_START finds the session IDLE
+            return self.fira_session_bring_up_submit(item, EnumUwbRangeOid.RANGE_START_OID, timeout_ms, self.uci_range_start, session.session_id)
+        if state == EnumSessionState.SESSION_STATE_ACTIVE:
+            item.done = True
+            item.active = True
+            return True
+        return False
+
+    def fira_session_bring_up_submit(self, item: FiRaSessionBringUp, oid, timeout_ms, command, *args) -> bool:
+        future = self.submit(command, *args, timeout_ms=timeout_ms)
+        if future is None:
+            return False
+        item.oid = oid
+        item.future = future
+        item.confirmed = False
+        return True
+
+    def set_range_recorder(self, recorder):
+        """
+        Record the range notifications returned by fira_session_range_run (uci_range_recorder.UciRangeRecorder), None to stop
+        """
+        self.range_recorder = recorder
 
     def fira_session_range_run(self) -> UciRspNtfResult:
         """
         Run FiRa ranging session run, always wait for response/ntf
         """
-        return self.wait_response(timeout_ms=500)
+        result = self.wait_response(timeout_ms=500)
+        if self.range_recorder is not None and result.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
+            self.range_recorder.append(result.uci_result)
+        return result
 
 
     def fira_session_range_stop(self, session_id):
         """
         Stop a FiRa ranging session
         """
-        self.uci_range_stop(session_id)
+        return self.session_transition(session_id, EnumSessionState.SESSION_STATE_IDLE, self.uci_range_stop, timeout_ms=200)
+
+    def fira_session_deinit(self, session_id):
+        '''
+        Deinitialize FiRa ranging session
+        '''
+        return self.session_transition(session_id, EnumSessionState.SESSION_STATE_DEINIT, self.uci_session_deinit, timeout_ms=300)
+
 
-        # Wait for response
-        result = self.wait_response(timeout_ms=200)
+class AsyncFiRaRangingDevice(AsyncUCILayer):
+    '''
+        asyncio front-end of a FiRaRangingDevice, the session commands resolve on their RSP and SESSION_STATUS_NTF
+    '''
+
+    def __init__(self, ranging_device: FiRaRangingDevice, executor=None, poll_ms=20, ntf_queue_size=256):
+        super().__init__(ranging_device, executor, poll_ms, ntf_queue_size)
 
+    async def fira_session_init(self, session: FiRaSessionParam) -> UciRspNtfResult:
+        self.layer.session_map[session.session_id] = session
+        self.layer.register_notification_callback(
+                EnumUciGid.UWB_RANGE_GID, EnumUwbRangeOid.RANGE_START_OID.value, uci_uwb_range_data_ntf_callback)
+        return await self.session_transition(session.session_id, EnumSessionState.SESSION_STATE_INIT,
+                                             self.layer.uci_session_init, session.session_id, EnumSessionType.SESSION_TYPE_FIRA_RANGING, timeout_ms=200)
+
+    async def fira_session_set_app_config(self, session_id: int) -> UciRspNtfResult:
+        app_config_tlv = self.layer.fira_session_app_config_tlv(session_id)
+        if app_config_tlv is None:
+            return None
+        result = await self.command(self.layer.uci_session_set_app_config, session_id, app_config_tlv, timeout_ms=200)
         if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
-        else:
-            log_i(str(result.uci_result))
-            
-        # Wait for SESSION_STATUS_NTF
-        result = self.wait_response(timeout_ms=200)
-        if result is not None:
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
-                self.session_map[result.uci_result.session_id].session_state = result.uci_result
+            log_e("Error: %s", result.status)
+        self.layer.session_map[session_id].mark_app_config_sent(accepted_app_config_tlv(app_config_tlv, result))
+        return result
+
+    async def fira_session_update_app_config(self, session_id: int) -> UciRspNtfResult:
+        app_config_tlv = self.layer.fira_session_unsent_app_config_tlv(session_id)
+        if app_config_tlv is None or len(app_config_tlv) == 0:
+            return None
+        result = await self.command(self.layer.uci_session_set_app_config, session_id, app_config_tlv, timeout_ms=200)
+        if result.status is not EnumUciStatus.UCI_STATUS_OK:
+            log_e("Error: %s", result.status)
+        self.layer.session_map[session_id].mark_app_config_sent(accepted_app_config_tlv(app_config_tlv, result))
+        return result
 
+    async def fira_session_range_start(self, session_id: int) -> UciRspNtfResult:
+        return await self.session_transition(session_id, EnumSessionState.SESSION_STATE_ACTIVE, self.layer.uci_range_start, session_id)
 
-    def fira_session_deinit(self, session_id):
+    async def fira_session_range_stop(self, session_id: int) -> UciRspNtfResult:
+        return await self.session_transition(session_id, EnumSessionState.SESSION_STATE_IDLE, self.layer.uci_range_stop, session_id, timeout_ms=200)
+
+    async def fira_session_deinit(self, session_id: int) -> UciRspNtfResult:
+        return await self.session_transition(session_id, EnumSessionState.SESSION_STATE_DEINIT, self.layer.uci_session_deinit, session_id, timeout_ms=300)
+
+    async def fira_session_bring_up(self, sessions: list[FiRaSessionParam]) -> dict[int, bool]:
         '''
-        Deinitialize FiRa ranging session
+            @brief bring several sessions to ACTIVE concurrently, see FiRaRangingDevice.fira_session_bring_up
+            @return {session_id: True if the session is ACTIVE}
         '''
-        self.uci_session_deinit(session_id)
-        # Wait for response
-        result = self.wait_response(timeout_ms=200)
-        if result is not None:
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
-                
-        # Wait for SESSION_STATUS_NTF
-        result = self.wait_response(timeout_ms=300)
-        if result is not None:
-            if result.status is not EnumUciStatus.UCI_STATUS_OK:
-                log_e("Error: " + str(result.status))
-            else:
-                log_i(str(result.uci_result))
-                if isinstance(result.uci_result, UWBSessionState):
-                    self.session_map[result.uci_result.session_id].session_state = result.uci_result
-                    # self.session_map.pop(session_id)        
+        states = await asyncio.gather(*[self.fira_session_bring_up_one(session) for session in sessions])
+        return {session.session_id: active for session, active in zip(sessions, states)}
 
-        
+    async def fira_session_bring_up_one(self, session: FiRaSessionParam) -> bool:
+        result = await self.fira_session_init(session)
+        if result.status is not EnumUciStatus.UCI_STATUS_OK:
+            return False
+        result = await self.fira_session_set_app_config(session.session_id)
+        if result is None or result.status is not EnumUciStatus.UCI_STATUS_OK:
+            return False
+        result = await self.fira_session_range_start(session.session_id)
+        return result.status is EnumUciStatus.UCI_STATUS_OK
+
+    async def range_notifications(self):
+        '''
+            @brief async iterator of the FiRa RANGE_DATA_NTFs
+        '''
+        async for result in self.notifications():
+            if isinstance(result.uci_result, FiraRangeDataNtf):
+                yield result.uci_result
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: batched multilateration: tag positions from the FiRa/CCC distances to anchors of known position,
+       linearized least squares and Gauss-Newton refinement over thousands of epochs per NumPy call
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import numpy as np
+
+from uci_defs import *
+
+# epochs solved per NumPy pass, bounds the (epochs, anchors, dims) temporaries of the refinement
+MULTILATERATION_CHUNK_EPOCHS = 65536
+
+# below this number of epochs per anchor subset, the epochs are solved with their own normal equations
+MULTILATERATION_MIN_EPOCHS_PER_SUBSET = 256
+
+# ranges below this are clamped in the Jacobian, the tag on an anchor
+MULTILATERATION_MIN_RANGE_M = 1e-6
+
+# the rows of one notification share its receive timestamp, a larger step between two rows of a session starts a new epoch
+MULTILATERATION_EPOCH_GAP_S = 0.001
+
+
+class MultilaterationResult():
+    '''
+        @brief positions of a batch of epochs, index i is the i-th epoch (row of the distance matrix)
+               e.g. result.positions[result.valid]
+    '''
+
+    def __init__(self, positions: np.ndarray, residual_rms: np.ndarray, anchor_count: np.ndarray, timestamps: np.ndarray = None):
+        self.positions = positions          # (epochs, dims) in m, NaN when not solved
+        self.residual_rms = residual_rms    # (epochs,) RMS of the range residuals in m, NaN when not solved
+        self.anchor_count = anchor_count    # (epochs,) distances used
+        self.timestamps = timestamps        # (epochs,) host time of the notification, None for a distance matrix
+        self.valid = ~np.isnan(positions[:, 0])
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class MultilaterationSolver():
+    '''
+        Tag positions from the distances to N anchors, one epoch per range notification, all the epochs of a call
+        solved together:
+          - linearized least squares: -2 a_i . x + |x|^2 = d_i^2 - |a_i|^2, unknowns (x, |x|^2). The epochs with
+            the same anchors answering share the matrix, its pseudo-inverse is computed once per anchor subset.
+            With many subsets (many anchors, random losses) the weighted normal equations of every epoch are
+            solved in one batch instead.
+          - Gauss-Newton on the range residuals from the linear solution, all the epochs per iteration.
+        An epoch needs dims + 1 distances, the missing ones are NaN.
+
+        solver = MultilaterationSolver([[0, 0, 2.5], [8, 0, 2.5], [8, 6, 2.5], [0, 6, 2.5]],
+                                       anchor_macs=[0x1001, 0x1002, 0x1003, 0x1004], dims=2, tag_height=1.0)
+        result = solver.solve_records(UciRangeRecorder.load("range_000000.npz"))
+        result = solver.solve(distances)       # (epochs, anchors) in m
+    '''
+
+    def __init__(self, anchor_positions, anchor_macs=None, dims=None, tag_height=0.0, gauss_newton_iterations=5, tolerance_m=1e-4):
+        '''
+            @param anchor_positions: (N, 2) or (N, 3) in m
+            @param anchor_macs: MAC address of each anchor (FiraTwrResult.mac_address, responder index of the CCC
+                                controller exp records), None for 0 .. N-1
+            @param dims: 2 or 3, None for the dimension of anchor_positions. 2D with 3D anchors: the distances are
+                         projected on the horizontal plane at tag_height
+            @param gauss_newton_iterations: refinement iterations, 0 for the linear solution only
+            @param tolerance_m: the refinement stops when no epoch moves more than this
+        '''
+        anchor_positions = np.asarray(anchor_positions, dtype=np.float64)
+        if anchor_positions.ndim != 2 or anchor_positions.shape[1] not in (2, 3):
+            raise ValueError("anchor_positions must be (N, 2) or (N, 3)")
+        self.dims = anchor_positions.shape[1] if dims is None else dims
+        if self.dims not in (2, 3) or self.dims > anchor_positions.shape[1]:
+            raise ValueError(f"dims {dims} not supported with {anchor_positions.shape[1]}D anchors")
+        if len(anchor_positions) < self.dims + 1:
+            raise ValueError(f"{self.dims}D positioning needs at least {self.dims + 1} anchors")
+        if len(anchor_positions) > 63:
+            raise ValueError("at most 63 anchors")
+        self.anchor_count = len(anchor_positions)
+        self.anchors = anchor_positions[:, :self.dims].copy()
+        # vertical offset of every anchor to the tag plane, removed from the distances in 2D
+        if self.dims == 2 and anchor_positions.shape[1] == 3:
+            self.anchor_height_offsets = anchor_positions[:, 2] - tag_height
+        else:
+            self.anchor_height_offsets = None
+        self.anchor_macs = np.arange(self.anchor_count, dtype=np.uint64) if anchor_macs is None else np.asarray(anchor_macs, dtype=np.uint64)
+        if len(self.anchor_macs) != self.anchor_count:
+            raise ValueError("one MAC address per anchor")
+        self.gauss_newton_iterations = gauss_newton_iterations
+        self.tolerance_m = tolerance_m
+        # anchor subset bit mask -> pseudo-inverse of its linear system, None if degenerate
+        self.pinv_cache = {}
+
+    def solve(self, distances, timestamps=None) -> MultilaterationResult:
+        '''
+            @param distances: (epochs, N) in m, column i for anchor i, NaN if missing
+            @param timestamps: optional (epochs,) passed on to the result
+        '''
+        distances = np.asarray(distances, dtype=np.float64)
+        if distances.ndim != 2 or distances.shape[1] != self.anchor_count:
+            raise ValueError(f"distances must be (epochs, {self.anchor_count})")
+        positions = np.full((len(distances), self.dims), np.nan)
+        residual_rms = np.full(len(distances), np.nan)
+        anchor_count = np.zeros(len(distances), dtype=np.int64)
+        for start in range(0, len(distances), MULTILATERATION_CHUNK_EPOCHS):
+            end = start + MULTILATERATION_CHUNK_EPOCHS
+            positions[start:end], residual_rms[start:end], anchor_count[start:end] = self.solve_chunk(distances[start:end])
+        return MultilaterationResult(positions, residual_rms, anchor_count, timestamps)
+
+    def solve_chunk(self, distances: np.ndarray) -> tuple:
+        if self.anchor_height_offsets is not None:
+            with np.errstate(invalid="ignore"):
+                distances = np.sqrt(np.maximum(distances * distances - self.anchor_height_offsets * self.anchor_height_offsets, 0.0))
+        mask = ~np.isnan(distances)
+        anchor_count = mask.sum(axis=1)
+        positions = self.linear_solve(distances, mask, anchor_count)
+        solved = ~np.isnan(positions[:, 0])
+        residual_rms = np.full(len(distances), np.nan)
+        if not solved.any():
+            return positions, residual_rms, anchor_count
+        refined, residual_rms[solved] = self.gauss_newton(positions[solved], distances[solved], mask[solved])
+        positions[solved] = refined
+        return positions, residual_rms, anchor_count
+
+    def subset_pinv(self, subset_key: int, columns: np.ndarray) -> np.ndarray:
+        '''
+            @return pseudo-inverse (dims + 1, n) of the linear system of the anchor subset, None if degenerate
+        '''
+        if subset_key not in self.pinv_cache:
+            a = self.anchors[columns]
+            matrix = np.hstack((-2.0 * a, np.ones((len(a), 1))))
+            if np.linalg.matrix_rank(matrix) < self.dims + 1:
+                self.pinv_cache[subset_key] = None
+            else:
+                self.pinv_cache[subset_key] = np.linalg.pinv(matrix)
+        return self.pinv_cache[subset_key]
+
+    def linear_solve(self, distances: np.ndarray, mask: np.ndarray, anchor_count: np.ndarray) -> np.ndarray:
+        '''
+            @return (epochs, dims) linearized least squares positions, NaN with too few anchors or a degenerate subset
+        '''
+        positions = np.full((len(distances), self.dims), np.nan)
+        rhs = np.where(mask, distances * distances, 0.0) - np.sum(self.anchors * self.anchors, axis=1)
+        bits = np.left_shift(np.int64(1), np.arange(self.anchor_count, dtype=np.int64))
+        subset_keys = mask.astype(np.int64) @ bits
+        enough = anchor_count >= self.dims + 1
+        keys, inverse = np.unique(subset_keys[enough], return_inverse=True)
+        if len(inverse) < len(keys) * MULTILATERATION_MIN_EPOCHS_PER_SUBSET:
+            return self.normal_solve(rhs, mask, enough)
+        epochs = np.flatnonzero(enough)
+        for index, key in enumerate(keys):
+            columns = np.flatnonzero((int(key) >> np.arange(self.anchor_count)) & 1)
+            pinv = self.subset_pinv(int(key), columns)
+            if pinv is None:
+                continue
+            rows = epochs[inverse == index]
+            solution = rhs[np.ix_(rows, columns)] @ pinv.T
+            positions[rows] = solution[:, :self.dims]
+        return positions
+
+    def normal_solve(self, rhs: np.ndarray, mask: np.ndarray, enough: np.ndarray) -> np.ndarray:
+        '''
+            @brief linear_solve with the normal equations A^T W A of every epoch, W the mask of its anchors
+        '''
+        positions = np.full((len(rhs), self.dims), np.nan)
+        design = np.hstack((-2.0 * self.anchors, np.ones((self.anchor_count, 1))))
+        weighted = design.T[None, :, :] * mask[:, None, :]
+        normal = weighted @ design
+        # degenerate subset: determinant negligible against the scale of the matrix
+        scale = (np.trace(normal, axis1=1, axis2=2) / (self.dims + 1)) ** (self.dims + 1)
+        solvable = enough & (np.abs(np.linalg.det(normal)) > 1e-10 * scale)
+        positions[solvable] = np.linalg.solve(normal[solvable], weighted[solvable] @ rhs[solvable, :, None])[:, :self.dims, 0]
+        return positions
+
+    def gauss_newton(self, positions: np.ndarray, distances: np.ndarray, mask: np.ndarray) -> tuple:
+        '''
+            @return refined (epochs, dims) positions, (epochs,) RMS range residuals
+        '''
+        positions = positions.copy()
+        measured = np.where(mask, distances, 0.0)
+        damping = 1e-9 * np.eye(self.dims)
+        # the epochs still moving, the converged ones leave the iterations
+        active = np.arange(len(positions))
+        for _ in range(self.gauss_newton_iterations):
+            offsets = positions[active, None, :] - self.anchors[None, :, :]
+            ranges = np.maximum(np.sqrt(np.sum(offsets * offsets, axis=2)), MULTILATERATION_MIN_RANGE_M)
+            weights = mask[active]
+            residuals = np.where(weights, measured[active] - ranges, 0.0)
+            jacobian = offsets * (weights / ranges)[:, :, None]
+            jacobian_t = jacobian.transpose(0, 2, 1)
+            step = np.linalg.solve(jacobian_t @ jacobian + damping, jacobian_t @ residuals[:, :, None])[:, :, 0]
+            # a singular epoch keeps its previous estimate
+            step[~np.isfinite(step).all(axis=1)] = 0.0
+            positions[active] += step
+            active = active[np.max(np.abs(step), axis=1) >= self.tolerance_m]
+            if len(active) == 0:
+                break
+        offsets = positions[:, None, :] - self.anchors[None, :, :]
+        residuals = np.where(mask, measured - np.sqrt(np.sum(offsets * offsets, axis=2)), 0.0)
+        residual_rms = np.sqrt(np.sum(residuals * residuals, axis=1) / mask.sum(axis=1))
+        return positions, residual_rms
+
+    def distance_matrix(self, records: np.ndarray, session_id=None) -> tuple:
+        '''
+            @brief one epoch per range notification of UciRangeRecorder records: the consecutive rows of a session with
+                   the same seq_num and timestamp. (session_id, seq_num) alone repeats over a long recording, the CCC
+                   rr_index wraps at 16 bits and the FiRa seq_num restarts with the session.
+                   The measurements with a status other than UCI_STATUS_OK or of an unknown MAC are dropped
+            @param session_id: only this session, None for all
+            @return (timestamps (epochs,), distances (epochs, N) in m), in time order
+        '''
+        keep = records["status"] == EnumUciStatus.UCI_STATUS_OK.value
+        if session_id is not None:
+            keep &= records["session_id"] == session_id
+        records = records[keep]
+        macs = records["mac"].astype(np.uint64)
+        order = np.argsort(self.anchor_macs)
+        sorted_macs = self.anchor_macs[order]
+        index = np.minimum(np.searchsorted(sorted_macs, macs), self.anchor_count - 1)
+        known = sorted_macs[index] == macs
+        records = records[known]
+        columns = order[index[known]]
+        # lexsort is stable, the rows of one notification keep their order
+        row_order = np.lexsort((records["timestamp"], records["session_id"]))
+        records = records[row_order]
+        columns = columns[row_order]
+        new_epoch = np.ones(len(records), dtype=bool)
+        new_epoch[1:] = ((records["session_id"][1:] != records["session_id"][:-1])
+                         | (records["seq_num"][1:] != records["seq_num"][:-1])
+                         | (np.diff(records["timestamp"]) > MULTILATERATION_EPOCH_GAP_S))
+        epochs = np.cumsum(new_epoch) - 1
+        epoch_count = int(epochs[-1]) + 1 if len(epochs) > 0 else 0
+        timestamps = np.zeros(epoch_count)
+        timestamps[epochs] = records["timestamp"]
+        distances = np.full((epoch_count, self.anchor_count), np.nan)
+        # cm
+        distances[epochs, columns] = records["distance"] * 0.01
+        time_order = np.argsort(timestamps, kind="stable")
+        return timestamps[time_order], distances[time_order]
+
+    def solve_records(self, records: np.ndarray, session_id=None) -> MultilaterationResult:
+        '''
+            @param records: RANGE_RECORD_DTYPE rows (UciRangeRecorder.snapshot()/load(), UciProcessIngest.read())
+        '''
+        timestamps, distances = self.distance_matrix(records, session_id)
+        return self.solve(distances, timestamps)
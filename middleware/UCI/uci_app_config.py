@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: declarative SESSION_SET_APP_CONFIG encoding: one field table per session type, the TLVs are cached
+       per field and only the assigned (dirty) fields are encoded again
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import copy
+import struct
+
+from uci_defs import *
+
+APP_CONFIG_U16 = struct.Struct("<H")
+APP_CONFIG_U32 = struct.Struct("<I")
+
+
+def pack_u8(value) -> list[int]:
+    return [value]
+
+
+def pack_u16(value) -> list[int]:
+    return list(APP_CONFIG_U16.pack(value))
+
+
+def pack_u32(value) -> list[int]:
+    return list(APP_CONFIG_U32.pack(value))
+
+
+def pack_bytes(value) -> list[int]:
+    return list(value)
+
+
+def pack_u16_list(values) -> list[int]:
+    '''
+        @brief list of short MAC addresses
+    '''
+    buf = []
+    for value in values:
+        buf += APP_CONFIG_U16.pack(value)
+    return buf
+
+
+def pack_session_key(value) -> list[int]:
+    '''
+        @brief URSK / session key, preceded by its key index 0
+    '''
+    return [0] + list(value)
+
+
+class AppConfigField():
+    '''
+        One app config parameter: the attribute of the session param, its TLV tag and length, the value packer
+    '''
+    __slots__ = ("name", "tag", "width", "packer")
+
+    def __init__(self, name: str, tag: EnumSessionAppConfigID, width, packer):
+        '''
+            @param width: TLV length in bytes, None for the length of the packed value (lists)
+            @param packer: func(value) -> list[int]
+        '''
+        self.name = name
+        self.tag = int(tag)
+        self.width = width
+        self.packer = packer
+
+    def encode(self, value) -> UciConfigTLV:
+        buf = self.packer(value)
+        return UciConfigTLV(self.tag, self.width if self.width is not None else len(buf), buf)
+
+
+class AppConfigParam():
+    '''
+        Base of the session params (FiRaSessionParam, CCCSessionParam), encodes the attributes listed in
+        app_config_fields into UciConfigTLV.
+
+        Every field is encoded once and cached, assigning an attribute marks it dirty and only the dirty fields are
+        encoded again by get_app_config_tlv(). The list attributes are also compared with the copy taken when
+        they were encoded, an in-place change (param.dst_mac_addr.append(...)) is picked up as well.
+
+        The TLVs accepted by the device are recorded (mark_app_config_sent), get_unsent_app_config_tlv() returns
+        the fields changed since, to reconfigure a live session with the delta only.
+    '''
+    # tuple of AppConfigField, in TLV order
+    app_config_fields = ()
+
+    @classmethod
+    def app_config_default_param(cls):
+        '''
+            @return the param holding the default values: the fields equal to them are not sent
+        '''
+        raise NotImplementedError
+
+    @classmethod
+    def app_config_field_map(cls) -> dict:
+        field_map = cls.__dict__.get("app_config_field_map_cache")
+        if field_map is None:
+            field_map = {field.name: field for field in cls.app_config_fields}
+            cls.app_config_field_map_cache = field_map
+        return field_map
+
+    @classmethod
+    def app_config_field_index(cls) -> dict:
+        field_index = cls.__dict__.get("app_config_field_index_cache")
+        if field_index is None:
+            field_index = {field.name: index for index, field in enumerate(cls.app_config_fields)}
+            cls.app_config_field_index_cache = field_index
+        return field_index
+
+    @classmethod
+    def app_config_tag_map(cls) -> dict:
+        tag_map = cls.__dict__.get("app_config_tag_map_cache")
+        if tag_map is None:
+            tag_map = {field.tag: field.name for field in cls.app_config_fields}
+            cls.app_config_tag_map_cache = tag_map
+        return tag_map
+
+    @classmethod
+    def app_config_defaults(cls) -> dict:
+        defaults = cls.__dict__.get("app_config_defaults_cache")
+        if defaults is None:
+            default_param = cls.app_config_default_param()
+            defaults = {field.name: copy.copy(getattr(default_param, field.name)) for field in cls.app_config_fields}
+            cls.app_config_defaults_cache = defaults
+        return defaults
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        dirty = self.__dict__.get("app_config_dirty")
+        if dirty is not None and name in self.app_config_field_map():
+            dirty.add(name)
+
+    def refresh_app_config(self) -> bool:
+        '''
+            @brief encode the fields assigned or modified in place since the last call
+            @return True if a field was encoded again
+        '''
+        state = self.__dict__
+        if "app_config_dirty" not in state:
+            object.__setattr__(self, "app_config_tlvs", {})          # name -> UciConfigTLV of the current value
+            object.__setattr__(self, "app_config_snapshot", {})      # name -> copy of a list value when encoded
+            object.__setattr__(self, "app_config_changed", set())    # names of the fields which differ from the defaults
+            object.__setattr__(self, "app_config_tlv_list", None)    # cached get_app_config_tlv(), None when stale
+            object.__setattr__(self, "app_config_tlv_index", {})     # name -> index in app_config_tlv_list
+            object.__setattr__(self, "app_config_sent", {})          # name -> UciConfigTLV accepted by the device
+            object.__setattr__(self, "app_config_unsent", set(self.app_config_field_map()))  # encoded since sent
+            object.__setattr__(self, "app_config_dirty", set(self.app_config_field_map()))
+        dirty = self.app_config_dirty
+        for name, snapshot in self.app_config_snapshot.items():
+            if state[name] != snapshot:
+                dirty.add(name)
+        if len(dirty) == 0:
+            return False
+        field_map = self.app_config_field_map()
+        defaults = self.app_config_defaults()
+        changed = self.app_config_changed
+        tlv_list = self.app_config_tlv_list
+        for name in dirty:
+            value = state[name]
+            tlv = self.app_config_tlvs[name] = field_map[name].encode(value)
+            self.app_config_unsent.add(name)
+            if isinstance(value, list):
+                self.app_config_snapshot[name] = list(value)
+            else:
+                self.app_config_snapshot.pop(name, None)
+            if value != defaults[name]:
+                if tlv_list is not None and name in changed:
+                    # still sent, same place in the list
+                    tlv_list[self.app_config_tlv_index[name]] = tlv
+                else:
+                    changed.add(name)
+                    tlv_list = None
+            elif name in changed:
+                changed.discard(name)
+                tlv_list = None
+        dirty.clear()
+        object.__setattr__(self, "app_config_tlv_list", tlv_list)
+        return True
+
+    def get_app_config_field_tlv(self, name: str) -> UciConfigTLV:
+        '''
+            @brief the TLV of one field, whatever its value (mandatory parameters)
+        '''
+        self.refresh_app_config()
+        return self.app_config_tlvs[name]
+
+    def get_app_config_tlv(self, param=None) -> list[UciConfigTLV]:
+        '''
+            @param param: the param to compare with, None for the default values
+            @return the TLVs of the fields which differ, in app_config_fields order
+        '''
+        if isinstance(param, AppConfigParam):
+            return [field.encode(getattr(self, field.name)) for field in self.app_config_fields
+                    if getattr(param, field.name) != getattr(self, field.name)]
+        self.refresh_app_config()
+        if self.app_config_tlv_list is None:
+            changed = self.app_config_changed
+            names = [field.name for field in self.app_config_fields if field.name in changed]
+            object.__setattr__(self, "app_config_tlv_list", [self.app_config_tlvs[name] for name in names])
+            object.__setattr__(self, "app_config_tlv_index", {name: index for index, name in enumerate(names)})
+        # the callers append the mandatory TLVs to the list
+        return list(self.app_config_tlv_list)
+
+    def get_unsent_app_config_tlv(self) -> list[UciConfigTLV]:
+        '''
+            @return the TLVs of the fields changed since they were accepted by the device, in app_config_fields order.
+                    The fields never sent are compared with the defaults, the device starts from them.
+        '''
+        self.refresh_app_config()
+        field_index = self.app_config_field_index()
+        sent = self.app_config_sent
+        tlv_list = []
+        for name in sorted(self.app_config_unsent, key=field_index.__getitem__):
+            tlv = self.app_config_tlvs[name]
+            previous = sent.get(name)
+            if previous is None:
+                if name in self.app_config_changed:
+                    tlv_list.append(tlv)
+            elif previous != tlv:
+                tlv_list.append(tlv)
+            else:
+                # assigned again with the value of the device
+                self.app_config_unsent.discard(name)
+        return tlv_list
+
+    def mark_app_config_sent(self, tlv_list: list[UciConfigTLV]):
+        '''
+            @brief record the TLVs accepted by SESSION_SET_APP_CONFIG, see accepted_app_config_tlv()
+        '''
+        self.refresh_app_config()
+        tag_map = self.app_config_tag_map()
+        for tlv in tlv_list:
+            name = tag_map.get(tlv.tag)
+            if name is None:
+                continue
+            self.app_config_sent[name] = tlv
+            if self.app_config_tlvs[name] == tlv:
+                self.app_config_unsent.discard(name)
+
+
+def accepted_app_config_tlv(app_config_tlv: list[UciConfigTLV], result) -> list[UciConfigTLV]:
+    '''
+        @param result: UciRspNtfResult of SESSION_SET_APP_CONFIG
+        @return the TLVs applied by the device: all of them on UCI_STATUS_OK, else the ones without a param status
+    '''
+    if result is None or result.message_type != EnumUciMessageType.UCI_MT_RESPONSE:
+        return []
+    if result.status == EnumUciStatus.UCI_STATUS_OK:
+        return app_config_tlv
+    param_status = getattr(result.uci_result, "param_status", None)
+    if not param_status:
+        return []
+    rejected = {int(status.id) for status in param_status}
+    return [tlv for tlv in app_config_tlv if tlv.tag not in rejected]
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file:   asyncio front-end of the UCI Layer
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import asyncio
+import functools
+
+from console_helper import *
+
+from uci_defs import *
+from uci_message import *
+from uci_layer import UCILayer
+
+
+class AsyncUCILayer():
+    '''
+        asyncio front-end of a UCILayer, one event loop can drive many devices.
+        The blocking SPI/USB calls run in the executor, a pump task receives the frames of the device:
+        the responses complete the submitted commands (UCILayer.submit), the notifications are queued for the async iterator.
+        Up to layer.max_commands_in_flight commands can be awaited concurrently, see UCILayer.enable_command_pipelining.
+    '''
+
+    def __init__(self, layer: UCILayer, executor=None, poll_ms=20, ntf_queue_size=256):
+        '''
+            @param layer: UCILayer (or FiRaRangingDevice/CCCRangingDevice) to drive
+            @param executor: concurrent.futures executor for the blocking calls, None for the loop default executor
+            @param poll_ms: INT_N wait per executor call of the pump
+            @param ntf_queue_size: max number of queued notifications, the oldest is dropped when full
+        '''
+        self.layer = layer
+        self.executor = executor
+        self.poll_ms = poll_ms
+        self.ntf_queue = asyncio.Queue(maxsize=ntf_queue_size)
+        self.ntf_dropped_count = 0
+        # wakes the waiters of wait_session_state, the states themselves are in layer.session_states
+        self.session_state_changed = asyncio.Condition()
+        # layer.max_commands_in_flight, the commands over it wait here instead of blocking an executor thread
+        self.command_slots = None
+        self.command_slots_size = 0
+        self.pump_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def __aiter__(self):
+        return self.notifications()
+
+    async def run_blocking(self, func, *args, **kwargs):
+        '''
+            @brief run a blocking call of the layer/device in the executor
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def start(self):
+        if self.pump_task is None:
+            self.layer.rx_in_background = True
+            self.pump_task = asyncio.create_task(self.pump())
+
+    async def stop(self):
+        if self.pump_task is not None:
+            self.pump_task.cancel()
+            try:
+                await self.pump_task
+            except asyncio.CancelledError:
+                pass
+            self.pump_task = None
+            self.layer.rx_in_background = False
+
+    async def pump(self):
+        while True:
+            try:
+                result = await self.run_blocking(self.layer.poll_message, self.poll_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_e("Async UCI Layer: receive failed: %s", e)
+                continue
+            if result is None:
+                continue
+            if result.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
+                if not self.layer.complete_pending_command(result):
+                    log_w("Async UCI Layer: drop unexpected response, GID: %#x OID: %#x", result.gid, result.oid)
+            elif result.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
+                if isinstance(result.uci_result, UWBSessionState):
+                    await self.on_session_state(result.uci_result)
+                if self.ntf_queue.full():
+                    self.ntf_queue.get_nowait()
+                    self.ntf_dropped_count += 1
+                self.ntf_queue.put_nowait(result)
+
+    async def on_session_state(self, session_state: UWBSessionState):
+        self.layer.update_session_state(session_state)
+        async with self.session_state_changed:
+            self.session_state_changed.notify_all()
+
+    async def command(self, send, *args, timeout_ms=500) -> UciRspNtfResult:
+        '''
+            @brief transmit a uci_* command of the layer and await its response (matched by GID/OID)
+            e.g. result = await async_layer.command(layer.uci_session_get_state, session_id)
+            @return UciRspNtfResult, status UCI_STATUS_FAILED on timeout
+        '''
+        if self.command_slots is None or self.command_slots_size != self.layer.max_commands_in_flight:
+            self.command_slots_size = self.layer.max_commands_in_flight
+            self.command_slots = asyncio.Semaphore(self.command_slots_size)
+        async with self.command_slots:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout_ms / 1000
+            future = await self.run_blocking(self.layer.submit, send, *args, timeout_ms=timeout_ms)
+            if future is None:
+                return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
+            try:
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                self.layer.cancel_pending_command(future)
+                if future.done() and not future.cancelled():
+                    return future.result()
+                log_e("Async UCI Layer: no response, GID: %#x OID: %#x", future.uci_gid, future.uci_oid)
+                return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, future.uci_gid, future.uci_oid, EnumUciStatus.UCI_STATUS_FAILED, [])
+
+    async def wait_notification(self, timeout_ms=None) -> UciRspNtfResult:
+        '''
+            @brief await the next notification, None on timeout
+        '''
+        try:
+            return await asyncio.wait_for(self.ntf_queue.get(), None if timeout_ms is None else timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            return None
+
+    async def notifications(self):
+        '''
+            @brief async iterator of all the notifications
+        '''
+        while True:
+            yield await self.ntf_queue.get()
+
+    async def wait_session_state(self, session_id: int, state: EnumSessionState, timeout_ms=500) -> bool:
+        '''
+            @brief await a SESSION_STATUS_NTF reporting the state of the session (layer.session_states),
+                   call layer.session_states.expect(session_id) before the command
+            @return True if reached, False on timeout or if the session was deinitialized instead
+        '''
+        session_states = self.layer.session_states
+        async with self.session_state_changed:
+            try:
+                await asyncio.wait_for(self.session_state_changed.wait_for(lambda: session_states.check_state(session_id, state) is not None),
+                                       timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                log_e("Async UCI Layer: session %#x did not reach %s", session_id, state.name)
+                return False
+        if not session_states.check_state(session_id, state):
+            log_e("Async UCI Layer: session %#x deinitialized, reason: %s", session_id, session_states.get(session_id).reason_code.name)
+            return False
+        return True
+
+    async def session_transition(self, session_id: int, state: EnumSessionState, send, *args, timeout_ms=500) -> UciRspNtfResult:
+        '''
+            @brief transmit a session command, await the response and then the SESSION_STATUS_NTF of the new state
+            @return UciRspNtfResult of the response, its status is UCI_STATUS_FAILED if the state was not reached
+        '''
+        self.layer.session_states.expect(session_id)
+        result = await self.command(send, *args, timeout_ms=timeout_ms)
+        if result.status is not EnumUciStatus.UCI_STATUS_OK:
+            log_e("Error: %s", result.status)
+            return result
+        if not await self.wait_session_state(session_id, state, timeout_ms):
+            result.status = EnumUciStatus.UCI_STATUS_FAILED
+        return result
@@ -28,6 +28,8 @@ class EnumCCCRangeStatus(IntEnum):
 
 class CCCRangeDataNtfControlee():
     
+    __slots__ = ("session_id", "range_status", "sts_index", "rr_index", "distance", "anchor_fom", "initiator_fom", "ccm_tag")
+
     def __init__(self, session_id: int, range_status: EnumCCCRangeStatus, sts_index, rr_index, distance, anchor_fom, initiator_fom, ccm_tag: list[int]):
         self.session_id = session_id
         self.range_status = range_status
@@ -40,7 +42,8 @@ class CCCRangeDataNtfControlee():
     
     @staticmethod
     def from_bytes(byte_stream):
-        if not isinstance(byte_stream, bytes):
+        # bytes-like (bytes/memoryview) used as is, the slices of a memoryview are not copied
+        if isinstance(byte_stream, list):
             byte_stream = bytes(byte_stream)
         session_id = struct.unpack("<I", byte_stream[0:4])[0]
         range_status = EnumCCCRangeStatus((byte_stream[4]>>4)&0x0F)  # MSB 4 bit, Responder ranging status
@@ -49,7 +52,7 @@ class CCCRangeDataNtfControlee():
         distance = struct.unpack("<H", byte_stream[11:13])[0]   # distance in cm
         anchor_fom = byte_stream[13]                            # Ranging timestamp uncertainty of controlee
         initiator_fom = byte_stream[14]                         # Ranging timestamp uncertainty of controller
-        ccm_tag = byte_stream[15:23]                            # CCM* Tag calculated over all payload fileds, CCM* TAG can be set to all 0xFF if not used
+        ccm_tag = bytes(byte_stream[15:23])                     # CCM* Tag calculated over all payload fileds, CCM* TAG can be set to all 0xFF if not used
         return CCCRangeDataNtfControlee(session_id, range_status, sts_index, rr_index, distance, anchor_fom, initiator_fom, ccm_tag)
         
     def __str__(self) -> str:
@@ -63,6 +66,8 @@ class CCCRangeDataNtfControlee():
             
 class CCCRangeDataNtfController():
     
+    __slots__ = ("session_id", "range_status", "sts_index", "rr_index", "response_status", "ccm_tag")
+
     def __init__(self, session_id, range_status, sts_index, rr_index, response_status, ccm_tag: list[int]):
         self.session_id = session_id
         self.range_status = range_status
@@ -73,14 +78,14 @@ class CCCRangeDataNtfController():
     
     @staticmethod
     def from_bytes(byte_stream):
-        if not isinstance(byte_stream, bytes):
+        if isinstance(byte_stream, list):
             byte_stream = bytes(byte_stream)
         session_id = struct.unpack("<I", byte_stream[0:4])[0]
         range_status = EnumCCCRangeStatus(byte_stream[4]&0x0F)
         sts_index = struct.unpack("<I", byte_stream[5:9])[0]
         rr_index = struct.unpack("<H", byte_stream[9:11])[0]
         response_status = struct.unpack("<I", byte_stream[11:15])[0]
-        ccm_tag = byte_stream[15:23]
+        ccm_tag = bytes(byte_stream[15:23])
         return CCCRangeDataNtfController(session_id, range_status, sts_index, rr_index, response_status, ccm_tag)
     
     def __str__(self) -> str:
@@ -97,13 +102,15 @@ class CCCResponderResult():
         @brief CCC Responder distance, CCC 3.0 Expansion
     '''
 
+    __slots__ = ("responder_index", "distance")
+
     def __init__(self, index, distance):
         self.responder_index = index
         self.distance = distance
 
     @staticmethod
     def from_bytes(byte_stream):
-        if not isinstance(byte_stream, bytes):
+        if isinstance(byte_stream, list):
             byte_stream = bytes(byte_stream)
 
         index = byte_stream[0]
@@ -119,6 +126,8 @@ class CCCRangeDataNtfControllerExp():
     '''
         @brief the Forthink-CCC-MAC which expand the CCC 3.0, the CCC Controller support the distances from responders
     '''
+    __slots__ = ("session_id", "range_status", "sts_index", "rr_index", "response_status", "responder_num", "results")
+
     def __init__(self, session_id, range_status, sts_index, rr_index, response_status, num, results: list[CCCResponderResult]):
         self.session_id = session_id
         self.range_status = range_status
@@ -130,7 +139,7 @@ class CCCRangeDataNtfControllerExp():
     
     @staticmethod
     def from_bytes(byte_stream):
-        if not isinstance(byte_stream, bytes):
+        if isinstance(byte_stream, list):
             byte_stream = bytes(byte_stream)
         session_id = struct.unpack("<I", byte_stream[0:4])[0]
         sts_index = struct.unpack("<I", byte_stream[4:8])[0]
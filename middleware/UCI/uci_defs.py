@@ -18,6 +18,11 @@ import nxp_crc
 # This is forthink UWB Communication Interface Common Class and Functions.
 # @{
 
+# max payload of one UCI control packet, the longer messages are segmented (PBF = 1 on all the packets but the last)
+UCI_MAX_CONTROL_PACKET_PAYLOAD = 255
+# max payload of a reassembled message
+UCI_MAX_MESSAGE_PAYLOAD = 0xFFFF
+
 class EnumUciStatus(IntEnum):
     '''
         UCI Rangging Status Enum, <UCI generic specification 8.5 Table 32>
@@ -440,6 +445,9 @@ class UciMessage:
 
     @classmethod
     def from_bytes(cls, bytes: list[int], remove_crc: bool = False, prior_pbf: bool = False):
+        '''
+            @param bytes: list[int] or bytes-like, pass a memoryview to get the payload as a view without copy
+        '''
         uci_packets = [bytes]
         bytes = bytes[:-2] if remove_crc == True else bytes
         if len(bytes) >= 4:
@@ -507,6 +515,24 @@ class UciMessage:
             self.byte_stream += crc.to_bytes(2, 'little')
         return self.byte_stream
 
+    def to_packets(self, max_payload=UCI_MAX_CONTROL_PACKET_PAYLOAD) -> list[list[int]]:
+        '''
+            @brief the UCI packets of the message, segmented when the payload exceeds max_payload:
+                   same MT/GID/OID on every packet, PBF = 1 on all of them but the last
+            @return list of packet byte streams, [to_byte_stream()] if no segmentation is needed
+        '''
+        payload = list(self.payload)
+        if self.response_status is not None:
+            payload.insert(0, self.response_status.value & 0xFF)
+        if len(payload) <= max_payload:
+            return [self.to_byte_stream()]
+        packets = []
+        for offset in range(0, len(payload), max_payload):
+            segment = payload[offset:offset + max_payload]
+            packet_boundary_flag = 1 if offset + max_payload < len(payload) else 0
+            packets.append([self.message_type.value << 5 | packet_boundary_flag << 4 | self.gid, self.oid, 0, len(segment)] + segment)
+        return packets
+
 
 class UciConfigTLV:
 
@@ -535,17 +561,17 @@ class UciConfigTLV:
             if not is_support_extension:
                 tag = byte_stream[0]
                 length = byte_stream[1]
-                value = byte_stream[2:2+length]
+                value = list(byte_stream[2:2+length])
             else:
                 # check if the Extension Tag ID, if the tag is 0xE0-0xE4, the tag is 2 bytes
                 if (tag==0xE0 or tag==0xE1 or tag==0xE2 or tag==0xE3 or tag == 0xE4) and (len(byte_stream) > 3):
                     tag = byte_stream[1] * 256 + byte_stream[0]
                     length = byte_stream[2]
-                    value = byte_stream[3:3+length]
+                    value = list(byte_stream[3:3+length])
                 else:
                     tag = byte_stream[0]
                     length = byte_stream[1]
-                    value = byte_stream[2:2+length]
+                    value = list(byte_stream[2:2+length])
 
 
         return UciConfigTLV(tag, length, value)
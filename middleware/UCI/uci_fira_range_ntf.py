@@ -21,11 +21,35 @@ class EnumMacAddrMode(IntEnum):
     MAC_LONG_ADDR = 0x03
 
 
+# RANGE_DATA_NTF header, 25 bytes: seq_num, session_id, rfu, cur_ranging_interval, ranging_measure_type, rfu, mac_addr_mode, rfu[8], result_num
+FIRA_RANGE_DATA_NTF_HEADER = struct.Struct("<IIxIBxB8xB")
+# one Two Way Ranging Measurement is 31 bytes in both the mac address modes, the tail is rfu
+FIRA_TWR_RESULT_STRIDE = 31
+FIRA_TWR_RESULT_SHORT = struct.Struct("<HBBHHBHBHBHBB12x")
+FIRA_TWR_RESULT_EXTENDED = struct.Struct("<QBBHHBHBHBHBB6x")
+# field names of FIRA_TWR_RESULT_SHORT/FIRA_TWR_RESULT_EXTENDED, in the wire order
+FIRA_TWR_RESULT_FIELDS = ("mac_address", "status", "nlos", "distance",
+                          "aoa_azimuth", "aoa_azimuth_fom", "aoa_elevation", "aoa_elevation_fom",
+                          "dst_aoa_azimuth", "dst_aoa_azimuth_fom", "dst_aoa_elevation", "dst_aoa_elevation_fom", "slot_index")
+
+
+def iter_twr_results(byte_stream, mac_addr_mode, num):
+    '''
+        @brief unpack the num measurements following the RANGE_DATA_NTF header, one tuple per measurement
+    '''
+    layout = FIRA_TWR_RESULT_EXTENDED if mac_addr_mode > 0 else FIRA_TWR_RESULT_SHORT
+    start = FIRA_RANGE_DATA_NTF_HEADER.size
+    return layout.iter_unpack(memoryview(byte_stream)[start:start + num * FIRA_TWR_RESULT_STRIDE])
+
+
 class FiraTwrResult():
     '''
         @brief Two Way Ranging Measurement Result, reference <UCI generic specification> Table 23
     '''
 
+    # millions of results are kept for the analysis
+    __slots__ = ("mac_address", "status", "nlos", "distance", "slot_index", "aoa_azimuth", "aoa_azimuth_fom", "aoa_elevation", "aoa_elevation_fom", "dst_aoa_azimuth", "dst_aoa_azimuth_fom", "dst_aoa_elevation", "dst_aoa_elevation_fom")
+
     def __init__(self, mac_address, status, nlos, distance, slot_index,
                  aoa_azimuth, aoa_azimuth_fom,
                  aoa_elevation, aoa_elevation_fom,
@@ -47,45 +71,25 @@ class FiraTwrResult():
         self.dst_aoa_elevation_fom = dst_aoa_elevation_fom
 
     @staticmethod
-    def from_bytes(byte_stream, mac_addr_mode=EnumMacAddrMode.MAC_SHORT_ADDR.value):
-        if not isinstance(byte_stream, bytes):
+    def from_fields(fields):
+        '''
+            @param fields: tuple unpacked by FIRA_TWR_RESULT_SHORT/FIRA_TWR_RESULT_EXTENDED, in the wire order
+        '''
+        (mac_addr, status, nlos, distance, aoa_azimuth, aoa_azimuth_fom, aoa_elevation, aoa_elevation_fom,
+         dst_aoa_azimuth, dst_aoa_azimuth_fom, dst_aoa_elevation, dst_aoa_elevation_fom, slot_index) = fields
+        return FiraTwrResult(mac_addr, status, nlos, distance, slot_index, aoa_azimuth, aoa_azimuth_fom,
+                             aoa_elevation, aoa_elevation_fom,
+                             dst_aoa_azimuth, dst_aoa_azimuth_fom,
+                             dst_aoa_elevation, dst_aoa_elevation_fom)
+
+    @staticmethod
+    def from_bytes(byte_stream, mac_addr_mode=EnumMacAddrMode.MAC_SHORT_ADDR.value, offset=0):
+        # bytes-like (bytes/memoryview) used as is, the slices of a memoryview are not copied
+        if isinstance(byte_stream, list):
             byte_stream = bytes(byte_stream)
-        if mac_addr_mode > 0:
-            mac_addr = struct.unpack("<Q", byte_stream[0:8])[0]
-            status = byte_stream[8]
-            nlos = byte_stream[9]
-            distance = struct.unpack("<H", byte_stream[10:12])[0]
-            aoa_azimuth = struct.unpack("<H", byte_stream[12:14])[0]
-            aoa_azimuth_fom = byte_stream[14]
-            aoa_elevation = struct.unpack("<H", byte_stream[15:17])[0]
-            aoa_elevation_fom = byte_stream[17]
-            dst_aoa_azimuth = struct.unpack("<H", byte_stream[18:20])[0]
-            dst_aoa_azimuth_fom = byte_stream[20]
-            dst_aoa_elevation = struct.unpack("<H", byte_stream[21:23])[0]
-            dst_aoa_elevation_fom = byte_stream[23]
-            slot_index = byte_stream[24]
-            return FiraTwrResult(mac_addr, status, nlos, distance, slot_index, aoa_azimuth, aoa_azimuth_fom,
-                                 aoa_elevation, aoa_elevation_fom,
-                                 dst_aoa_azimuth, dst_aoa_azimuth_fom,
-                                 dst_aoa_elevation, dst_aoa_elevation_fom)
-        else:
-            mac_addr = struct.unpack("<H", byte_stream[0:2])[0]
-            status = byte_stream[2]
-            nlos = byte_stream[3]
-            distance = struct.unpack("<H", byte_stream[4:6])[0]
-            aoa_azimuth = struct.unpack("<H", byte_stream[6:8])[0]
-            aoa_azimuth_fom = byte_stream[8]
-            aoa_elevation = struct.unpack("<H", byte_stream[9:11])[0]
-            aoa_elevation_fom = byte_stream[11]
-            dst_aoa_azimuth = struct.unpack("<H", byte_stream[12:14])[0]
-            dst_aoa_azimuth_fom = byte_stream[14]
-            dst_aoa_elevation = struct.unpack("<H", byte_stream[15:17])[0]
-            dst_aoa_elevation_fom = byte_stream[17]
-            slot_index = byte_stream[18]
-            return FiraTwrResult(mac_addr, status, nlos, distance, slot_index, aoa_azimuth, aoa_azimuth_fom,
-                                 aoa_elevation, aoa_elevation_fom,
-                                 dst_aoa_azimuth, dst_aoa_azimuth_fom,
-                                 dst_aoa_elevation, dst_aoa_elevation_fom)
+        layout = FIRA_TWR_RESULT_EXTENDED if mac_addr_mode > 0 else FIRA_TWR_RESULT_SHORT
+        return FiraTwrResult.from_fields(layout.unpack_from(byte_stream, offset))
+
     def __str__(self) -> str:
         return f"RANGE_DATA_NTF: idx: {self.slot_index} \n" \
             + f"         mac address: {hex(self.mac_address)} \n" \
@@ -97,6 +101,8 @@ class FiraRangeDataNtf():
         @brief RANGE_DATA_NTF data payload, reference <UCI generic specification> Table 22
     '''
 
+    __slots__ = ("seq_num", "session_id", "cur_ranging_interval", "ranging_measure_type", "mac_addr_mode", "result_num", "results")
+
     def __init__(self, seq_num, session_id, cur_ranging_interval, ranging_measure_type, mac_addr_mode, result_num, results: list[FiraTwrResult]):
         self.seq_num = seq_num
         self.session_id = session_id
@@ -108,29 +114,30 @@ class FiraRangeDataNtf():
 
     @staticmethod
     def from_bytes(byte_stream):
-        if not isinstance(byte_stream, bytes):
+        if isinstance(byte_stream, list):
             byte_stream = bytes(byte_stream)
-        seq_num = struct.unpack("<I", byte_stream[0:4])[0]
-        session_id = struct.unpack("<I", byte_stream[4:8])[0]
-        # byte_stream[8] rfu
-        range_interval = struct.unpack("<I", byte_stream[9:13])[0]
-        type = byte_stream[13]
-        # byte_stream[14] rfu
-        mac_addr_mode = byte_stream[15]
-        # byte_stream[16:23], rfu
-        num = byte_stream[24]
-        results = []
-        for index in range(num):
-            # the FiRaTwrResult 31 Bytes (all mac addr mode)
-            result = FiraTwrResult.from_bytes(
-                byte_stream[25 + index * 31 : index * 31 + 25 + 31], mac_addr_mode)
-            results.append(result)
+        seq_num, session_id, range_interval, type, mac_addr_mode, num = FIRA_RANGE_DATA_NTF_HEADER.unpack_from(byte_stream, 0)
+        results = [FiraTwrResult.from_fields(fields) for fields in iter_twr_results(byte_stream, mac_addr_mode, num)]
 
         fira_data_ntf = FiraRangeDataNtf(
             seq_num, session_id, range_interval, type, mac_addr_mode, num, results)
 
         return fira_data_ntf
 
+    @staticmethod
+    def decode_columns(byte_stream):
+        '''
+            @brief decode the N results of a RANGE_DATA_NTF in one pass, without a FiraTwrResult per measurement
+            @return FiraRangeDataColumns
+        '''
+        if isinstance(byte_stream, list):
+            byte_stream = bytes(byte_stream)
+        seq_num, session_id, range_interval, type, mac_addr_mode, num = FIRA_RANGE_DATA_NTF_HEADER.unpack_from(byte_stream, 0)
+        columns = list(zip(*iter_twr_results(byte_stream, mac_addr_mode, num)))
+        if len(columns) == 0:
+            columns = [()] * len(FIRA_TWR_RESULT_FIELDS)
+        return FiraRangeDataColumns(seq_num, session_id, range_interval, type, mac_addr_mode, num, columns)
+
     def __str__(self) -> str:
         return f"RANGE_DATA_NTF: seq_num: {self.seq_num} \n" \
             + f"             session_id: {hex(self.session_id)} \n" \
@@ -138,3 +145,29 @@ class FiraRangeDataNtf():
             + f"   ranging_measure_type: {self.ranging_measure_type} \n" \
             + f"          mac_addr_mode: {self.mac_addr_mode} \n" \
             + f"result_num: {self.result_num}, results: {self.results}"
+
+
+class FiraRangeDataColumns():
+    '''
+        @brief RANGE_DATA_NTF decoded column by column, one tuple per field of FiraTwrResult (index i is the i-th result)
+               e.g. columns.distance[i], columns.mac_address[i]
+    '''
+
+    def __init__(self, seq_num, session_id, cur_ranging_interval, ranging_measure_type, mac_addr_mode, result_num, columns):
+        self.seq_num = seq_num
+        self.session_id = session_id
+        self.cur_ranging_interval = cur_ranging_interval
+        self.ranging_measure_type = ranging_measure_type
+        self.mac_addr_mode = mac_addr_mode
+        self.result_num = result_num
+        (self.mac_address, self.status, self.nlos, self.distance,
+         self.aoa_azimuth, self.aoa_azimuth_fom, self.aoa_elevation, self.aoa_elevation_fom,
+         self.dst_aoa_azimuth, self.dst_aoa_azimuth_fom, self.dst_aoa_elevation, self.dst_aoa_elevation_fom,
+         self.slot_index) = columns
+
+    def __str__(self) -> str:
+        return f"RANGE_DATA_NTF: seq_num: {self.seq_num} \n" \
+            + f"             session_id: {hex(self.session_id)} \n" \
+            + f"             result_num: {self.result_num} \n" \
+            + f"            mac_address: {[hex(x) for x in self.mac_address]} \n" \
+            + f"               distance: {list(self.distance)} \n"
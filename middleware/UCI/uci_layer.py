@@ -1,10 +1,26 @@
 import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait as wait_futures
 
 from console_helper import *
 
 from uci_defs import *
 from uci_port import *
 from uci_message import *
+from latency_metrics import *
+from uci_session_state import UciSessionStateTracker
+
+# first two header bytes of a complete message without the PBF and the payload extension/RFU bits: MT | GID, OID
+UCI_HEADER_KEY_MASK = 0xEF3F
+
+
+def uci_header_key(message_type: EnumUciMessageType, gid: int, oid: int) -> int:
+    '''
+        @return the fast dispatch key of a message: (MT << 5 | GID) << 8 | OID, see UCILayer.enable_fast_dispatch()
+    '''
+    return ((int(message_type) << 5 | int(gid)) << 8) | int(oid)
 
 class UCILayer():
 
@@ -14,6 +30,39 @@ class UCILayer():
         self.device_license = ""
         self.rsp_callback_table = {}
         self.ntf_callback_table = {}
+        # serialize the SPI/GPIO access of the device, shared by the commands and the reader thread
+        self.bus_lock = threading.RLock()
+        # optional reader thread, see start_reader()
+        self.reader_thread = None
+        self.reader_stop_event = threading.Event()
+        self.reader_poll_ms = 10
+        self.reader_crc_enabled = False
+        self.rx_condition = threading.Condition()
+        self.rsp_queue = deque()
+        self.ntf_queue = deque(maxlen=64)
+        self.ntf_dropped_count = 0
+        # (gid, oid) of the last transmitted command
+        self.last_command = None
+        # set when a reader thread (or an async pump) drains the device, the waits then block instead of polling
+        self.rx_in_background = False
+        # pipelined commands, see submit(): GID/OID index -> futures in transmit order
+        self.pending_commands = {}
+        self.pending_lock = threading.Lock()
+        self.max_commands_in_flight = 1
+        self.command_slots = threading.BoundedSemaphore(1)
+        self.tx_local = threading.local()
+        # segmented messages being received (PBF = 1): (MT/GID byte, OID) -> [payloads received so far, all CRCs valid]
+        self.rx_segments = {}
+        # host time.monotonic() when the frame last returned by poll_message() was read from the device
+        self.rx_timestamp = 0.0
+        # optional UciLatencyMetrics, see set_latency_metrics(): GID/OID index -> send_command time
+        self.latency_metrics = None
+        self.command_sent_ns = {}
+        # optional fast dispatch, see enable_fast_dispatch(): header key -> (gid, oid, callback)
+        self.fast_dispatch = False
+        self.fast_callback_table = {}
+        # state of the sessions, fed by the SESSION_STATUS_NTFs, see wait_session_state()
+        self.session_states = UciSessionStateTracker()
         # register default notification callbacks
         ## 0-core group notification
         self.register_notification_callback(EnumUciGid.CORE_GENERIC_GID.value, EnumCoreGenericOid.CORE_DEVICE_STATUS_NTF_OID.value, uci_core_device_status_ntf_callback)
@@ -55,58 +104,479 @@ class UCILayer():
 
     def register_response_callback(self, gid: int, oid: int, callback):
         '''
-            @brief callback  func(gid, oid, payload: list[int])
+            @brief callback  func(gid, oid, payload: memoryview), the payload is a view of the received frame,
+                   copy (bytes()/list()) what is kept after the callback returns
         '''
         index = gid * 256 + oid
         # if callback already exists, overwrite it
         self.rsp_callback_table[index] = callback
+        self.fast_callback_table[uci_header_key(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid)] = (int(gid), int(oid), callback)
 
     def register_notification_callback(self, gid: int, oid: int, callback):
         '''
-            @brief callback func(gid, oid, payload: list[int])
+            @brief callback func(gid, oid, payload: memoryview), see register_response_callback
         '''
         index = gid * 256 + oid
         self.ntf_callback_table[index] = callback
+        self.fast_callback_table[uci_header_key(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid)] = (int(gid), int(oid), callback)
 
-    def wait_response(self, timeout_ms=200, crc_enabled=False):
-        result = self.device.receive_uci_message(timeout_ms, crc_enabled)
+    def enable_fast_dispatch(self, enable=True):
+        '''
+            @brief dispatch the received messages by their first two header bytes: the callback is looked up in one
+                   table and gets the payload view at once, no UciMessage is built. The frames without callback still
+                   go through the full parse (logged, UCI_STATUS_NOT_IMPLEMENTED).
+                   The header is not validated (message type, response status), the callbacks must check their payload.
+        '''
+        self.fast_dispatch = enable
+
+    def set_latency_metrics(self, metrics: UciLatencyMetrics):
+        '''
+            @brief record the parse, callback and round trip time per GID/OID, and the bus timings of the device
+                   when it supports it (Ft4222hDevice), None to stop
+        '''
+        self.latency_metrics = metrics
+        self.command_sent_ns.clear()
+        if hasattr(self.device, "set_latency_metrics"):
+            self.device.set_latency_metrics(metrics)
+
+    def send_command(self, msg: UciMessage, timeout_ms=0) -> UCIPortResult:
+        '''
+            @brief transmit a UCI command, all the uci_* commands go through here
+        '''
+        with self.bus_lock:
+            # the pending command owns the next response, drop the late ones of earlier commands
+            with self.rx_condition:
+                if len(self.rsp_queue) > 0:
+                    log_w("UCI Layer: drop %d unclaimed response(s)", len(self.rsp_queue))
+                    self.rsp_queue.clear()
+            future = None
+            if getattr(self.tx_local, "submitting", False):
+                # registered before the transmit, the response may arrive before transmit_uci_command returns
+                future = self.register_pending_command(msg.gid, msg.oid)
+                self.tx_local.future = future
+            self.last_command = (msg.gid, msg.oid)
+            if self.latency_metrics is not None:
+                self.command_sent_ns[msg.gid * 256 + msg.oid] = time.perf_counter_ns()
+            # payloads over 255 bytes go out as several packets, the device answers the last one
+            for packet in msg.to_packets():
+                result = self.device.transmit_uci_command(packet, timeout_ms=timeout_ms)
+                if result.status != EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+                    break
+            if future is not None and result.status != EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+                self.cancel_pending_command(future, UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_FAILED, []))
+            return result
+
+    def enable_command_pipelining(self, max_in_flight=4):
+        '''
+            @brief allow up to max_in_flight commands submitted without waiting for the previous responses.
+                   The UCI spec only guarantees one outstanding command, check the firmware before going above 1.
+        '''
+        with self.pending_lock:
+            if any(len(futures) > 0 for futures in self.pending_commands.values()):
+                log_e("UCI Layer: can't change the pipelining depth with commands in flight")
+                return False
+            self.max_commands_in_flight = max(1, max_in_flight)
+            self.command_slots = threading.BoundedSemaphore(self.max_commands_in_flight)
+        return True
+
+    def submit(self, command, *args, timeout_ms=500, **kwargs) -> Future:
+        '''
+            @brief transmit a uci_* command and return at once, the response completes the future (matched by GID/OID)
+            e.g. futures = [layer.submit(layer.uci_session_init, sid, EnumSessionType.SESSION_TYPE_RANGING) for sid in sids]
+                 results = [layer.wait_for(f) for f in futures]
+            @param timeout_ms: max wait for a free in-flight slot
+            @return concurrent.futures.Future of UciRspNtfResult, None if nothing was transmitted
+        '''
+        if not self.acquire_command_slot(timeout_ms):
+            log_e("UCI Layer: %d command(s) still in flight", self.max_commands_in_flight)
+            return None
+        self.tx_local.submitting = True
+        self.tx_local.future = None
+        try:
+            command(*args, **kwargs)
+        finally:
+            self.tx_local.submitting = False
+        future = self.tx_local.future
+        self.tx_local.future = None
+        if future is None:
+            self.command_slots.release()
+        return future
+
+    def acquire_command_slot(self, timeout_ms) -> bool:
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            if self.rx_in_background:
+                return self.command_slots.acquire(timeout=max(deadline - time.monotonic(), 0))
+            if self.command_slots.acquire(blocking=False):
+                return True
+            remaining_ms = (deadline - time.monotonic()) * 1000
+            if remaining_ms <= 0:
+                return False
+            self.receive_into_queues(min(remaining_ms, self.reader_poll_ms), self.reader_crc_enabled)
+
+    def register_pending_command(self, gid: int, oid: int) -> Future:
+        future = Future()
+        future.uci_gid = gid
+        future.uci_oid = oid
+        future.add_done_callback(lambda f: self.command_slots.release())
+        with self.pending_lock:
+            self.pending_commands.setdefault(gid * 256 + oid, deque()).append(future)
+        return future
+
+    def complete_pending_command(self, rsp_ntf_result: UciRspNtfResult) -> bool:
+        '''
+            @brief complete the oldest submitted command waiting for this GID/OID
+            @return True if the response was claimed by a future
+        '''
+        with self.pending_lock:
+            futures = self.pending_commands.get(rsp_ntf_result.gid * 256 + rsp_ntf_result.oid)
+            if not futures:
+                return False
+            future = futures.popleft()
+            future.set_result(rsp_ntf_result)
+        return True
+
+    def cancel_pending_command(self, future: Future, rsp_ntf_result: UciRspNtfResult = None):
+        '''
+            @brief stop waiting for the response of a submitted command, a late response is then left unclaimed
+            @param rsp_ntf_result: result to complete the future with, None to cancel it
+        '''
+        with self.pending_lock:
+            futures = self.pending_commands.get(future.uci_gid * 256 + future.uci_oid)
+            if futures and future in futures:
+                futures.remove(future)
+                if rsp_ntf_result is None:
+                    future.cancel()
+                else:
+                    future.set_result(rsp_ntf_result)
+
+    def wait_for(self, future: Future, timeout_ms=200) -> UciRspNtfResult:
+        '''
+            @brief wait for a submitted command, the device is polled here when no reader is running
+                   (the notifications received meanwhile stay queued for wait_response)
+            @return UciRspNtfResult, status UCI_STATUS_FAILED on timeout
+        '''
+        if future is None:
+            return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
+        deadline = time.monotonic() + timeout_ms / 1000
+        while not future.done():
+            remaining_ms = (deadline - time.monotonic()) * 1000
+            if remaining_ms <= 0:
+                break
+            if self.rx_in_background:
+                wait_futures([future], timeout=remaining_ms / 1000)
+            else:
+                self.receive_into_queues(min(remaining_ms, self.reader_poll_ms), self.reader_crc_enabled)
+        self.cancel_pending_command(future)
+        if future.done() and not future.cancelled():
+            return future.result()
+        log_e("UCI Layer: no response, GID: %#x OID: %#x", future.uci_gid, future.uci_oid)
+        return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, future.uci_gid, future.uci_oid, EnumUciStatus.UCI_STATUS_FAILED, [])
+
+    def receive_message(self, timeout_ms, crc_enabled=False) -> UCIPortResult:
+        '''
+            @brief receive the next complete UCI message, the segments of a message (PBF = 1) are reassembled,
+                   timeout_ms applies to each packet. Call with the bus_lock held.
+        '''
+        while True:
+            result = self.device.receive_uci_message(timeout_ms, crc_enabled)
+            if result.status != EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+                return result
+            msg_buffer, is_crc_valid = self.reassemble_packet(result.msg_buffer, result.is_crc_valid)
+            if msg_buffer is not None:
+                return UCIPortResult(result.status, msg_buffer, is_crc_valid)
+
+    def reassemble_packet(self, packet, is_crc_valid=False) -> tuple:
+        '''
+            @brief collect the segments of a message, each segment contributes the payload length of its header
+                   (the CRC bytes of a frame received with crc_enabled are left out)
+            @return (message, is_crc_valid): the packet itself if not segmented, the reassembled message with its last
+                    segment and True only if the CRC of every segment was valid, (None, False) before
+        '''
+        if (packet[0] & 0x10) == 0 and len(self.rx_segments) == 0:
+            return packet, is_crc_valid
+        key = (packet[0] & 0xEF, packet[1])
+        entry = self.rx_segments.get(key)
+        if entry is None:
+            if (packet[0] & 0x10) == 0:
+                return packet, is_crc_valid
+            entry = self.rx_segments[key] = [bytearray(), True]
+        segments = entry[0]
+        segments += packet[4:4 + packet[3]]
+        entry[1] = entry[1] and is_crc_valid
+        if (packet[0] & 0x10) != 0:
+            if len(segments) > UCI_MAX_MESSAGE_PAYLOAD:
+                log_e("UCI Layer: segmented message too long, GID: %s OID: %s, dropped", hex(key[0] & 0x0F), hex(key[1] & 0x3F))
+                del self.rx_segments[key]
+            return None, False
+        del self.rx_segments[key]
+        # one header with the 16-bit length of the whole payload, see UciMessage.from_bytes
+        return bytes((key[0], key[1], (len(segments) >> 8) & 0xFF, len(segments) & 0xFF)) + segments, entry[1]
+
+    def dispatch_message(self, msg_buffer) -> UciRspNtfResult:
+        '''
+            @brief parse a received UCI frame and call the registered response/notification callback
+        '''
         rsp_ntf_result = UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
-        if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_OK:
-            msg = UciMessage.from_bytes(result.msg_buffer)
-            if msg is not None:
-                if msg.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
-                    index = msg.gid * 256 + msg.oid
-                    if index in self.rsp_callback_table:
-                        rsp_ntf_result = self.rsp_callback_table[index](msg.gid, msg.oid, msg.payload)
-                    else:
-                        log_i("UCI Layer: recv a response, no callback, GID: " + hex(msg.gid) + " OID: " + hex(msg.oid) + " payload len: " + str(msg.payload_length))
-                        rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_NOT_IMPLEMENTED, msg.payload)
-                elif msg.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
-                    index = msg.gid * 256 + msg.oid
-                    if index in self.ntf_callback_table:
-                        rsp_ntf_result = self.ntf_callback_table[index](msg.gid, msg.oid, msg.payload)
-                    else:
-                        log_i("UCI Layer: recv a notification, no callback, GID: " + hex(msg.gid) + " OID:" + hex(msg.oid) + " payload len: " + str(msg.payload_length))
-                        rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_NOT_IMPLEMENTED, msg.payload)
+        if isinstance(msg_buffer, list):
+            msg_buffer = bytes(msg_buffer)
+        metrics = self.latency_metrics
+        if self.fast_dispatch and len(msg_buffer) >= 4:
+            entry = self.fast_callback_table.get(((msg_buffer[0] << 8) | msg_buffer[1]) & UCI_HEADER_KEY_MASK)
+            if entry is not None:
+                gid, oid, callback = entry
+                # the header length leaves out the CRC bytes of a frame received with crc_enabled
+                payload = memoryview(msg_buffer)[4:4 + ((msg_buffer[2] << 8) | msg_buffer[3])]
+                if metrics is None:
+                    return callback(gid, oid, payload)
+                start_ns = time.perf_counter_ns()
+                rsp_ntf_result = callback(gid, oid, payload)
+                done_ns = time.perf_counter_ns()
+                metrics.record(EnumLatencyStage.CALLBACK, gid, oid, done_ns - start_ns)
+                if (msg_buffer[0] >> 5) == EnumUciMessageType.UCI_MT_RESPONSE:
+                    sent_ns = self.command_sent_ns.pop(gid * 256 + oid, None)
+                    if sent_ns is not None:
+                        metrics.record(EnumLatencyStage.ROUND_TRIP, gid, oid, done_ns - sent_ns)
+                return rsp_ntf_result
+        if metrics is not None:
+            start_ns = time.perf_counter_ns()
+        msg = UciMessage.from_bytes(memoryview(msg_buffer))
+        if metrics is not None and msg is not None:
+            parsed_ns = time.perf_counter_ns()
+            metrics.record(EnumLatencyStage.PARSE, msg.gid, msg.oid, parsed_ns - start_ns)
+        if msg is not None:
+            if msg.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
+                index = msg.gid * 256 + msg.oid
+                if index in self.rsp_callback_table:
+                    rsp_ntf_result = self.rsp_callback_table[index](msg.gid, msg.oid, msg.payload)
+                    if metrics is not None:
+                        done_ns = time.perf_counter_ns()
+                        metrics.record(EnumLatencyStage.CALLBACK, msg.gid, msg.oid, done_ns - parsed_ns)
+                        sent_ns = self.command_sent_ns.pop(index, None)
+                        if sent_ns is not None:
+                            metrics.record(EnumLatencyStage.ROUND_TRIP, msg.gid, msg.oid, done_ns - sent_ns)
+                else:
+                    log_i("UCI Layer: recv a response, no callback, GID: %#x OID: %#x payload len: %d", msg.gid, msg.oid, msg.payload_length)
+                    rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_NOT_IMPLEMENTED, list(msg.payload))
+            elif msg.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
+                index = msg.gid * 256 + msg.oid
+                if index in self.ntf_callback_table:
+                    rsp_ntf_result = self.ntf_callback_table[index](msg.gid, msg.oid, msg.payload)
+                    if metrics is not None:
+                        metrics.record(EnumLatencyStage.CALLBACK, msg.gid, msg.oid, time.perf_counter_ns() - parsed_ns)
                 else:
-                    log_e(f"UCI Layer: unknown message type: {msg.message_type}")
-                    return UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_UNKNOWN)
+                    log_i("UCI Layer: recv a notification, no callback, GID: %#x OID: %#x payload len: %d", msg.gid, msg.oid, msg.payload_length)
+                    rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_NOT_IMPLEMENTED, list(msg.payload))
             else:
-                log_e("UCI Layer: invalid message received!")
+                log_e("UCI Layer: unknown message type: %s", msg.message_type)
+                return UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_UNKNOWN)
         else:
-            log_e(f"UCI Layer: wait response failed, status: {result.status.name}")
+            log_e("UCI Layer: invalid message received!")
         return rsp_ntf_result
 
+    def wait_response(self, timeout_ms=200, crc_enabled=False):
+        '''
+            @brief wait for the next response or notification
+                   with the reader thread running, a queued response is returned before the queued notifications
+        '''
+        if self.reader_thread is not None:
+            return self.wait_queued_message(timeout_ms, accept_rsp=True, accept_ntf=True)
+        with self.rx_condition:
+            # frames received by wait_for()/submit() meanwhile
+            if len(self.rsp_queue) > 0:
+                return self.rsp_queue.popleft()
+            if len(self.ntf_queue) > 0:
+                return self.ntf_queue.popleft()
+        with self.bus_lock:
+            result = self.receive_message(timeout_ms, crc_enabled)
+        if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+            rsp_ntf_result = self.dispatch_message(result.msg_buffer)
+            if rsp_ntf_result.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
+                self.complete_pending_command(rsp_ntf_result)
+            elif isinstance(rsp_ntf_result.uci_result, UWBSessionState):
+                self.update_session_state(rsp_ntf_result.uci_result)
+            return rsp_ntf_result
+        log_e("UCI Layer: wait response failed, status: %s", result.status.name)
+        return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
+
+    def poll_message(self, timeout_ms=10, crc_enabled=False):
+        '''
+            @brief receive and dispatch one frame
+            @return UciRspNtfResult, None if nothing arrived within timeout_ms
+        '''
+        # the wait for INT_N runs without the bus lock, send_command() is only delayed by the frame transfer
+        if not self.device.wait_uci_message(timeout_ms, self.bus_lock):
+            return None
+        with self.bus_lock:
+            result = self.receive_message(timeout_ms, crc_enabled)
+        if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT:
+            return None
+        if result.status != EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+            log_e("UCI Layer: receive failed, status: %s", result.status.name)
+            return None
+        # before the parsing and the callbacks
+        self.rx_timestamp = time.monotonic()
+        return self.dispatch_message(result.msg_buffer)
+
+    def wait_command_response(self, timeout_ms=200):
+        '''
+            @brief reader thread only, wait for the response of the pending command, notifications stay queued
+        '''
+        return self.wait_queued_message(timeout_ms, accept_rsp=True, accept_ntf=False)
+
+    def wait_notification(self, timeout_ms=200):
+        '''
+            @brief reader thread only, wait for the next queued notification
+        '''
+        return self.wait_queued_message(timeout_ms, accept_rsp=False, accept_ntf=True)
+
+    def wait_queued_message(self, timeout_ms, accept_rsp: bool, accept_ntf: bool) -> UciRspNtfResult:
+        def is_ready():
+            return (accept_rsp and len(self.rsp_queue) > 0) or (accept_ntf and len(self.ntf_queue) > 0)
+
+        with self.rx_condition:
+            if self.rx_condition.wait_for(is_ready, timeout=timeout_ms / 1000):
+                if accept_rsp and len(self.rsp_queue) > 0:
+                    return self.rsp_queue.popleft()
+                return self.ntf_queue.popleft()
+        log_e("UCI Layer: wait response failed, status: %s", EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT.name)
+        return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
+
+    def take_notifications(self, ntf_type, match=None) -> list:
+        '''
+            @brief remove the queued notifications decoded as ntf_type (e.g. UWBSessionState), the others stay queued
+            @param match: func(uci_result) -> bool to select among them, None for all
+            @return the uci_result of the removed notifications, in arrival order
+        '''
+        def is_taken(result):
+            return isinstance(result.uci_result, ntf_type) and (match is None or match(result.uci_result))
+
+        with self.rx_condition:
+            taken = [result.uci_result for result in self.ntf_queue if is_taken(result)]
+            if len(taken) > 0:
+                kept = [result for result in self.ntf_queue if not is_taken(result)]
+                self.ntf_queue.clear()
+                self.ntf_queue.extend(kept)
+        return taken
+
+    def update_session_state(self, session_state: UWBSessionState):
+        '''
+            @brief record a SESSION_STATUS_NTF: session_states and the param of the session_map (FiRa/CCC devices)
+        '''
+        session_map = getattr(self, "session_map", None)
+        if session_map is not None and session_state.session_id in session_map:
+            session_map[session_state.session_id].session_state = session_state
+        self.session_states.update(session_state)
+
+    def wait_session_state(self, session_id: int, state: EnumSessionState, timeout_ms=200) -> bool:
+        '''
+            @brief wait for the SESSION_STATUS_NTF of the state, call session_states.expect(session_id) before the command.
+                   The device is polled here when nothing receives in the background, the frames received meanwhile
+                   are kept for their owners. The queued status notifications of the session are then dropped.
+            @return True if reached, False on timeout or if the session was deinitialized instead
+        '''
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            reached = self.session_states.check_state(session_id, state)
+            remaining_ms = (deadline - time.monotonic()) * 1000
+            if reached is not None or remaining_ms <= 0:
+                break
+            if self.rx_in_background:
+                self.session_states.wait_for_state(session_id, state, remaining_ms)
+            else:
+                self.receive_into_queues(min(remaining_ms, self.reader_poll_ms), self.reader_crc_enabled)
+        self.take_notifications(UWBSessionState, lambda session_state: session_state.session_id == session_id)
+        if reached is None:
+            log_e("UCI Layer: session %#x did not reach %s", session_id, state.name)
+        elif not reached:
+            log_e("UCI Layer: session %#x deinitialized, reason: %s", session_id, self.session_states.get(session_id).reason_code.name)
+        return reached is True
+
+    def session_transition(self, session_id: int, state: EnumSessionState, command, *args, timeout_ms=200) -> UciRspNtfResult:
+        '''
+            @brief transmit a session command (uci_* taking the session id first), wait for its response and then for
+                   the SESSION_STATUS_NTF of the new state, each within timeout_ms
+            e.g. layer.session_transition(session_id, EnumSessionState.SESSION_STATE_ACTIVE, layer.uci_range_start)
+            @return UciRspNtfResult of the response, its status is UCI_STATUS_FAILED if the state was not reached
+        '''
+        self.session_states.expect(session_id)
+        result = self.wait_for(self.submit(command, session_id, *args, timeout_ms=timeout_ms), timeout_ms=timeout_ms)
+        if result.status is not EnumUciStatus.UCI_STATUS_OK:
+            log_e("Error: %s", result.status)
+            return result
+        log_i("%s", result.uci_result)
+        if not self.wait_session_state(session_id, state, timeout_ms):
+            result.status = EnumUciStatus.UCI_STATUS_FAILED
+        return result
+
+    def start_reader(self, ntf_queue_size=64, poll_ms=10, crc_enabled=False):
+        '''
+            @brief start a dedicated thread which drains INT_N continuously.
+                   Responses are kept for the pending command (wait_command_response), notifications are pushed into
+                   a bounded queue (wait_notification), when the queue is full the oldest notification is dropped.
+            @param ntf_queue_size: max number of queued notifications
+            @param poll_ms: INT_N wait per poll, the bus is released between the polls to let the commands through
+        '''
+        if self.reader_thread is not None:
+            return
+        with self.rx_condition:
+            self.rsp_queue.clear()
+            self.ntf_queue = deque(maxlen=ntf_queue_size)
+            self.ntf_dropped_count = 0
+        self.reader_poll_ms = poll_ms
+        self.reader_crc_enabled = crc_enabled
+        self.reader_stop_event.clear()
+        self.rx_in_background = True
+        self.reader_thread = threading.Thread(target=self.reader_loop, name="uci-reader", daemon=True)
+        self.reader_thread.start()
+
+    def stop_reader(self, timeout_ms=1000):
+        if self.reader_thread is None:
+            return
+        self.reader_stop_event.set()
+        self.reader_thread.join(timeout_ms / 1000)
+        self.reader_thread = None
+        self.rx_in_background = False
+
+    def reader_loop(self):
+        while not self.reader_stop_event.is_set():
+            try:
+                self.receive_into_queues(self.reader_poll_ms, self.reader_crc_enabled)
+            except Exception as e:
+                log_e("UCI Layer: reader dispatch failed: %s", e)
+
+    def receive_into_queues(self, timeout_ms, crc_enabled=False):
+        '''
+            @brief receive one frame: a response completes its submitted command or is queued for
+                   wait_command_response, a notification is queued for wait_notification
+        '''
+        rsp_ntf_result = self.poll_message(timeout_ms, crc_enabled)
+        if rsp_ntf_result is None:
+            return
+        with self.rx_condition:
+            if rsp_ntf_result.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
+                if self.complete_pending_command(rsp_ntf_result):
+                    return
+                self.rsp_queue.append(rsp_ntf_result)
+            elif rsp_ntf_result.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
+                if isinstance(rsp_ntf_result.uci_result, UWBSessionState):
+                    self.update_session_state(rsp_ntf_result.uci_result)
+                if len(self.ntf_queue) == self.ntf_queue.maxlen:
+                    self.ntf_dropped_count += 1
+                self.ntf_queue.append(rsp_ntf_result)
+            else:
+                return
+            self.rx_condition.notify_all()
 
     def uci_layer_user_defined_cmd(self, gid: int, oid: int, payload: list[int]):
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, gid, 0, oid, len(payload), payload)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
     
     # Forthink Vendor-defined Group OID
     def uci_forthink_encrypt_get_serial_num(self):
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.FORTHINK_VENDOR_GID.value, 0,
                             EnumForthinkVendorOid.ENCRYPT_GET_SERIAL_NUM_OID.value, 0, [])
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
     
     def uci_forthink_encrypt_verify_license(self, license: str):
         if len(license) != 128:
@@ -117,7 +587,7 @@ class UCILayer():
             buf.append(ord(c))
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.FORTHINK_VENDOR_GID.value, 0,
                             EnumForthinkVendorOid.ENCRYPT_LICENSE_CHECK_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
     
     def uci_forthink_ccc_data_set(self, session_id: int, repeat_count: int, data: list[int]):
         buf = []
@@ -125,26 +595,26 @@ class UCILayer():
         buf += data
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.FORTHINK_VENDOR_GID.value, 0,
                             EnumForthinkVendorOid.CCC_DATA_SET_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
          
     # UCI CORE-GROUP Commands
     def uci_core_devive_reset(self):
         payload = [0x0]
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.CORE_GENERIC_GID.value,
                          0, EnumCoreGenericOid.CORE_DEVICE_RESET_OID.value, len(payload), payload)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_core_get_device_info(self):
         payload = []
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.CORE_GENERIC_GID.value,
                          0, EnumCoreGenericOid.CORE_DEVICE_INFO_OID.value, len(payload), payload)
-        return self.device.transmit_uci_command(msg.to_byte_stream(), timeout_ms=10)
+        return self.send_command(msg, timeout_ms=10)
 
     def uci_core_get_caps_info(self):
         payload = []
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.CORE_GENERIC_GID.value,
                          0, EnumCoreGenericOid.CORE_GET_CAPS_INFO_OID.value, len(payload), payload)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_core_set_config(self, config: list[UciConfigTLV]):
         buf = [0]
@@ -154,14 +624,14 @@ class UCILayer():
         
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.CORE_GENERIC_GID.value,
                          0, EnumCoreGenericOid.CORE_SET_CONFIG_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_core_get_config(self, param_ids: list[int]):
         buf = [len(param_ids)]
         buf += param_ids
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.CORE_GENERIC_GID.value, 0,
                          EnumCoreGenericOid.CORE_GET_CONFIG_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     # UCI UWB-Session Group Commands
     def uci_session_init(self, session_id: int, session_type: EnumSessionType):
@@ -169,14 +639,14 @@ class UCILayer():
         buf += struct.pack("<IB", session_id, session_type.value)
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SESSION_GID.value, 0,
                             EnumUwbSessionOid.SESSION_INIT_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_session_deinit(self, session_id: int):
         buf = []
         buf += struct.pack("<I", session_id)
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SESSION_GID.value, 0,
                             EnumUwbSessionOid.SESSION_DEINIT_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream(), timeout_ms=100)
+        return self.send_command(msg, timeout_ms=100)
 
     def uci_session_set_app_config(self, session_id, config: list[UciConfigTLV]):
         buf = []
@@ -186,7 +656,7 @@ class UCILayer():
             buf += tlv.to_byte_stream()
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SESSION_GID.value, 0,
                             EnumUwbSessionOid.SESSION_SET_APP_CONFIG_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_session_get_app_config(self, session_id: int, param_ids: list[int]):
         buf = []
@@ -195,20 +665,20 @@ class UCILayer():
         buf += param_ids
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SESSION_GID.value, 0,
                          EnumUwbSessionOid.SESSION_GET_APP_CONFIG_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_session_get_count(self):
         payload = []
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SESSION_GID.value,
                          0, EnumUwbSessionOid.SESSION_GET_COUNT_OID.value, len(payload), payload)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_session_get_state(self, session_id: int):
         buf = []
         buf += struct.pack("<I", session_id)
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SESSION_GID.value, 0,
                             EnumUwbSessionOid.SESSION_GET_STATE_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_session_update_controller_multicast_list(self, session_id, update, controlee_list: list[SessionMulticastControlee]):
         '''
@@ -224,14 +694,14 @@ class UCILayer():
             
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SESSION_GID.value, 0,
                             EnumUwbSessionOid.SESSION_UPDATE_CONTROLLER_MULTICAST_LIST_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
         
 
     def uci_session_get_possible_ran_multiplier(self):
         buf = []
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SESSION_GID.value, 0,
                             EnumUwbSessionOid.SESSION_GET_POSSIBLE_RAN_MULTIPLIER_VALUE_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_session_update_state(self, session_id: int, state: int):
         pass
@@ -242,14 +712,14 @@ class UCILayer():
         buf += struct.pack("<I", session_id)
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_RANGE_GID.value, 0,
                             EnumUwbRangeOid.RANGE_START_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_range_stop(self, session_id: int):
         buf = []
         buf += struct.pack("<I", session_id)
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_RANGE_GID.value, 0,
                             EnumUwbRangeOid.RANGE_STOP_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     def uci_range_get_ranging_count(self, session_id: int):
         pass
@@ -262,7 +732,7 @@ class UCILayer():
         buf += struct.pack("<II", session_id, sts_index)
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_RANGE_GID.value, 0,
                             EnumUwbRangeOid.RANGE_RESUME_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
 
     # Android APP_DATA_MANAGE
     def uci_app_data_tx(self):
@@ -303,5 +773,5 @@ class UCILayer():
         buf = [0x01, 0x04, 0x00]
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.VENDOR_E_GID.value, 0,
                             EnumVendorEOid.VENDOR_E_SET_TRIM_VALUE.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self.send_command(msg)
     
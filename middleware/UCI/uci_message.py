@@ -44,12 +44,12 @@ class UciCoreDeviceInfo:
                 phy_version = f"{byte_stream[5]}.{byte_stream[6]}"
                 uci_test_version = f"{byte_stream[7]}.{byte_stream[8]}"
                 if len(byte_stream) > 10:
-                    vendor_spec_info = byte_stream[10:]
+                    vendor_spec_info = list(byte_stream[10:])
                 else:
                     vendor_spec_info = []
                 return UciCoreDeviceInfo(status, uci_generic_version, mac_version, phy_version, uci_test_version, vendor_spec_info)
         except ValueError as e:
-            log_e(f"Error: {e}")
+            log_e("Error: %s", e)
             return UciCoreDeviceInfo(EnumUciStatus.UCI_STATUS_UNDEF, '0.0', '0.0', '0.0', '0.0', [])
 
     def __str__(self):
@@ -144,10 +144,9 @@ class SessionMulticastControlee():
 
     @classmethod
     def from_bytes(cls, byte_stream):
-        if not isinstance(byte_stream, bytes):
+        if isinstance(byte_stream, list):
             byte_stream = bytes(byte_stream)
-        short_addr = struct.unpack("<H", byte_stream[0:2])[0]
-        sub_session_id = struct.unpack("<I", byte_stream[2:6])[0]
+        short_addr, sub_session_id = struct.unpack_from("<HI", byte_stream, 0)
         return SessionMulticastControlee(short_addr, sub_session_id)
 
     def to_byte_stream(self):
@@ -188,12 +187,12 @@ def uci_core_common_rsp_callback(gid: int, oid: int, payload: list[int]):
     status = EnumUciStatus.UCI_STATUS_UNDEF
     try:
         status = EnumUciStatus(payload[0] & 0xFF)
-        log_i(f"UCI_COMMON_RSP GID: {gid} OID: {oid} Status: {status.name}")
+        log_i("UCI_COMMON_RSP GID: %s OID: %s Status: %s", gid, oid, status.name)
     except ValueError as e:
-        log_e(f"Error: {e}")
+        log_e("Error: %s", e)
     result = []
     if len(payload) > 1:
-        result = payload[1:]
+        result = list(payload[1:])
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status, result)
 
 
@@ -204,12 +203,12 @@ def uci_core_common_ntf_callback(gid: int, oid: int, payload: list[int]):
     status = EnumUciStatus.UCI_STATUS_UNDEF
     try:
         status = EnumUciStatus(payload[0] & 0xFF)
-        log_i(f"UCI_COMMON_NTF GID: {gid} OID: {oid} Status: {status.name}")
+        log_i("UCI_COMMON_NTF GID: %s OID: %s Status: %s", gid, oid, status.name)
     except ValueError as e:
-        log_e(f"Error: {e}")
+        log_e("Error: %s", e)
     result = []
     if len(payload) > 1:
-        result = payload[1:]
+        result = list(payload[1:])
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, status, result)
 
 
@@ -220,7 +219,7 @@ def uci_core_device_status_ntf_callback(gid: int, oid: int, payload: list[int]):
         GID OID:  0x60 0x01
     '''
     state = EnumDeviceState(payload[0])
-    log_i(f"CORE_DEVICE_STATUS_NTF: State: {state}")
+    log_i("CORE_DEVICE_STATUS_NTF: State: %s", state)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK, state)
 
 
@@ -229,7 +228,7 @@ def uci_core_get_device_info_rsp_callback(gid: int, oid: int, payload: list[int]
         GID OID: 0x40 0x02
     '''
     dev_info = UciCoreDeviceInfo.from_bytes(byte_stream=payload)
-    log_i(str(dev_info))
+    log_i("%s", dev_info)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, dev_info.status, dev_info)
 
 
@@ -238,7 +237,7 @@ def uci_core_get_caps_info_rsp_callback(gid: int, oid: int, payload: list[int]):
         GID OID: 0x40 0x03
     '''
     caps_info = UciCoreCapsInfo.from_bytes(payload)
-    log_i(str(caps_info))
+    log_i("%s", caps_info)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, caps_info.status, caps_info)
 
 
@@ -247,7 +246,7 @@ def uci_core_set_config_rsp_callback(gid: int, oid: int, payload: list[int]):
         GID OID: 0x40 0x04
     '''
     config_rsp = UciCoreSetConfigRsp.from_bytes(payload)
-    log_i(str(config_rsp))
+    log_i("%s", config_rsp)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, config_rsp.status, config_rsp)
 
 
@@ -263,9 +262,9 @@ def uci_core_get_config_rsp_callback(gid: int, oid: int, payload: list[int]):
         tlv = UciConfigTLV.from_bytes(payload[idx:])
         idx += tlv.length + 2
         config_list.append(tlv)
-    log_i(f"CORE_GET_CONFIG_RSP: Status: {status}, Number: {num}")
+    log_i("CORE_GET_CONFIG_RSP: Status: %s, Number: %s", status, num)
     for tlv in config_list:
-        log_i(str(tlv))
+        log_i("%s", tlv)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status, config_list)
 
 
@@ -274,7 +273,7 @@ def uci_core_generic_error_ntf_callback(gid: int, oid: int, payload: list[int]):
         GID OID: 0x60 0x07
     '''
     error = EnumUciStatus(payload[0])
-    log_e(f"CORE_GENERIC_ERROR_NTF: Error: {error}")
+    log_e("CORE_GENERIC_ERROR_NTF: Error: %s", error)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, error)
 
 
@@ -284,13 +283,12 @@ def uci_uwb_session_status_ntf_callback(gid: int, oid: int, payload: list[int]):
     '''
         GID OID: 0x61 0x02
     '''
-    ntf = struct.unpack("<IBB", bytes(payload))
+    ntf = struct.unpack_from("<IBB", payload, 0)
     session_id = ntf[0]
     session_state = EnumSessionState(ntf[1])
     reason_code = EnumSessionStateChangeReason(ntf[2])
 
-    log_i(
-        f"UCI_UWB_SESSION_STATUS_NTF: session_id: {session_id} session_state: {session_state} reason_code: {reason_code}")
+    log_i("UCI_UWB_SESSION_STATUS_NTF: session_id: %s session_state: %s reason_code: %s", session_id, session_state, reason_code)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK, UWBSessionState(session_id, session_state, reason_code))
 
 
@@ -307,9 +305,9 @@ def uci_uwb_session_get_app_config_rsp_callback(gid: int, oid: int, payload: lis
         tlv = UciConfigTLV.from_bytes(payload[idx:])
         idx += tlv.length + 2
         config_list.append(tlv)
-    log_i(f"UWB_SESSION_GET_APP_CONFIG_RSP: Status: {status}, Number: {num}")
+    log_i("UWB_SESSION_GET_APP_CONFIG_RSP: Status: %s, Number: %s", status, num)
     for tlv in config_list:
-        log_i(str(tlv))
+        log_i("%s", tlv)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status, config_list)
 
 
@@ -319,8 +317,7 @@ def uci_uwb_session_get_count_rsp_callback(gid: int, oid: int, payload: list[int
     '''
     status = EnumUciStatus(payload[0])
     count = payload[1]
-    log_i(
-        f"UCI_UWB_SESSION_GET_COUNT_RSP: status: {status.name}, count: {count}")
+    log_i("UCI_UWB_SESSION_GET_COUNT_RSP: status: %s, count: %s", status.name, count)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status, count)
 
 
@@ -330,8 +327,7 @@ def uci_uwb_session_get_state_rsp_callback(gid: int, oid: int, payload: list[int
     '''
     status = EnumUciStatus(payload[0])
     state = EnumSessionState(payload[1])
-    log_i(
-        f"UCI_UWB_SESSION_GET_STATE_RSP: status: {status.name}, state: {state.name}")
+    log_i("UCI_UWB_SESSION_GET_STATE_RSP: status: %s, state: %s", status.name, state.name)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status, state)
 
 # def uci_uwb_session_update_controller_multicast_list_rsp_callback(gid: int, oid: int, payload: list[int]):
@@ -347,7 +343,7 @@ def uci_uwb_session_update_controller_multicast_list_ntf_callback(gid: int, oid:
         FiRa Consortium UCI Specification v1.1, 7 Bytes; MAC 3.7.0 supportted 7 Bytes.
         NXP NCJ29D5 MAC 3.5.0, only 5 bytes, from payload length to compatible. 
     '''
-    session_id = struct.unpack("<I", bytes(payload[0:4]))[0]
+    session_id = struct.unpack_from("<I", payload, 0)[0]
     remain_size = payload[4]
     num = payload[5]
     controlee_list = []
@@ -361,15 +357,13 @@ def uci_uwb_session_update_controller_multicast_list_ntf_callback(gid: int, oid:
             status_list.append(status)
     elif len(payload) == (6 + num*5):
         for i in range(num):
-            sub_session_id = struct.unpack(
-                "<I", bytes(payload[6 + i*5: 6 + i*5 + 4]))[0]
+            sub_session_id = struct.unpack_from("<I", payload, 6 + i*5)[0]
             controlee = SessionMulticastControlee(sub_session_id)
             controlee_list.append(controlee)
             status = EnumMulticastUpdateStatus(payload[6 + i*5 + 4])
             status_list.append(status)
 
-    log_i(
-        f"UCI_UWB_SESSION_UPDATE_CONTROLLER_MULTICAST_LIST_NTF: session_id: {session_id}, remain_size: {remain_size}, num: {num}")
+    log_i("UCI_UWB_SESSION_UPDATE_CONTROLLER_MULTICAST_LIST_NTF: session_id: %s, remain_size: %s, num: %s", session_id, remain_size, num)
     ntf = SessionMulticastControleeStatus(
         remain_size, controlee_list, status_list)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK, ntf)
@@ -381,8 +375,7 @@ def uci_uwb_session_get_possible_ran_multiplier_rsp_callback(gid: int, oid: int,
     '''
     status = EnumUciStatus(payload[0])
     ran_multiplier = payload[1]
-    log_i(
-        f"UCI_UWB_SESSION_GET_POSSIBLE_RAN_MULTIPLIER_RSP: status: {status}, ran_multiplier: {ran_multiplier}")
+    log_i("UCI_UWB_SESSION_GET_POSSIBLE_RAN_MULTIPLIER_RSP: status: %s, ran_multiplier: %s", status, ran_multiplier)
     if ran_multiplier == 1:
         log_i("UWB Session Load is below 25%")
     elif ran_multiplier == 2:
@@ -404,7 +397,7 @@ def uci_uwb_range_data_ntf_callback(gid: int, oid: int, payload: list[int]):
         GID OID: 0x62 0x00, FiRa Consortium UCI Specification
     '''
     range_data_ntf = FiraRangeDataNtf.from_bytes(payload)
-    log_i(str(range_data_ntf))
+    log_i("%s", range_data_ntf)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK, range_data_ntf)
 
 
@@ -413,9 +406,8 @@ def uci_uwb_range_get_ranging_count_rsp_callback(gid: int, oid: int, payload: li
         GID OID: 0x42 0x02
     '''
     status = EnumUciStatus(payload[0])
-    count = struct.unpack("<I", bytes(payload[1:5]))[0]
-    log_i(
-        f"UCI_UWB_RANGE_GET_RANGING_COUNT_RSP: status: {status}, count: {count}")
+    count = struct.unpack_from("<I", payload, 1)[0]
+    log_i("UCI_UWB_RANGE_GET_RANGING_COUNT_RSP: status: %s, count: %s", status, count)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status, count)
 
 # CCC Range data NTF callbacks, controller or controlee, only register one of them
@@ -426,7 +418,7 @@ def uci_uwb_range_ccc_data_ntf_controller_callback(gid: int, oid: int, payload:
         GID OID: 0x62 0x20, CCC Digital Key 3.0 Specification
     '''
     range_data_ntf = CCCRangeDataNtfController.from_bytes(payload)
-    log_i(str(range_data_ntf))
+    log_i("%s", range_data_ntf)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK, range_data_ntf)
 
 
@@ -435,7 +427,7 @@ def uci_uwb_range_ccc_data_ntf_controlee_callback(gid: int, oid: int, payload: l
         GID OID: 0x62 0x21, CCC Digital Key 3.0 Specification
     '''
     range_data_ntf = CCCRangeDataNtfControlee.from_bytes(payload)
-    log_i(str(range_data_ntf))
+    log_i("%s", range_data_ntf)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK, range_data_ntf)
 
 
@@ -444,7 +436,7 @@ def uci_uwb_range_ccc_data_ntf_controller_exp_callback(gid: int, oid: int, paylo
         GID OID: 0x62 0x23, Controller Expand CCC Digital Key 3.0 Specification
     '''
     range_data_ntf = CCCRangeDataNtfControllerExp.from_bytes(payload)
-    log_i(str(range_data_ntf))
+    log_i("%s", range_data_ntf)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK, range_data_ntf)
 
 
@@ -452,15 +444,16 @@ def uci_forthink_ccc_data_ntf_callback(gid: int, oid: int, payload: list[int]):
     '''
         GID OID: 0x6A 0x20, Forthink CCC Digital Key 3.0 Specification
     '''
-    session_id = struct.unpack("<I", bytes(payload[0:4]))[0]
+    session_id = struct.unpack_from("<I", payload, 0)[0]
     length = payload[4]
     broadcast_data = payload[5:]
-    log_str = f"CCC_DATA_NTF:\n" \
-        + f"  session_id: {hex(session_id)} \n" \
-        + f"      length: {length} \n"
-    log_str += "  broadcast_data: " + \
-        str([" 0x{:02x}".format(x) for x in broadcast_data])
-    log_i(log_str)
+    if is_log_enabled(LOG_LEVEL_INFO):
+        log_str = f"CCC_DATA_NTF:\n" \
+            + f"  session_id: {hex(session_id)} \n" \
+            + f"      length: {length} \n"
+        log_str += "  broadcast_data: " + \
+            str([" 0x{:02x}".format(x) for x in broadcast_data])
+        log_i(log_str)
 
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, EnumUciStatus.UCI_STATUS_OK)
 
@@ -491,7 +484,7 @@ def uci_forthink_encrypt_license_check_rsp_callback(gid: int, oid: int, payload:
     if status == EnumUciStatus.UCI_STATUS_OK:
         log_i("License verification successful!")
     else:
-        log_e("Error: " + str(status.name))
+        log_e("Error: %s", status.name)
         license = bytes(payload[1:])
         log_i("License: " + license.decode('utf-8'))
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status, license)
@@ -502,7 +495,7 @@ def uci_forthink_ccc_data_set_rsp_callback(gid: int, oid: int, payload: list[int
         GID OID: 0x4A 0x20
     '''
     status = EnumUciStatus(payload[0])
-    log_i(f"UCI_FORTHINK_CCC_DATA_SET_RSP: status: {status.name}")
+    log_i("UCI_FORTHINK_CCC_DATA_SET_RSP: status: %s", status.name)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
 
 # @}
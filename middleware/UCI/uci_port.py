@@ -36,7 +36,10 @@ class EnumUCIDeviceStatus(IntEnum):
     UCI_DEVICE_STATUS_CLOSED = 0x01
 
 class UCIPortResult():
-    def __init__(self, status, msg_buffer: list[int], is_crc_valid):
+    '''
+        msg_buffer: the received frame as one bytes-like object (bytes/bytearray), not copied on the way to the parsers
+    '''
+    def __init__(self, status, msg_buffer: bytes, is_crc_valid):
         self.status = status
         self.msg_buffer = msg_buffer
         self.is_crc_valid = is_crc_valid
@@ -78,3 +81,14 @@ class UCIDevice(ABC):
             @return: UCIPortResult / [status: EnumUCIPortStatus, recv_msg_buffer, is_crc_valid]
         '''
         pass
+
+    def wait_uci_message(self, timeout_ms, bus_lock) -> bool:
+        '''
+            @brief wait until receive_uci_message() has a message to return, without reading it.
+                   bus_lock (the bus lock of the UCI Layer) is only held while the device is accessed,
+                   the commands of other threads go out during the wait.
+                   The default does not wait: receive_uci_message() then waits with the lock held.
+            @param timeout_ms: 0 waits forever
+            @return True if a message is ready (or the device can not tell), False on timeout
+        '''
+        return True
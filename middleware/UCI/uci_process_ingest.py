@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file:   one process per dongle, the range records are shipped back over shared memory rings
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from console_helper import *
+
+from uci_defs import *
+from uci_range_recorder import RANGE_RECORD_DTYPE, range_record_rows
+
+
+# RANGE_RECORD_DTYPE + the index of the dongle which received the notification
+INGEST_RECORD_DTYPE = np.dtype(RANGE_RECORD_DTYPE.descr + [("dongle", np.uint8)])
+
+# ring header: write count, read count, dropped rows, capacity, error flag (uint64 each) padded to one cache line,
+# then the error text of the producer, UTF-8, NUL padded
+SHARED_RING_HEADER_SIZE = 256
+SHARED_RING_WRITE = 0
+SHARED_RING_READ = 1
+SHARED_RING_DROPPED = 2
+SHARED_RING_CAPACITY = 3
+SHARED_RING_ERROR = 4
+SHARED_RING_ERROR_TEXT_OFFSET = 64
+SHARED_RING_ERROR_TEXT_SIZE = SHARED_RING_HEADER_SIZE - SHARED_RING_ERROR_TEXT_OFFSET
+
+
+class SharedRangeRing():
+    '''
+        Single-producer single-consumer ring of INGEST_RECORD_DTYPE rows in a multiprocessing.shared_memory block.
+        The producer only writes the write count, the consumer only the read count, no lock between the processes.
+        When the ring is full the new rows are dropped (dropped_count), the consumer is never blocked.
+    '''
+
+    def __init__(self, name=None, capacity=65536):
+        '''
+            @param name: None creates the block, else attaches to the block created by the other process
+        '''
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=SHARED_RING_HEADER_SIZE + capacity * INGEST_RECORD_DTYPE.itemsize)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.header = np.ndarray((5,), dtype=np.uint64, buffer=self.shm.buf)
+        if name is None:
+            self.header[:] = (0, 0, 0, capacity, 0)
+        self.capacity = int(self.header[SHARED_RING_CAPACITY])
+        self.rows = np.ndarray((self.capacity,), dtype=INGEST_RECORD_DTYPE, buffer=self.shm.buf, offset=SHARED_RING_HEADER_SIZE)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def dropped_count(self) -> int:
+        return int(self.header[SHARED_RING_DROPPED])
+
+    @property
+    def error(self) -> str:
+        '''
+            @return the exception which stopped the producer, None while it runs
+        '''
+        if self.header[SHARED_RING_ERROR] == 0:
+            return None
+        text = bytes(self.shm.buf[SHARED_RING_ERROR_TEXT_OFFSET:SHARED_RING_HEADER_SIZE])
+        return text.rstrip(b"\0").decode("utf-8", errors="replace")
+
+    def set_error(self, message: str):
+        '''
+            @brief producer side, the text is truncated to SHARED_RING_ERROR_TEXT_SIZE bytes
+        '''
+        text = message.encode("utf-8")[:SHARED_RING_ERROR_TEXT_SIZE]
+        self.shm.buf[SHARED_RING_ERROR_TEXT_OFFSET:SHARED_RING_HEADER_SIZE] = text.ljust(SHARED_RING_ERROR_TEXT_SIZE, b"\0")
+        # published after the text is written
+        self.header[SHARED_RING_ERROR] = 1
+
+    def __len__(self):
+        return int(self.header[SHARED_RING_WRITE] - self.header[SHARED_RING_READ])
+
+    def append_rows(self, rows: list[tuple]) -> int:
+        '''
+            @brief producer side, the rows become visible to the consumer at once
+            @return number of rows written
+        '''
+        write = int(self.header[SHARED_RING_WRITE])
+        free = self.capacity - (write - int(self.header[SHARED_RING_READ]))
+        if len(rows) > free:
+            self.header[SHARED_RING_DROPPED] += len(rows) - free
+            rows = rows[:free]
+        for row in rows:
+            self.rows[write % self.capacity] = row
+            write += 1
+        # published after the rows are written
+        self.header[SHARED_RING_WRITE] = write
+        return len(rows)
+
+    def read(self, max_rows=None) -> np.ndarray:
+        '''
+            @brief consumer side, copy of the available rows, oldest first
+        '''
+        read = int(self.header[SHARED_RING_READ])
+        count = int(self.header[SHARED_RING_WRITE]) - read
+        if max_rows is not None:
+            count = min(count, max_rows)
+        if count == 0:
+            return np.empty(0, dtype=INGEST_RECORD_DTYPE)
+        start = read % self.capacity
+        if start + count <= self.capacity:
+            records = self.rows[start:start + count].copy()
+        else:
+            records = np.concatenate((self.rows[start:], self.rows[:start + count - self.capacity]))
+        self.header[SHARED_RING_READ] = read + count
+        return records
+
+    def close(self):
+        # the numpy views must be released before the block
+        self.header = None
+        self.rows = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def uci_ingest_worker_main(index: int, ring_name: str, setup, teardown, stop_event, poll_ms: int):
+    '''
+        @brief entry point of a dongle process: setup(index) returns the CCCRangingDevice/FiRaRangingDevice with its
+               sessions started, the range notifications are converted into rows and written into the ring.
+               An exception stops the process and is reported in the ring header (UciProcessIngest.worker_errors)
+    '''
+    ring = SharedRangeRing(ring_name)
+    ranging_device = None
+    try:
+        ranging_device = setup(index)
+        while not stop_event.is_set():
+            result = ranging_device.poll_message(poll_ms)
+            if result is None or result.message_type != EnumUciMessageType.UCI_MT_NOTIFICATION:
+                continue
+            rows = range_record_rows(result, time.monotonic())
+            if len(rows) > 0:
+                ring.append_rows([row + (index,) for row in rows])
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        log_e("UCI process ingest: dongle %d stopped: %s", index, e)
+        ring.set_error(f"{type(e).__name__}: {e}")
+    finally:
+        if ranging_device is not None and teardown is not None:
+            try:
+                teardown(index, ranging_device)
+            except Exception as e:
+                log_e("UCI process ingest: dongle %d teardown failed: %s", index, e)
+        ring.close()
+
+
+class UciProcessIngest():
+    '''
+        Runs the UCILayer of every dongle in its own process, the parsed range records come back as rows of
+        INGEST_RECORD_DTYPE through one SharedRangeRing per dongle, nothing is pickled after the start.
+        time.monotonic() is system wide, the rows of the dongles are merged on their receive time.
+
+        setup(index) and teardown(index, ranging_device) run in the dongle process and must be importable module
+        functions (spawn start method): setup scans/opens the dongle `index`, builds the ranging device and starts the sessions.
+
+        ingest = UciProcessIngest(setup_dongle, dongle_count=16)
+        ingest.start()
+        while running:
+            records = ingest.read()         # all the dongles, ordered by timestamp
+        ingest.close()
+    '''
+
+    def __init__(self, setup, dongle_count: int, teardown=None, capacity=65536, poll_ms=50, start_method="spawn"):
+        self.setup = setup
+        self.teardown = teardown
+        self.dongle_count = dongle_count
+        self.capacity = capacity
+        self.poll_ms = poll_ms
+        self.context = multiprocessing.get_context(start_method)
+        self.stop_event = self.context.Event()
+        self.rings = []
+        self.processes = []
+
+    def start(self):
+        for index in range(self.dongle_count):
+            ring = SharedRangeRing(capacity=self.capacity)
+            process = self.context.Process(target=uci_ingest_worker_main, name=f"uwb-dongle-{index}",
+                                           args=(index, ring.name, self.setup, self.teardown, self.stop_event, self.poll_ms), daemon=True)
+            self.rings.append(ring)
+            self.processes.append(process)
+            process.start()
+        log_i("UCI process ingest: %d dongle process(es) started", self.dongle_count)
+
+    def is_alive(self) -> list[bool]:
+        return [process.is_alive() for process in self.processes]
+
+    @property
+    def dropped_count(self) -> int:
+        return sum(ring.dropped_count for ring in self.rings)
+
+    @property
+    def worker_errors(self) -> list[str]:
+        '''
+            @return per dongle: the exception which stopped its process ("TypeName: message"), None if none
+        '''
+        return [ring.error for ring in self.rings]
+
+    def read_dongle(self, index: int, max_rows=None) -> np.ndarray:
+        return self.rings[index].read(max_rows)
+
+    def read(self) -> np.ndarray:
+        '''
+            @brief the available rows of all the dongles, ordered by timestamp within one call
+        '''
+        records = np.concatenate([ring.read() for ring in self.rings]) if len(self.rings) > 0 else np.empty(0, dtype=INGEST_RECORD_DTYPE)
+        if len(self.rings) > 1:
+            records = records[np.argsort(records["timestamp"], kind="stable")]
+        return records
+
+    def stop(self, timeout_s=2.0):
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout_s)
+            if process.is_alive():
+                log_w("UCI process ingest: %s did not stop, terminated", process.name)
+                process.terminate()
+                process.join()
+
+    def close(self):
+        self.stop()
+        for ring in self.rings:
+            ring.close()
+            ring.unlink()
+        self.rings = []
+        self.processes = []
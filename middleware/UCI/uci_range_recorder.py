@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file:   columnar NumPy recorder of the FiRa/CCC range notifications
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import os
+import time
+from enum import IntEnum
+
+import numpy as np
+
+from console_helper import *
+
+from uci_defs import *
+from uci_fira_range_ntf import FiraRangeDataNtf
+from uci_ccc_range_ntf import *
+
+
+class EnumRangeRecordKind(IntEnum):
+    FIRA_TWR = 0x00
+    CCC_CONTROLEE = 0x01
+    CCC_CONTROLLER = 0x02
+    CCC_CONTROLLER_EXP = 0x03
+
+
+# one row per measurement:
+#   FiRa: one row per FiraTwrResult, seq_num is the NTF sequence number
+#   CCC:  seq_num is the rr_index, mac is the responder index (controller exp), status is the range status
+RANGE_RECORD_DTYPE = np.dtype([
+    ("timestamp", np.float64),          # host time.monotonic() when recorded
+    ("kind", np.uint8),                 # EnumRangeRecordKind
+    ("seq_num", np.uint32),
+    ("session_id", np.uint32),
+    ("mac", np.uint64),
+    ("status", np.uint8),
+    ("nlos", np.uint8),
+    ("distance", np.uint16),            # cm
+    ("slot_index", np.uint8),
+    ("aoa_azimuth", np.uint16),
+    ("aoa_azimuth_fom", np.uint8),
+    ("aoa_elevation", np.uint16),
+    ("aoa_elevation_fom", np.uint8),
+    ("dst_aoa_azimuth", np.uint16),
+    ("dst_aoa_azimuth_fom", np.uint8),
+    ("dst_aoa_elevation", np.uint16),
+    ("dst_aoa_elevation_fom", np.uint8),
+    ("anchor_fom", np.uint8),           # CCC controlee only
+    ("initiator_fom", np.uint8),        # CCC controlee only
+])
+
+
+def range_record_rows(ntf, timestamp: float) -> list[tuple]:
+    '''
+        @brief rows of RANGE_RECORD_DTYPE of a range notification (FiraRangeDataNtf, CCCRangeDataNtf*) or of the
+               UciRspNtfResult carrying it, no row for the other messages
+    '''
+    if isinstance(ntf, UciRspNtfResult):
+        ntf = ntf.uci_result
+    rows = []
+    if isinstance(ntf, FiraRangeDataNtf):
+        for result in ntf.results:
+            rows.append((timestamp, EnumRangeRecordKind.FIRA_TWR, ntf.seq_num, ntf.session_id, result.mac_address,
+                         result.status, result.nlos, result.distance, result.slot_index,
+                         result.aoa_azimuth, result.aoa_azimuth_fom, result.aoa_elevation, result.aoa_elevation_fom,
+                         result.dst_aoa_azimuth, result.dst_aoa_azimuth_fom,
+                         result.dst_aoa_elevation, result.dst_aoa_elevation_fom, 0, 0))
+        return rows
+    if isinstance(ntf, CCCRangeDataNtfControlee):
+        rows.append((timestamp, EnumRangeRecordKind.CCC_CONTROLEE, ntf.rr_index, ntf.session_id, 0,
+                     ntf.range_status, 0, ntf.distance, 0, 0, 0, 0, 0, 0, 0, 0, 0, ntf.anchor_fom, ntf.initiator_fom))
+        return rows
+    if isinstance(ntf, CCCRangeDataNtfControllerExp):
+        for result in ntf.results:
+            rows.append((timestamp, EnumRangeRecordKind.CCC_CONTROLLER_EXP, ntf.rr_index, ntf.session_id, result.responder_index,
+                         ntf.range_status, 0, result.distance, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0))
+        return rows
+    if isinstance(ntf, CCCRangeDataNtfController):
+        rows.append((timestamp, EnumRangeRecordKind.CCC_CONTROLLER, ntf.rr_index, ntf.session_id, 0,
+                     ntf.range_status, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0))
+        return rows
+    return rows
+
+
+class UciRangeRecorder():
+    '''
+        Bounded-memory columnar capture of the range notifications, one preallocated NumPy ring of RANGE_RECORD_DTYPE.
+        With an output_dir the ring is flushed into numbered .npy/.npz chunks when full, without it the oldest rows are
+        overwritten (overwritten_count).
+
+        recorder = UciRangeRecorder(capacity=100000, output_dir="capture")
+        ranging_device.set_range_recorder(recorder)     # every fira/ccc_session_range_run() result is recorded
+        ...
+        recorder.close()
+    '''
+
+    def __init__(self, capacity=65536, output_dir=None, prefix="range", file_format="npz", compressed=False):
+        '''
+            @param capacity: rows of the ring
+            @param output_dir: directory of the chunks, None to keep the records in memory only
+            @param file_format: "npz", one array per column, or "npy", one structured array
+            @param compressed: np.savez_compressed for the npz chunks
+        '''
+        if file_format not in ("npz", "npy"):
+            raise ValueError(f"unsupported file format: {file_format}")
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=RANGE_RECORD_DTYPE)
+        self.count = 0              # valid rows
+        self.head = 0               # next row to write
+        self.overwritten_count = 0
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.file_format = file_format
+        self.compressed = compressed
+        self.chunk_index = 0
+        self.chunk_files = []
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def __len__(self):
+        return self.count
+
+    def append(self, ntf, timestamp=None) -> int:
+        '''
+            @brief record a range notification (FiraRangeDataNtf, CCCRangeDataNtf*) or the UciRspNtfResult carrying it,
+                   the other messages are ignored
+            @return number of rows recorded
+        '''
+        rows = range_record_rows(ntf, time.monotonic() if timestamp is None else timestamp)
+        for row in rows:
+            self.append_row(row)
+        return len(rows)
+
+    def append_row(self, row: tuple):
+        if self.count == self.capacity:
+            if self.output_dir is not None:
+                self.flush()
+            else:
+                self.overwritten_count += 1
+                self.count -= 1
+        self.buffer[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.count += 1
+
+    def snapshot(self) -> np.ndarray:
+        '''
+            @brief copy of the recorded rows, oldest first
+        '''
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            return self.buffer[start:start + self.count].copy()
+        return np.concatenate((self.buffer[start:], self.buffer[:self.head]))
+
+    def clear(self):
+        self.count = 0
+        self.head = 0
+
+    def flush(self) -> str:
+        '''
+            @brief write the recorded rows into the next chunk file and empty the ring
+            @return path of the chunk, None if nothing was written
+        '''
+        if self.output_dir is None or self.count == 0:
+            return None
+        records = self.snapshot()
+        path = os.path.join(self.output_dir, f"{self.prefix}_{self.chunk_index:06d}.{self.file_format}")
+        if self.file_format == "npy":
+            np.save(path, records)
+        elif self.compressed:
+            np.savez_compressed(path, **{name: records[name] for name in RANGE_RECORD_DTYPE.names})
+        else:
+            np.savez(path, **{name: records[name] for name in RANGE_RECORD_DTYPE.names})
+        log_d("Range Recorder: %d rows -> %s", len(records), path)
+        self.chunk_index += 1
+        self.chunk_files.append(path)
+        self.clear()
+        return path
+
+    def close(self):
+        self.flush()
+
+    @staticmethod
+    def load(path) -> np.ndarray:
+        '''
+            @brief read a chunk back as a structured array of RANGE_RECORD_DTYPE
+        '''
+        if path.endswith(".npy"):
+            return np.load(path)
+        with np.load(path) as columns:
+            records = np.zeros(len(columns["timestamp"]), dtype=RANGE_RECORD_DTYPE)
+            for name in RANGE_RECORD_DTYPE.names:
+                records[name] = columns[name]
+        return records
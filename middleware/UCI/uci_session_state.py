@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: state of the UWB sessions, fed by the SESSION_STATUS_NTFs, the callers wait for a state instead of the next frame
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import threading
+
+from uci_defs import *
+from uci_message import *
+
+
+class UciSessionStateTracker():
+    '''
+        Last SESSION_STATUS_NTF of every session, updated by the UCILayer receive path (any thread).
+        A waiter only returns on the state it needs, the other frames received meanwhile are left to their owners:
+        the responses to their submitted command, the notifications in the queue of wait_response.
+
+        tracker.expect(session_id)          # before the command changing the state
+        layer.submit(layer.uci_range_start, session_id)
+        layer.wait_session_state(session_id, EnumSessionState.SESSION_STATE_ACTIVE, timeout_ms=200)
+    '''
+
+    def __init__(self):
+        self.states = {}            # Dict[int, UWBSessionState]
+        self.condition = threading.Condition()
+
+    def update(self, session_state: UWBSessionState):
+        with self.condition:
+            self.states[session_state.session_id] = session_state
+            self.condition.notify_all()
+
+    def get(self, session_id: int) -> UWBSessionState:
+        '''
+            @return the last reported state, None if none since expect()
+        '''
+        return self.states.get(session_id)
+
+    def expect(self, session_id: int):
+        '''
+            @brief forget the last reported state, call before the command changing it
+        '''
+        with self.condition:
+            self.states.pop(session_id, None)
+
+    def check_state(self, session_id: int, state: EnumSessionState):
+        '''
+            @return True if the state is reached, False if the session was deinitialized instead, None while waiting
+        '''
+        session_state = self.states.get(session_id)
+        if session_state is None:
+            return None
+        if session_state.state == state:
+            return True
+        if session_state.state == EnumSessionState.SESSION_STATE_DEINIT:
+            return False
+        return None
+
+    def wait_for_state(self, session_id: int, state: EnumSessionState, timeout_ms=200) -> bool:
+        '''
+            @brief block until the state is reported, another thread receives the frames (UCILayer reader thread),
+                   see UCILayer.wait_session_state otherwise
+            @return True if reached, False on timeout or if the session was deinitialized instead
+        '''
+        with self.condition:
+            self.condition.wait_for(lambda: self.check_state(session_id, state) is not None, timeout=timeout_ms / 1000)
+            return self.check_state(session_id, state) is True